@@ -1,42 +1,36 @@
 import os
-import subprocess
 import pandas as pd
-from functools import reduce
+from concurrent.futures import ThreadPoolExecutor
+
+from qza_reader import ArtifactCache, metric_name_from_path, read_alpha_vector
+from alpha_meta_incremental import artifact_keys, read_provenance, update_alpha_meta, write_provenance
+from metadata import load_metadata
+from pipeline_paths import stage_path
 
 # ============================================
 # 1. 경로 설정
 # ============================================
-input_dir = "/mnt/d/Onedrive/Sparta_300/diversity_20FNS"
-metadata_file = "/mnt/d/Onedrive/Sparta_300/metadata_20FNS.tsv"
-output_dir = "/mnt/d/Onedrive/Sparta_300/diversity_20FNS/alpha_meta_combined"
+input_dir = stage_path("input_dir", "/mnt/d/Onedrive/Sparta_300/diversity_20FNS")
+metadata_file = stage_path("metadata_file", "/mnt/d/Onedrive/Sparta_300/metadata_20FNS.tsv")
+output_dir = stage_path("output_dir", "/mnt/d/Onedrive/Sparta_300/diversity_20FNS/alpha_meta_combined")
 os.makedirs(output_dir, exist_ok=True)
 
+# 증분 모드: True이면 기존 alpha_meta_combined.tsv에서 바뀐 메트릭 컬럼과
+# 새 샘플/메타데이터 변경 행만 갱신 (False이면 항상 전체 재생성)
+incremental = True
+
+# 파싱된 아티팩트 캐시 (UUID + payload 체크섬 키, 기본 위치: ~/.cache/sparta_300/qza)
+# 재실행 시 처음 보는 아티팩트만 파싱함
+qza_cache = ArtifactCache()
+
 # ============================================
-# 2. QZA → TSV 변환 (파일명 alpha-diversity.tsv로 수정)
+# 2. QZA → DataFrame 변환 (qiime tools export 없이 zip 내부 직접 읽기)
 # ============================================
 def process_qza(qza_path):
-    """QZA 파일을 TSV로 변환하고 컬럼 이름 보정"""
+    """QZA 파일의 alpha-diversity.tsv를 메모리에서 바로 읽고 컬럼 이름 보정"""
     try:
-        # 메트릭 이름 추출 (예: chao1_vector.qza → chao1)
-        metric_name = os.path.basename(qza_path).replace("_vector.qza", "")
-        
-        # 임시 폴더에 QIIME2 export
-        temp_dir = os.path.join(output_dir, f"TEMP_{metric_name}")
-        subprocess.run(
-            ["qiime", "tools", "export", "--input-path", qza_path, "--output-path", temp_dir],
-            check=True
-        )
-        
-        # export된 파일은 alpha-diversity.tsv 라고 가정
-        temp_tsv = os.path.join(temp_dir, "alpha-diversity.tsv")
-        df = pd.read_csv(temp_tsv, sep='\t')
-        
-        # 컬럼 이름 강제 지정: 첫 컬럼 → sample.id, 두 번째 컬럼 → metric_name
-        df.columns = ['sample.id', metric_name]
-        
-        # 임시 폴더 삭제
-        subprocess.run(["rm", "-rf", temp_dir])
-        return df
+        # 메트릭 이름 추출(chao1_vector.qza → chao1)과 컬럼 이름 보정은 qza_reader.read_alpha_vector에서 처리
+        return read_alpha_vector(qza_path, cache=qza_cache)
     
     except Exception as e:
         print(f"[ERROR] {qza_path} 처리 실패: {str(e)}")
@@ -45,38 +39,58 @@ def process_qza(qza_path):
 # ============================================
 # 3. 모든 QZA 파일 처리
 # ============================================
-all_dfs = []
-for file in os.listdir(input_dir):
-    if file.endswith("_vector.qza"):
-        qza_path = os.path.join(input_dir, file)
-        df = process_qza(qza_path)
-        if df is not None:
-            all_dfs.append(df)
+# 아티팩트별 작업은 서로 독립적이므로 제한된 크기의 스레드 풀에서 동시에 처리
+# (전체 소요 시간은 가장 느린 아티팩트 하나에 맞춰짐)
+max_workers = min(8, os.cpu_count() or 1)
+
+def read_vectors(qza_paths):
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # executor.map은 입력 순서를 유지하므로 컬럼 순서가 listdir 순서와 동일
+        return [df for df in executor.map(process_qza, qza_paths) if df is not None]
+
+qza_paths = [
+    os.path.join(input_dir, file)
+    for file in os.listdir(input_dir)
+    if file.endswith("_vector.qza")
+]
+output_path = os.path.join(output_dir, "alpha_meta_combined.tsv")
+
+use_incremental = (
+    incremental and os.path.exists(output_path) and read_provenance(output_path) is not None
+)
+all_dfs = [] if use_incremental else read_vectors(qza_paths)
 
 # ============================================
 # 4. 데이터 병합 및 메타데이터 통합
 # ============================================
-if all_dfs:
-    merged_diversity = reduce(
-        lambda left, right: pd.merge(left, right, on='sample.id', how='outer'), 
-        all_dfs
+if use_incremental:
+    # 기존 결과와 provenance 파일이 있으면 바뀐 메트릭 컬럼/샘플 행만 갱신
+    final_df, affected_subjects = update_alpha_meta(output_path, qza_paths, metadata_file, read_vectors)
+    final_df.to_csv(output_path, sep='\t', index=False)
+    print(f"\n✅ 증분 갱신 완료: {output_path} (변경된 subject {len(affected_subjects)}개)")
+elif all_dfs:
+    # 모든 메트릭 벡터를 sample.id 인덱스 기준으로 한 번에 정렬·결합 (outer)
+    merged_diversity = pd.concat(
+        [df.set_index('sample.id') for df in all_dfs], axis=1, join='outer'
     )
+    merged_diversity.index.name = 'sample.id'
+    merged_diversity = merged_diversity.reset_index()
     
     # 메타데이터 불러오기
-    metadata = pd.read_csv(metadata_file, sep='\t')
-    
-    # 컬럼 이름에 포함된 공백 제거
-    metadata.columns = metadata.columns.str.strip()
-    
-    # metadata의 첫 번째 컬럼 이름(어떤 이름이든 상관없음)을 'sample.id'로 강제 변경
-    first_col = metadata.columns[0]
-    metadata.rename(columns={first_col: 'sample.id'}, inplace=True)
+    # (컬럼 이름 공백 제거, 첫 번째 컬럼 이름을 'sample.id'로 강제 변경)
+    metadata = load_metadata(metadata_file)
     
-    # merged_diversity와 metadata를 'sample.id' 컬럼을 기준으로 병합
+    # merged_diversity와 metadata를 'sample.id' 컬럼을 기준으로 한 번만 병합
     final_df = pd.merge(merged_diversity, metadata, on='sample.id', how='left')
     
-    output_path = os.path.join(output_dir, "alpha_meta_combined.tsv")
     final_df.to_csv(output_path, sep='\t', index=False)
+    
+    # 다음 증분 실행을 위해 컬럼/행 출처 기록 (전체 재생성이므로 모든 subject가 변경 대상)
+    column_keys = artifact_keys(
+        [p for p in qza_paths if metric_name_from_path(p) in merged_diversity.columns]
+    )
+    all_subjects = set(final_df['subject'].dropna()) if 'subject' in final_df.columns else set()
+    write_provenance(output_path, column_keys, metadata_file, metadata, all_subjects)
     print(f"\n✅ 최종 파일 저장됨: {output_path}")
 else:
     print("⚠️ 처리된 QZA 파일이 없습니다.")
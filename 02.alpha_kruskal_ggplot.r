@@ -14,8 +14,13 @@ for (pkg in required_packages) {
 # 모든 패키지가 로드되었는지 확인
 print("All required packages are successfully installed and loaded.")
 
+# 경로: 파이프라인 실행기(pipeline_runner.py)가 SPARTA_PATH_* 환경변수로 넘기면 그 값, 없으면 아래 기본값
+file_arg <- grep("^--file=", commandArgs(trailingOnly = FALSE), value = TRUE)
+repo_dir <- if (length(file_arg) > 0) dirname(sub("^--file=", "", file_arg[1])) else getwd()
+source(file.path(repo_dir, "pipeline_paths.r"))
+
 # 데이터 읽기
-file_path <- "/mnt/d/OneDrive/Sparta_300/diversity_20FNS/alpha_meta_combined/alpha_meta_combined.tsv"
+file_path <- stage_path("file_path", "/mnt/d/OneDrive/Sparta_300/diversity_20FNS/alpha_meta_combined/alpha_meta_combined.tsv")
 data <- read.csv(file_path, sep = "\t")
 
 data$group <- as.factor(data$group)
@@ -129,7 +134,7 @@ plot_and_save <- function(metric, data, output_dir) {
 metrics <- c("shannon", "chao1", "simpson", "faith_pd", "evenness", "observed_features")
 
 # 출력 경로
-output_dir <- "/mnt/d/OneDrive/Sparta_300/diversity_20FNS/alpha_meta_combined/alpha_kruskal"
+output_dir <- stage_path("output_dir", "/mnt/d/OneDrive/Sparta_300/diversity_20FNS/alpha_meta_combined/alpha_kruskal")
 
 # 각 지표에 대해 그래프 생성 및 저장
 for (metric in metrics) {
@@ -1,11 +1,15 @@
 # alpha_meta_combined.tsv 파일에서 subject별로 3개의 행(즉, 3반복)을 갖는 subject만 남기기
 # Friedman 검정을 위한 전처리 작업
 
+import os
 import pandas as pd
 
+from alpha_meta_incremental import clear_affected_subjects, read_provenance
+from pipeline_paths import stage_path
+
 # 1. 파일 경로 설정(macOS)
-input_file = "/Users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS/alpha_meta_combined/alpha_meta_combined.tsv"
-output_file = "/Users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS/alpha_meta_combined/alpha_meta_combined_friedman.tsv"
+input_file = stage_path("input_file", "/Users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS/alpha_meta_combined/alpha_meta_combined.tsv")
+output_file = stage_path("output_file", "/Users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS/alpha_meta_combined/alpha_meta_combined_friedman.tsv")
 
 # PC에서 실행할 때는 아래 경로로 변경
 # input_file = "/mnt/d/onedrive/Sparta_300/05_diversity_20FNS/alpha_meta_combined/alpha_meta_combined.tsv"
@@ -15,8 +19,24 @@ output_file = "/Users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS/alpha_
 df = pd.read_csv(input_file, sep='\t')
 
 # 3. subject별로 그룹화하여, 3개의 행(즉, 3반복)을 갖는 subject만 남기기
-filtered_df = df.groupby('subject', group_keys=False).filter(lambda group: len(group) == 3)
+#    01 스크립트가 증분 갱신을 했다면(provenance 파일 존재) 변경된 subject만 다시 필터링하고
+#    나머지 subject는 기존 결과를 그대로 사용
+provenance = read_provenance(input_file)
+if provenance is not None and os.path.exists(output_file):
+    affected = set(provenance["affected_subjects"])
+    previous_df = pd.read_csv(output_file, sep='\t')
+    unchanged_df = previous_df[~previous_df['subject'].astype(str).isin(affected)]
+    affected_df = df[df['subject'].astype(str).isin(affected)]
+    refiltered_df = affected_df.groupby('subject', group_keys=False).filter(lambda group: len(group) == 3)
+    # 입력 파일의 행 순서를 유지
+    kept_ids = set(unchanged_df['sample.id']) | set(refiltered_df['sample.id'])
+    filtered_df = df[df['sample.id'].isin(kept_ids)]
+    print(f"변경된 subject {len(affected)}개만 다시 필터링했습니다.")
+else:
+    filtered_df = df.groupby('subject', group_keys=False).filter(lambda group: len(group) == 3)
 
 # 4. 결과 저장
 filtered_df.to_csv(output_file, sep='\t', index=False)
+if provenance is not None:
+    clear_affected_subjects(input_file)
 print(f"✅ 필터링된 파일이 저장되었습니다: {output_file}")
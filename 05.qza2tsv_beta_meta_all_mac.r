@@ -20,11 +20,16 @@ for (pkg in required_packages) {
 print("All required packages are successfully installed and loaded.")
 
 # 2. 파일 경로 설정
-qza_folder <- "/users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS"
-metadata_path <- "/users/inseonghwang/onedrive/Sparta_300/metadata_20FNS.tsv"
+# 경로: 파이프라인 실행기(pipeline_runner.py)가 SPARTA_PATH_* 환경변수로 넘기면 그 값, 없으면 아래 기본값
+file_arg <- grep("^--file=", commandArgs(trailingOnly = FALSE), value = TRUE)
+repo_dir <- if (length(file_arg) > 0) dirname(sub("^--file=", "", file_arg[1])) else getwd()
+source(file.path(repo_dir, "pipeline_paths.r"))
 
-tsv_output_folder <- "/users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS/beta_meta_combined"
-merged_output_folder <- "/users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS/beta_meta_combined/pcoa2tsv_all"
+qza_folder <- stage_path("qza_folder", "/users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS")
+metadata_path <- stage_path("metadata_path", "/users/inseonghwang/onedrive/Sparta_300/metadata_20FNS.tsv")
+
+tsv_output_folder <- stage_path("tsv_output_folder", "/users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS/beta_meta_combined")
+merged_output_folder <- stage_path("merged_output_folder", "/users/inseonghwang/onedrive/Sparta_300/05_diversity_20FNS/beta_meta_combined/pcoa2tsv_all")
 
 # 3. 폴더 생성 (없으면)
 if (!dir.exists(tsv_output_folder)) {
@@ -46,10 +51,17 @@ qza_files <- list.files(
   full.names = TRUE
 )
 
+# 5-1. PCoA 캐시 (아티팩트 UUID + payload 체크섬 키, .rds 바이너리, pcoa_cache.r 참고)
+#      재실행 시 처음 보는 아티팩트만 read_qza()로 읽고, 전체 크기가 cache_max_bytes를
+#      넘으면 가장 오래 사용하지 않은 파일부터 삭제 (LRU)
+source(file.path(repo_dir, "pcoa_cache.r"))
+cache_folder <- file.path(tsv_output_folder, ".pcoa_cache")
+cache_max_bytes <- 512 * 1024^2
+
 # 6. 변환 & 병합 처리
 for (qza_file in qza_files) {
-  # (a) QZA 읽기
-  pcoa_qza <- read_qza(qza_file)
+  # (a) QZA 읽기 (캐시 우선)
+  pcoa_qza <- read_pcoa_cached(qza_file, cache_folder, cache_max_bytes)
 
   # (b) 출력될 TSV 파일 이름 (.qza -> .tsv)
   tsv_filename <- sub("\\.qza$", ".tsv", basename(qza_file))
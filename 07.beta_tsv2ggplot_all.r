@@ -12,7 +12,12 @@ for (pkg in required_packages) {
 print("All required packages are successfully installed and loaded.")
 
 # 2. PCoA 결과 파일이 들어있는 폴더 (이미 메타데이터가 포함된 TSV)
-pcoa_dir <- "/Users/inseonghwang/OneDrive/Sparta_300/05_diversity_20FNS/beta_meta_combined/pcoa2tsv_all"
+# 경로: 파이프라인 실행기(pipeline_runner.py)가 SPARTA_PATH_* 환경변수로 넘기면 그 값, 없으면 아래 기본값
+file_arg <- grep("^--file=", commandArgs(trailingOnly = FALSE), value = TRUE)
+repo_dir <- if (length(file_arg) > 0) dirname(sub("^--file=", "", file_arg[1])) else getwd()
+source(file.path(repo_dir, "pipeline_paths.r"))
+
+pcoa_dir <- stage_path("pcoa_dir", "/Users/inseonghwang/OneDrive/Sparta_300/05_diversity_20FNS/beta_meta_combined/pcoa2tsv_all")
 pcoa_files <- list.files(path = pcoa_dir, pattern = "\\.tsv$", full.names = TRUE)
 
 # 출력 폴더 경로 (여기서는 pcoa_dir와 동일한 폴더 사용)
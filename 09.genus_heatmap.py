@@ -1,53 +1,120 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-import seaborn as sns
 import matplotlib.pyplot as plt
 
+from clustermap import draw_clustermap
+from feature_table import FeatureTable, load_table
+from pipeline_paths import stage_path
+from rank_collapse import collapse_rank
+from transforms import transform_table
+
 # ============================================
-# 1. 경로 설정 
+# 1. 경로 설정
 # ============================================
-input_path = "/Users/inseonghwang/OneDrive/Sparta_300/08_heatmap_20FNS/genus_20FNS-flt2.tsv"
-output_folder = "/Users/inseonghwang/OneDrive/Sparta_300/08_heatmap_20FNS"
-output_filename = "genus_heatmap_20FNS-flt2_top30.pdf"
+input_path = stage_path("input_path", "/Users/inseonghwang/OneDrive/Sparta_300/08_heatmap_20FNS/genus_20FNS-flt2.tsv")
+output_folder = stage_path("output_folder", "/Users/inseonghwang/OneDrive/Sparta_300/08_heatmap_20FNS")
+output_filename = stage_path("output_filename", "genus_heatmap_20FNS-flt2_top30.pdf")
 output_path = f"{output_folder}/{output_filename}"
 
+# 렌더링 방식: "vector"(셀을 벡터로), "raster"(heatmap mesh를 이미지로), "auto"(셀 수가 많으면 raster)
+render_mode = "auto"
+raster_dpi = 300
+
+# 배치 모드: (rank, top N) 목록. 비어 있으면 기존처럼 genus top 30 하나만 output_filename으로 저장
+# 예: [("phylum", 20), ("family", 30), ("genus", 30), ("genus", 50)]
+batch_jobs = []
+batch_filename = "{rank}_heatmap_20FNS-flt2_top{top_n}.pdf"
+batch_workers = min(4, os.cpu_count() or 1)  # 그림을 동시에 그릴 워커 프로세스 수
+
 # ============================================
-# 2. 데이터 읽기 (relative abundance 변환 전 파일 이용)
+# 2. rank 수준으로 합산
 # ============================================
-abundances = pd.read_table(input_path, skiprows=1, index_col=0)
+def rank_table(table, rank):
+    """
+    ASV 수준 BIOM(taxonomy metadata 포함)이나 genus보다 높은 rank는 앞 rank까지의 lineage로 합산
+    (genus TSV를 genus로 그릴 때는 feature ID가 이미 genus 수준 lineage이므로 그대로 사용)
+    """
+    if table.taxonomy is None and rank == "genus":
+        return table
+    return collapse_rank(table, rank)
 
-# 데이터 복사
-abund_to_plot = abundances.copy()
 
-# Genus 이름만 사용하기 (세미콜론으로 구분된 문자열의 6번째 항목 사용)
-abund_to_plot.index = abund_to_plot.index.str.split(";").str[5]
+# ============================================
+# 3. 상위 N개 선택 + Centered Log-Ratio (CLR) 변환 적용 (pseudocount 0.5)
+#    transforms 모듈: 행렬 전체를 한 번에 변환하고, 같은 테이블/파라미터면 캐시 재사용
+# ============================================
+def top_n_clr(table, rank, top_n):
+    # rank 이름만 사용하기 (lineage 인덱스의 rank token, 예: 'g__Streptococcus')
+    lineages = table.lineage_index
+    names = pd.Index(lineages.token(rank))
 
-# "unclassified" 또는 잘못된 index 삭제
-abund_to_plot = abund_to_plot[~abund_to_plot.index.isin(["g__", "__"])]
+    # "unclassified"("g__", "__") 또는 해당 rank가 없는 index 삭제
+    keep_rows = np.flatnonzero(lineages.assigned(rank))
+    if len(keep_rows) == 0:
+        # 예: genus 테이블에 species rank를 지정한 경우 (빈 행렬로는 군집을 계산할 수 없음)
+        print(f"[건너뜀] '{rank}' 수준으로 분류된 feature가 없습니다.")
+        return None
 
-# 각 genus의 전체 abundance 합을 계산하고, 많은 순으로 정렬하여 상위 30개 선택
-abund_to_plot['total_abundance'] = abund_to_plot.sum(axis=1)
-abund_to_plot = abund_to_plot.sort_values(by='total_abundance', ascending=False)
-abund_to_plot = abund_to_plot.head(30)
-abund_to_plot = abund_to_plot.drop(columns=['total_abundance'])
+    # 각 taxon의 전체 abundance 합을 계산하고, 많은 순으로 상위 N개 선택
+    # (전체 정렬 대신 argpartition으로 N개만 고른 뒤 그 N개만 정렬, 동점은 원래 순서 유지)
+    total_abundance = table.row_sums()[keep_rows]
+    if top_n < len(keep_rows):
+        candidates = np.argpartition(-total_abundance, top_n - 1)[:top_n]
+    else:
+        candidates = np.arange(len(keep_rows))
+    candidates = candidates[np.lexsort((candidates, -total_abundance[candidates]))]
+    top_rows = keep_rows[candidates]
 
-# ============================================
-# 3. Centered Log-Ratio (CLR) 변환 함수 및 적용
-# ============================================
-def clr_transform(xs):
-    logged = np.log(xs + 0.5)
-    return logged - logged.mean()
+    # 선택된 N개 행만 dense로 변환
+    abund_to_plot = FeatureTable(
+        table.dense_rows(top_rows), names[top_rows], table.sample_ids, id_column=None
+    )
+    return transform_table(abund_to_plot, "clr", pseudocount=0.5).to_frame()
 
-transformed = abund_to_plot.apply(clr_transform, axis=0)
 
 # ============================================
-# 4. 클러스터 맵 그리기
+# 4. 클러스터 맵 그리기 + 파일로 저장 (배치 모드에서는 워커 프로세스에서 실행)
+#    행/열 linkage는 행렬 해시로 캐시 (스타일만 바꿔 다시 그릴 때는 군집 계산 생략)
 # ============================================
-cluster_grid = sns.clustermap(transformed.T, cmap="magma", xticklabels=True, figsize=(8, 15))
+def render_heatmap(transformed, path):
+    cluster_grid = draw_clustermap(transformed.T, render=render_mode, cmap="magma", xticklabels=True, figsize=(8, 15))
+    cluster_grid.savefig(path, dpi=raster_dpi)
+    plt.close(cluster_grid.fig)
+    return path
+
+
+def main():
+    # 데이터 읽기 (relative abundance 변환 전 파일 이용)
+    # 공용 로더 사용: TSV는 바이너리 캐시를 memory-map으로, .biom은 sparse 행렬로 읽음
+    # 테이블은 한 번만 읽고, 모든 rank / top N 조합에 재사용
+    table = load_table(input_path)
+
+    if not batch_jobs:
+        transformed = top_n_clr(rank_table(table, "genus"), "genus", 30)
+        if transformed is None:
+            return
+        render_heatmap(transformed, output_path)
+        print(f"Heatmap saved as '{output_filename}' in {output_folder}")
+        return
+
+    # rank별 합산은 rank마다 한 번만 계산하고, 그림은 워커 프로세스에서 동시에 그림
+    # (해당 rank의 feature가 없는 조합은 건너뜀)
+    collapsed = {rank: rank_table(table, rank) for rank in dict.fromkeys(rank for rank, _ in batch_jobs)}
+    transformed, paths = [], []
+    for rank, top_n in batch_jobs:
+        result = top_n_clr(collapsed[rank], rank, top_n)
+        if result is not None:
+            transformed.append(result)
+            paths.append(os.path.join(output_folder, batch_filename.format(rank=rank, top_n=top_n)))
+    if not paths:
+        return
+    with ProcessPoolExecutor(max_workers=min(batch_workers, len(paths))) as executor:
+        for path in executor.map(render_heatmap, transformed, paths):
+            print(f"Heatmap saved as '{os.path.basename(path)}' in {output_folder}")
 
-# ============================================
-# 5. 그래프를 파일로 저장
-# ============================================
-cluster_grid.savefig(output_path)
 
-print(f"Heatmap saved as '{output_filename}' in {output_folder}")
+if __name__ == "__main__":
+    main()
@@ -3,100 +3,104 @@
 기능 요약:
   1. 입력 파일에서 주석(#) 행 제거
      - "#OTU ID"로 시작하지 않는 모든 # 주석 행 제거
-  2. 헤더(`#OTU ID`)를 그대로 둔 상태로, "class" 행 생성 후 맨 위(0번 인덱스)에 삽입
+  2. 헤더(`#OTU ID`)로부터 "class" 행을 만들어 맨 위에 기록
      - "DQ", "MW", "TC"로 시작하는 열만 접두어(prefix) 추출
      - 그렇지 않은 열은 공백("") 추가
   3. 원래 헤더 행(#OTU ID 행)을 복사하여 두 행으로 만듦
      - 첫 번째 헤더 행의 첫 셀은 "subclass"로 변경
      - 복사된(두 번째) 헤더 행의 첫 셀은 "subject"로 변경
-  4. 나머지 데이터는 그대로 유지
-  5. 전치 기능(기존 코드)은 **주석 처리**해 필요 시 주석 해제 후 사용
+  4. 나머지 데이터는 그대로 유지 (한 행씩 읽어서 바로 복사하는 스트리밍 방식)
+  5. 전치 기능은 TRANSPOSE = True일 때만 사용 (CONTRASTS가 있으면 contrast별 출력마다 적용)
+     - 메모리보다 큰 테이블도 처리할 수 있도록 table_transpose.py의 열 타일 단위 전치 사용
+  6. FORMATTED_OUTPUT을 지정하면 LEfSe 형식화 입력(.in, format_input.py 결과와 같은 pickle)도 작성
+     - 텍스트 테이블을 format_input.py로 다시 파싱하지 않고 run_lefse.py / lefse_engine.py에 바로 사용
 """
 
-import csv
 import sys
 import os
-import pandas as pd
+
+from feature_table import load_table
+from lefse_input import class_subclass_subject_rows, stream_lefse_contrasts, stream_lefse_input, write_formatted_input
+from metadata import load_metadata
+from pipeline_paths import stage_path
+from table_transpose import transpose_table
 
 # --- (1) 수정하기 쉽게 코드 상단에 경로를 배치 ---
 # INPUT_FILE = "/mnt/d/onedrive/sparta_300/taxa_20FNS/exported_species_RF/species_20FNS_fltrd_RF.tsv"
 # OUTPUT_FILE = "/mnt/d/onedrive/sparta_300/taxa_20FNS/LEfSe/input_table.tsv"
 
-INPUT_FILE = "/Users/inseonghwang/onedrive/sparta_300/taxa_20FNS/exported_species_RF/species_20FNS_fltrd_RF.tsv"
-OUTPUT_FILE = "/Users/inseonghwang/onedrive/sparta_300/taxa_20FNS/LEfSe/input_table.tsv"
-
-def insert_class_subclass_sampleid_rows(input_path, output_path):
-    # 1) 파일 전체 읽기
-    with open(input_path, "r", newline="") as infile:
-        reader = csv.reader(infile, delimiter="\t")
-        rows = list(reader)
-
-    # --- (1-A) 주석(#) 행 제거 ---
-    # '#OTU ID'가 들어있는 행은 헤더로 남기고,
-    # 그 외 '#'로 시작하는 행은 모두 제거
-    while rows and rows[0] and rows[0][0].startswith('#') and not rows[0][0].lower().startswith('#otu id'):
-        rows.pop(0)
-
-    # 헤더 유효성 체크
-    if not rows:
-        sys.exit("유효한 헤더를 찾지 못했습니다. (#OTU ID로 시작하는 행이 필요합니다.)")
-
-    # 현재 rows[0]가 원본 헤더 행이어야 함 (예: ["#OTU ID", "DQ_001", "MW_003", ...])
-    original_header = rows[0]
-
-    # --- (2) "class" 행 생성 ---
-    #     첫 열은 "class", 헤더의 두 번째 열부터 "DQ"/"MW"/"TC" 접두어 추출
-    class_row = ["class"]
-    for cell in original_header[1:]:
-        cell_str = cell.strip()
-        if cell_str.startswith("DQ") or cell_str.startswith("MW") or cell_str.startswith("TC"):
-            prefix = cell_str.split("_")[0]
-            class_row.append(prefix)
-        else:
-            class_row.append("")
+INPUT_FILE = stage_path("input_file", "/Users/inseonghwang/onedrive/sparta_300/taxa_20FNS/exported_species_RF/species_20FNS_fltrd_RF.tsv")
+OUTPUT_FILE = stage_path("output_file", "/Users/inseonghwang/onedrive/sparta_300/taxa_20FNS/LEfSe/input_table.tsv")
 
-    # class_row를 맨 위(인덱스 0)에 삽입
-    rows.insert(0, class_row)
-    # 이제 rows[1]이 원본 헤더 행이 됨
+# True: class/subclass/subject 행을 붙인 결과를 전치해서 저장 (샘플이 행이 됨)
+TRANSPOSE = False
 
-    # --- (3) 원본 헤더 행을 2개로 만들어
-    #         첫 번째 헤더 행 → 첫 셀 "subclass"
-    #         두 번째 헤더 행(복사본) → 첫 셀 "subject"
-    # 현재 rows[1]이 "#OTU ID ...",
-    # 이를 수정하여 "subclass ...",
-    # 그리고 복사본을 만들어 "subject ..."로 함
+# LEfSe 형식화 입력(.in) 경로 (None이면 작성 안 함), 정규화 값은 format_input.py -o와 같음 (음수: 정규화 안 함)
+# 예: FORMATTED_OUTPUT = OUTPUT_FILE[:-4] + ".in"
+FORMATTED_OUTPUT = None
+NORM_VALUE = 1000000.0
 
-    # (3-A) 첫 번째 헤더 행의 첫 셀을 "subclass"로 변경
-    rows[1][0] = "subclass"
+# 메타데이터 기반 contrast 목록 (비어 있으면 기존처럼 DQ/MW/TC 접두어로 OUTPUT_FILE 하나만 작성)
+# 입력 테이블은 한 번만 읽고, contrast마다 OUTPUT_FILE 폴더에 input_table_<name>.tsv 작성
+# 정의 형식은 lefse_input.py 참고
+METADATA_FILE = stage_path("metadata_file", "/Users/inseonghwang/onedrive/Sparta_300/metadata_20FNS.tsv")
+CONTRASTS = [
+    # {"name": "DQ_vs_MW", "class": "sample_prefix", "include": {"sample_prefix": ["DQ", "MW"]}},
+    # {"name": "DQ_vs_TC", "class": "sample_prefix", "include": {"sample_prefix": ["DQ", "TC"]}},
+    # {"name": "MW_vs_TC", "class": "sample_prefix", "include": {"sample_prefix": ["MW", "TC"]}},
+    # {"name": "site_by_subject", "class": "sample_prefix", "subclass": "subject"},
+]
 
-    # (3-B) 두 번째 헤더 복제하여 첫 셀만 "subject"로 변경
-    #       list(rows[1]) 로 하면 얕은 복사이지만 여기서는 충분
-    header_copy = list(rows[1])
-    header_copy[0] = "subject"
-
-    # (3-C) 복사본을 rows[2] 위치에 삽입
-    rows.insert(2, header_copy)
-
-    # --- (4) 전치 기능은 주석 처리 ---
-    df = pd.DataFrame(rows)
-    """
-    # 아래 주석 해제 시 전치 수행 + 필요 시 #OTU ID → subject 등 추가 로직
-    df_transposed = df.T
-
-    # 전치 후 첫 행/열 수정이 필요하면 여기에 작성
-
-    df_transposed.to_csv(output_path, sep="\t", index=False, header=False)
-    return
-    """
-
-    # (전치를 하지 않고 그대로 TSV로 저장)
-    df.to_csv(output_path, sep="\t", index=False, header=False)
+def insert_class_subclass_sampleid_rows(input_path, output_path):
+    # 1~4) 한 행씩 읽으면서 주석(#) 행은 건너뛰고, class/subclass/subject 행을 먼저 쓴 뒤
+    #      데이터 행은 그대로 복사 (전체 행을 메모리에 올리지 않음, lefse_input.py 참고)
+    if not TRANSPOSE:
+        stream_lefse_input(input_path, output_path, class_subclass_subject_rows)
+        return
+
+    # 5) 전치: 임시 파일에 그대로 저장한 뒤 열 타일 단위로 전치 (전치 결과 전체를 메모리에 만들지 않음)
+    tmp_path = output_path + ".untransposed.tmp"
+    stream_lefse_input(input_path, tmp_path, class_subclass_subject_rows)
+    try:
+        transpose_table(tmp_path, output_path, delimiter="\t")
+    finally:
+        os.remove(tmp_path)
+
+
+def write_contrasts(input_path, output_path):
+    # 메타데이터로 contrast별 샘플 열 번호를 미리 계산하고, 입력 테이블은 한 번만 읽어서 모두 작성
+    metadata = load_metadata(METADATA_FILE)
+    output_dir = os.path.dirname(output_path)
+    output_paths = [os.path.join(output_dir, f"input_table_{c['name']}.tsv") for c in CONTRASTS]
+    if not TRANSPOSE:
+        sample_counts = stream_lefse_contrasts(input_path, metadata, CONTRASTS, output_paths)
+    else:
+        # 5) 전치: contrast별 임시 파일에 쓴 뒤 각각 열 타일 단위로 전치
+        tmp_paths = [path + ".untransposed.tmp" for path in output_paths]
+        try:
+            sample_counts = stream_lefse_contrasts(input_path, metadata, CONTRASTS, tmp_paths)
+            for tmp_path, path in zip(tmp_paths, output_paths):
+                transpose_table(tmp_path, path, delimiter="\t")
+        finally:
+            for tmp_path in tmp_paths:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    for path, n_samples in zip(output_paths, sample_counts):
+        print(f"[완료] {os.path.basename(path)}: 샘플 {n_samples}개 (전치: {TRANSPOSE})")
 
 
 def main():
     try:
+        if CONTRASTS:
+            write_contrasts(INPUT_FILE, OUTPUT_FILE)
+            return
         insert_class_subclass_sampleid_rows(INPUT_FILE, OUTPUT_FILE)
-        print(f"[완료] class/subclass/subject 행 처리 완료. (전치 기능 주석 상태)\n출력: {OUTPUT_FILE}")
+        print(f"[완료] class/subclass/subject 행 처리 완료. (전치: {TRANSPOSE})\n출력: {OUTPUT_FILE}")
+        if FORMATTED_OUTPUT:
+            # 메모리의 행렬에서 바로 pickle 작성 (class/subclass/subject 규칙은 텍스트 출력과 동일)
+            write_formatted_input(load_table(INPUT_FILE), FORMATTED_OUTPUT, class_subclass_subject_rows,
+                                  norm_value=NORM_VALUE)
+            print(f"[완료] LEfSe 형식화 입력: {FORMATTED_OUTPUT}")
     except Exception as e:
         print(f"[오류 발생] {e}", file=sys.stderr)
         sys.exit(1)
@@ -1,21 +1,27 @@
 #!/usr/bin/env python3
 
 import os, sys
-import matplotlib
-matplotlib.use('Agg')
-from pylab import *
+from concurrent.futures import ProcessPoolExecutor
 from collections import defaultdict
 from math import ceil  # 최대값 계산을 위해 ceil 임포트
-
-from lefse.lefse import *
+import numpy as np
 import argparse
 
 colors = ['r','g','b','m','c','y','k','w']
 
+def load_pyplot():
+    # matplotlib는 그림을 실제로 그릴 때만 불러옴 (--report_features / --report_only는 .res 파서만 사용)
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
 def read_params(args):
     parser = argparse.ArgumentParser(description='Plot results')
-    parser.add_argument('input_file', metavar='INPUT_FILE', type=str, help="tab delimited input file")
-    parser.add_argument('output_file', metavar='OUTPUT_FILE', type=str, help="the file for the output image")
+    # 단일 모드: INPUT_FILE OUTPUT_FILE / 배치 모드(--batch_output_dir): .res 파일 여러 개
+    parser.add_argument('files', metavar='FILE', type=str, nargs='+', help="INPUT_FILE OUTPUT_FILE (or several .res files with --batch_output_dir)")
+    parser.add_argument('--batch_output_dir', dest="batch_output_dir", type=str, default="", help="render every input .res file into this folder (<name>.<format>)")
+    parser.add_argument('--workers', dest="workers", type=int, default=1, help="worker processes for batch mode")
     parser.add_argument('--feature_font_size', dest="feature_font_size", type=int, default=7, help="font size for feature labels")
     parser.add_argument('--format', dest="format", choices=["png","svg","pdf"], default='png', type=str, help="the format for the output file")
     parser.add_argument('--dpi', dest="dpi", type=int, default=300)
@@ -33,37 +39,81 @@ def read_params(args):
     parser.add_argument('--max_feature_len', dest="max_feature_len", type=int, default=60, help="Maximum length of feature strings (def 60)")
     parser.add_argument('--all_feats', dest="all_feats", type=str, default="")
     parser.add_argument('--otu_only', dest="otu_only", default=False, action='store_true', help="Plot only species resolved OTUs (as opposed to all levels)")
+    parser.add_argument('--page_size', dest="page_size", type=int, default=0, help="features per page for horizontal plots (0: one page; pdf output becomes a multi-page file)")
+    parser.add_argument('--max_labels', dest="max_labels", type=int, default=0, help="maximum feature labels per page, thinning the rest (0: label every bar)")
     parser.add_argument('--report_features', dest="report_features", default=False, action='store_true', help="Report important features to STDOUT")
+    parser.add_argument('--report_only', dest="report_only", default=False, action='store_true', help="Only report features to STDOUT (no figure, matplotlib is not loaded)")
     args = parser.parse_args()
+    if not args.batch_output_dir and len(args.files) != 2:
+        parser.error("INPUT_FILE and OUTPUT_FILE are required (or use --batch_output_dir)")
     return vars(args)
 
 def read_data(input_file, output_file, otu_only):
+    """
+    .res 파일의 유의한 feature 행(공백 구분 필드가 3개보다 많은 행)을 한 번만 파싱해서 열 단위 배열로 반환
+
+    Returns:
+        dict: feature(이름), log_max(log10 최대 class 평균), cls_code(class 번호), lda(LDA 점수),
+              lda_text(.res에 적힌 LDA 문자열, 보고용), cls(정렬된 class 이름 목록).
+              유의한 feature가 없으면 빈 출력 파일을 만들고 None
+    """
+    features, log_max, classes, lda = [], [], [], []
     with open(input_file, 'r') as inp:
-        if not otu_only:
-            rows = [line.strip().split()[:-1] for line in inp.readlines() if len(line.strip().split()) > 3]
-        else:
-            rows = [line.strip().split()[:-1] for line in inp.readlines() if len(line.strip().split()) > 3 and len(line.strip().split()[0].split('.')) == 8]
-    classes = list(set([v[2] for v in rows if len(v) > 2]))
-    if len(classes) < 1: 
+        for line in inp:
+            fields = line.split()
+            if len(fields) <= 3 or (otu_only and fields[0].count('.') != 7):
+                continue
+            features.append(fields[0])
+            log_max.append(fields[1])
+            classes.append(fields[2])
+            lda.append(fields[3])
+    if len(features) < 1:
         print("No differentially abundant features found in " + input_file)
-        os.system("touch " + output_file)
-        sys.exit()
+        open(output_file, 'a').close()
+        return None
+    cls, cls_code = np.unique(np.asarray(classes, dtype=str), return_inverse=True)
     data = {}
-    data['rows'] = rows
-    data['cls'] = classes
+    data['feature'] = np.asarray(features, dtype=object)
+    data['log_max'] = np.asarray(log_max, dtype=np.float64)
+    data['cls_code'] = cls_code
+    data['lda'] = np.asarray(lda, dtype=np.float64)
+    data['lda_text'] = np.asarray(lda, dtype=object)
+    data['cls'] = cls.tolist()
     return data
 
-def plot_histo_hor(path, params, data, bcl, report_features):
-    cls2 = []
-    if params['all_feats'] != "":
-        cls2 = sorted(params['all_feats'].split(":"))
-    cls = sorted(data['cls'])
+def report_otus(features, lda, class_names):
+    # --report_features: OTU 이름(8번째 단계)별 LDA 점수와 class (같은 OTU는 마지막 값)
+    out_data = defaultdict(list)
+    for feature, score, otu_class in zip(features, lda, class_names):
+        out_data[feature.split('.')[7].replace('_', '.')] = [score, otu_class]
+    print('OTU\tLDA_score\tCLass')
+    for i in out_data:
+        print('%s\t%s\t%s' % (i, out_data[i][0], out_data[i][1]))
+
+def feature_labels(features, n_scl, max_feature_len):
+    # 막대 라벨: 뒤에서부터 n_scl 단계만 표시, 너무 길면 가운데를 " [..]"로 줄임
+    labels = []
+    for feature in features:
+        rr = feature if n_scl < 0 else ".".join(feature.split(".")[-n_scl:])
+        if len(rr) > max_feature_len:
+            rr = rr[:max_feature_len // 2 - 2] + " [..]" + rr[-max_feature_len // 2 + 2:]
+        labels.append(rr)
+    return labels
+
+def row_order(data, params, bcl):
+    # 그림에 그려지는 순서 (가로: 두 class면 부호 있는 LDA 순, 그 외 class별 LDA 순 / 세로: class별 LDA 순)
+    lda = np.abs(data['lda'])
+    if params['orientation'] == 'v':
+        return np.argsort(lda / np.abs(data['log_max']).max() + (data['cls_code'] + 1), kind='stable')
     if bcl:
-        data['rows'].sort(key=lambda ab: fabs(float(ab[3])) * (cls.index(ab[2]) * 2 - 1))
-    else: 
-        mmax = max([fabs(float(a)) for a in list(zip(*list(data['rows'])))[3]])
-        data['rows'].sort(key=lambda ab: fabs(float(ab[3])) / mmax + (cls.index(ab[2]) + 1))
-    pos = arange(len(data['rows']))
+        return np.argsort(lda * (data['cls_code'] * 2 - 1), kind='stable')
+    return np.argsort(lda / lda.max() + (data['cls_code'] + 1), kind='stable')
+
+def hor_page(params, widths, bar_colors, labels, left_labels, legend, mv, max_score):
+    # 가로 막대 그림 한 장 (막대는 barh 한 번, 라벨은 미리 계산한 배열로 배치)
+    plt = load_pyplot()
+    from matplotlib.patches import Rectangle
+    pos = np.arange(len(widths))
     head = 0.75
     tail = 0.5
     ht = head + tail
@@ -71,50 +121,26 @@ def plot_histo_hor(path, params, data, bcl, report_features):
     fig = plt.figure(figsize=(params['width'], ints + ht), edgecolor=params['back_color'], facecolor=params['back_color'])
     ax = fig.add_subplot(111, frame_on=False, facecolor=params['back_color'])
     ls, rs = params['ls'], 1.0 - params['rs']
-    plt.subplots_adjust(left=ls, right=rs, top=1 - head * (1.0 - ints / (ints + ht)), bottom=tail * (1.0 - ints / (ints + ht)))
+    fig.subplots_adjust(left=ls, right=rs, top=1 - head * (1.0 - ints / (ints + ht)), bottom=tail * (1.0 - ints / (ints + ht)))
 
     fig.canvas.manager.set_window_title('LDA results')
 
     l_align = {'horizontalalignment': 'left', 'verticalalignment': 'baseline'}
     r_align = {'horizontalalignment': 'right', 'verticalalignment': 'baseline'}
-    added = []
-    m = 1 if data['rows'][0][2] == cls[0] else -1
-    out_data = defaultdict(list)  # keep track of which OTUs result in the plot
-    for i, v in enumerate(data['rows']):
-        if report_features:
-            otu = v[0].split('.')[7].replace('_', '.')
-            score = v[3]
-            otu_class = v[2]
-            out_data[otu] = [score, otu_class]
-        indcl = cls.index(v[2])
-        lab = str(v[2]) if str(v[2]) not in added else ""
-        added.append(str(v[2]))
-        col = colors[indcl % len(colors)]
-        if len(cls2) > 0:
-            col = colors[cls2.index(v[2]) % len(colors)]
-        vv = fabs(float(v[3])) * (m * (indcl * 2 - 1)) if bcl else fabs(float(v[3]))
-        # 히스토그램 외곽선 제거 (edgecolor 'none')
-        ax.barh(pos[i], vv, align='center', color=col, label=lab, height=0.8, edgecolor='none')
-    mv = max([abs(float(v[3])) for v in data['rows']])
-    if report_features:
-        print('OTU\tLDA_score\tCLass')
-        for i in out_data:
-            print('%s\t%s\t%s' % (i, out_data[i][0], out_data[i][1]))
-    for i, r in enumerate(data['rows']):
-        indcl = cls.index(data['rows'][i][2])
-        if params['n_scl'] < 0:
-            rr = r[0]
-        else:
-            rr = ".".join(r[0].split(".")[-params['n_scl']:])
-        if len(rr) > params['max_feature_len']:
-            rr = rr[:params['max_feature_len'] / 2 - 2] + " [..]" + rr[-params['max_feature_len'] / 2 + 2:]
+    # 히스토그램 외곽선 제거 (edgecolor 'none')
+    ax.barh(pos, widths, align='center', color=bar_colors, height=0.8, edgecolor='none')
+    # 라벨이 max_labels개를 넘으면 일정 간격으로 솎아서 표시
+    step = 1
+    if params['max_labels'] > 0:
+        step = max(1, int(ceil(len(pos) / float(params['max_labels']))))
+    for i in range(0, len(pos), step):
         # 박테리아 이름을 이탤릭체로 표시
-        if m * (indcl * 2 - 1) < 0 and bcl:
-            ax.text(mv / 40.0, float(i) - 0.3, rr, l_align,
+        if left_labels[i]:
+            ax.text(mv / 40.0, float(i) - 0.3, labels[i], l_align,
                     size=params['feature_font_size'], color=params['fore_color'],
                     fontstyle='italic', zorder=3)
         else:
-            ax.text(-mv / 40.0, float(i) - 0.3, rr, r_align,
+            ax.text(-mv / 40.0, float(i) - 0.3, labels[i], r_align,
                     size=params['feature_font_size'], color=params['fore_color'],
                     fontstyle='italic', zorder=3)
     ax.set_title(params['title'], size=params['title_font_size'], y=1.0 + head * (1.0 - ints / (ints + ht)) * 0.8, color=params['fore_color'])
@@ -123,15 +149,15 @@ def plot_histo_hor(path, params, data, bcl, report_features):
     ax.set_xlabel("LDA SCORE (log 10)")
     
     # --- 수정된 부분: x축 스케일 설정 (세로선 제거) ---
-    max_score = ceil(max([abs(float(v[3])) for v in data['rows']]))
     ax.set_xlim(-max_score, max_score)
-    ax.set_xticks(arange(-max_score, max_score + 1, 1))
+    ax.set_xticks(np.arange(-max_score, max_score + 1, 1))
     # x축 grid를 비활성화하여 검정색 세로선이 나타나지 않도록 함.
     ax.xaxis.grid(False)
     # ----------------------------------------------------------------------------
     
     ax.set_ylim((pos[0] - 1, pos[-1] + 1))
-    leg = ax.legend(bbox_to_anchor=(0., 1.02, 1., .102), loc=3, ncol=5, borderaxespad=0., frameon=False, prop={'size': params['class_legend_font_size']})
+    handles = [Rectangle((0, 0), 1, 1, facecolor=col, edgecolor='none', label=name) for name, col in legend]
+    leg = ax.legend(handles=handles, bbox_to_anchor=(0., 1.02, 1., .102), loc=3, ncol=5, borderaxespad=0., frameon=False, prop={'size': params['class_legend_font_size']})
 
     def get_col_attr(x):
         return hasattr(x, 'set_color') and not hasattr(x, 'set_facecolor')
@@ -139,19 +165,71 @@ def plot_histo_hor(path, params, data, bcl, report_features):
         o.set_color(params['fore_color'])
     for o in ax.findobj(get_col_attr):
         o.set_color(params['fore_color'])
+    return fig
 
-    plt.savefig(path, format=params['format'], facecolor=params['back_color'], edgecolor=params['fore_color'], dpi=params['dpi'])
-    plt.close()
+def plot_histo_hor(path, params, data, bcl):
+    plt = load_pyplot()
+    cls2 = []
+    if params['all_feats'] != "":
+        cls2 = sorted(params['all_feats'].split(":"))
+    cls = data['cls']
+    order = row_order(data, params, bcl)
+    features, codes, lda = data['feature'][order], data['cls_code'][order], np.abs(data['lda'][order])
+
+    # 막대 길이/색/라벨 위치를 배열로 한 번에 계산 (두 class면 첫 행 class가 왼쪽)
+    m = 1 if codes[0] == 0 else -1
+    side = m * (codes * 2 - 1)
+    widths = lda * side if bcl else lda
+    left_labels = (side < 0) & bcl
+    if len(cls2) > 0:
+        class_colors = [colors[cls2.index(c) % len(colors)] for c in cls]
+    else:
+        class_colors = [colors[i % len(colors)] for i in range(len(cls))]
+    bar_colors = np.asarray(class_colors, dtype=object)[codes]
+    labels = feature_labels(features, params['n_scl'], params['max_feature_len'])
+    mv = lda.max()
+    max_score = ceil(mv)
+
+    # page_size > 0이면 page_size개씩 나눠 여러 쪽으로 저장 (PDF는 한 파일, 그 외 형식은 _p1, _p2 ... 파일)
+    page_size = params['page_size'] if params['page_size'] > 0 else len(order)
+    starts = list(range(0, len(order), page_size))
+    save_args = dict(facecolor=params['back_color'], edgecolor=params['fore_color'], dpi=params['dpi'])
+
+    def page(start):
+        sl = slice(start, start + page_size)
+        # 범례: 이 쪽에 처음 나오는 순서대로 class
+        first = sorted(np.unique(codes[sl], return_index=True)[1])
+        legend = [(cls[codes[sl][i]], class_colors[codes[sl][i]]) for i in first]
+        return hor_page(params, widths[sl], bar_colors[sl], labels[sl], left_labels[sl], legend, mv, max_score)
+
+    if len(starts) == 1:
+        fig = page(0)
+        fig.savefig(path, format=params['format'], **save_args)
+        plt.close(fig)
+    elif params['format'] == 'pdf':
+        from matplotlib.backends.backend_pdf import PdfPages
+        with PdfPages(path) as pdf:
+            for start in starts:
+                fig = page(start)
+                pdf.savefig(fig, **save_args)
+                plt.close(fig)
+    else:
+        stem, ext = os.path.splitext(path)
+        for k, start in enumerate(starts):
+            fig = page(start)
+            fig.savefig("%s_p%d%s" % (stem, k + 1, ext), format=params['format'], **save_args)
+            plt.close(fig)
 
-def plot_histo_ver(path, params, data, report_features):
+def plot_histo_ver(path, params, data):
+    plt = load_pyplot()
     cls = data['cls']
-    mmax = max([fabs(float(a)) for a in zip(*data['rows'])[1]])
-    data['rows'].sort(key=lambda ab: fabs(float(ab[3])) / mmax + (cls.index(ab[2]) + 1))
-    pos = arange(len(data['rows'])) 
+    order = row_order(data, params, False)
+    features, codes, lda = data['feature'][order], data['cls_code'][order], np.abs(data['lda'][order])
+    pos = np.arange(len(order))
     if params['n_scl'] < 0:
-        nam = [d[0] for d in data['rows']]
+        nam = list(features)
     else:
-        nam = [d[0].split(".")[-min(d[0].count("."), params['n_scl'])] for d in data['rows']]
+        nam = [d.split(".")[-min(d.count("."), params['n_scl'])] for d in features]
     fig = plt.figure(edgecolor=params['back_color'], facecolor=params['back_color'], figsize=(params['width'], params['height'])) 
     ax = fig.add_subplot(111, facecolor=params['back_color'])
     plt.subplots_adjust(top=0.9, left=params['ls'], right=params['rs'], bottom=0.3) 
@@ -159,25 +237,14 @@ def plot_histo_ver(path, params, data, report_features):
     l_align = {'horizontalalignment': 'left', 'verticalalignment': 'baseline'}
     r_align = {'horizontalalignment': 'right', 'verticalalignment': 'baseline'} 
     added = []
-    out_data = defaultdict(list)
-    for i, v in enumerate(data['rows']):
-        if report_features:
-            otu = v[0].split('.')[7].replace('_', '.')
-            score = v[3]
-            otu_class = v[2]
-            out_data[otu] = [score, otu_class]
-        indcl = data['cls'].index(v[2])
-        lab = str(v[2]) if str(v[2]) not in added else ""
-        added.append(str(v[2])) 
+    for i, indcl in enumerate(codes):
+        lab = cls[indcl] if cls[indcl] not in added else ""
+        added.append(cls[indcl]) 
         col = colors[indcl % len(colors)]
-        vv = fabs(float(v[3]))
         # 막대 외곽선 제거
-        ax.bar(pos[i], vv, align='center', color=col, label=lab, edgecolor='none')
-    if report_features:
-        print('OTU\tLDA_score\tCLass')
-        for i in out_data:
-            print('%s\t%s\t%s' % (i, out_data[i][0], out_data[i][1]))
-    xticks(pos, nam, rotation=-20, ha='left', size=params['feature_font_size'])
+        ax.bar(pos[i], lda[i], align='center', color=col, label=lab, edgecolor='none')
+    ax.set_xticks(pos)
+    ax.set_xticklabels(nam, rotation=-20, ha='left', size=params['feature_font_size'])
     ax.set_title(params['title'], size=params['title_font_size'])
     ax.set_ylabel("LDA SCORE (log 10)")
     ax.yaxis.grid(True)
@@ -187,16 +254,44 @@ def plot_histo_ver(path, params, data, report_features):
     plt.savefig(path, format=params['format'], facecolor=params['back_color'], edgecolor=params['fore_color'], dpi=params['dpi'])
     plt.close() 
 
+def plot_file(input_file, output_file, params):
+    data = read_data(input_file, output_file, params['otu_only'])
+    if data is None:
+        return output_file
+    bcl = len(data['cls']) == 2
+    if params['report_features'] or params['report_only']:
+        order = row_order(data, params, bcl)
+        report_otus(data['feature'][order], data['lda_text'][order], [data['cls'][c] for c in data['cls_code'][order]])
+        if params['report_only']:
+            return output_file
+    if params['orientation'] == 'v':
+        plot_histo_ver(output_file, params, data)
+    else:
+        plot_histo_hor(output_file, params, data, bcl)
+    return output_file
+
+def plot_batch(input_files, output_dir, params, workers=1):
+    # 여러 .res 파일을 한 프로세스(또는 작은 프로세스 풀)에서 연속으로 그림 (import 비용은 프로세스당 한 번)
+    os.makedirs(output_dir, exist_ok=True)
+    output_files = [os.path.join(output_dir, os.path.splitext(os.path.basename(f))[0] + "." + params['format'])
+                    for f in input_files]
+    if workers > 1 and len(input_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(input_files))) as executor:
+            done = list(executor.map(plot_file, input_files, output_files, [params] * len(input_files)))
+    else:
+        done = [plot_file(i, o, params) for i, o in zip(input_files, output_files)]
+    for path in done:
+        print("Saved " + path)
+
 def plot_res():
     params = read_params(sys.argv)
     # 강제 배경 흰색 지정
     params['back_color'] = 'w'
     params['fore_color'] = 'w' if params['back_color'] == 'k' else 'k'
-    data = read_data(params['input_file'], params['output_file'], params['otu_only'])
-    if params['orientation'] == 'v':
-        plot_histo_ver(params['output_file'], params, data, params['report_features'])
+    if params['batch_output_dir']:
+        plot_batch(params['files'], params['batch_output_dir'], params, params['workers'])
     else:
-        plot_histo_hor(params['output_file'], params, data, len(data['cls']) == 2, params['report_features'])
+        plot_file(params['files'][0], params['files'][1], params)
 
 if __name__ == '__main__':
     plot_res()
@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 
-import os, sys, matplotlib, argparse, string
-matplotlib.use('Agg')
-from pylab import *
-from lefse.lefse import *
+import os, sys, argparse, string
 import numpy as np
 
 colors = ['r','g','b','m','c',[1.0,0.5,0.0],[0.0,1.0,0.0],[0.33,0.125,0.0],[0.75,0.75,0.75],'k']
 dark_colors = [[0.4,0.0,0.0],[0.0,0.2,0.0],[0.0,0.0,0.4],'m','c',[1.0,0.5,0.0],[0.0,1.0,0.0],[0.33,0.125,0.0],[0.75,0.75,0.75],'k']
 
+def load_pyplot():
+    # matplotlib는 그림을 그리기 직전에만 불러옴 (인자 확인, .res 파싱, 트리 구성은 matplotlib 없이 실행)
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
 class CladeNode:
     def __init__(self, name, abundance, viz=True):
         self.id = name
@@ -78,22 +82,25 @@ def read_params(args):
     args = parser.parse_args()
     return vars(args)
 
-def cmp_names(la,lb):
-    if len(la) != len(lb): return False
-    for a,b in zip(la,lb):
-        if a != b:
-            return False
-    return True
-
-def build_tree(father,all_nodes,l,depth,viz):
-    cc = [n for n in all_nodes if len(n.name) > len(father.name) and cmp_names(father.name,n.name[:len(father.name)])]
-    children = [n for n in cc if len(n.name) == len(father.name)+1]
+def index_children(all_nodes):
+    # 부모 이름(점으로 나눈 앞 단계들) → 자식 노드 목록 (all_nodes 순서 유지)
+    children_of = {}
+    for n in all_nodes:
+        children_of.setdefault(tuple(n.name[:-1]), []).append(n)
+    return children_of
+
+def build_tree(father,children_of,l,depth,viz):
+    # 자식은 이름 접두사 사전에서 바로 찾음 (노드마다 전체 후손을 비교하지 않으므로 clade 수에 선형)
+    # 같은 이름의 행이 여러 개면 자식 노드를 공유하므로, 이미 구성한 노드는 다시 내려가지 않음
+    if not father.isleaf:
+        return
+    children = list(children_of.get(tuple(father.name), []))
     if len(children) == 0 and l < depth -1:
         nc = CladeNode(father.id+"."+father.id.split(".")[-1],1.0,viz)
         father.add_child(nc)
         children.append(nc)
     for child in children:
-        build_tree(child,cc,l+1,depth,viz)
+        build_tree(child,children_of,l+1,depth,viz)
         father.add_child(child)
 
 def get_all_nodes(father):
@@ -104,15 +111,23 @@ def get_all_nodes(father):
     return ret
 
 def read_data(input_file,params):
+    # 각 행은 한 번만 나눔 (마지막 p-value 열 제외)
+    prefix = params['sub_clade']+"."
+    rows = []
     with open(input_file, 'r') as inp:
-        if params['sub_clade'] == "":
-            rows = [line.strip().split()[:-1] for line in inp.readlines()
-                    if params['max_lev'] < 1 or line.split()[0].count(".") < params['max_lev']]
-        else:
-            rows = [line.split(params['sub_clade']+".")[1].strip().split()[:-1]
-                    for line in inp.readlines()
-                    if (params['max_lev'] < 1 or line.split()[0].count(".") < params['max_lev'])
-                    and line.startswith(params['sub_clade']+".")]
+        for line in inp:
+            if params['sub_clade'] != "":
+                if not line.startswith(prefix):
+                    continue
+                fields = line.split()
+                if params['max_lev'] >= 1 and fields[0].count(".") >= params['max_lev']:
+                    continue
+                rows.append(line.split(prefix)[1].split()[:-1])
+            else:
+                fields = line.split()
+                if params['max_lev'] >= 1 and fields[0].count(".") >= params['max_lev']:
+                    continue
+                rows.append(fields[:-1])
     all_names = [lin[0] for lin in rows]
     abundances = [float(v) for v in list(zip(*rows))[1] if float(v) >= 0.0]
 
@@ -123,13 +138,14 @@ def read_data(input_file,params):
     all_nodes = [CladeNode("root."+row[0],float(row[1])) for row in rows]
 
     depth = max([len(n.name) for n in all_nodes])
-    n2 = ["_".join(nn.name) for nn in all_nodes]
+    # .res에 없는 상위 단계 노드 추가 (이미 있는 이름은 set으로 확인)
+    n2 = set("_".join(nn.name) for nn in all_nodes)
     for i, nn in enumerate(all_nodes):
         n = nn
         while "_".join(n.name[:-1]) not in n2 and len(n.name) > 1:
             n = CladeNode(".".join(n.name[:-1]), n.abundance)
             all_nodes.append(n)
-            n2.append("_".join(n.name))
+            n2.add("_".join(n.name))
 
     cls2 = []
     if params['all_feats'] != "":
@@ -149,17 +165,17 @@ def read_data(input_file,params):
 
     root = CladeNode("root",-1.0)
     root.set_pos((0.0,0.0))
-    build_tree(root, all_nodes, 0, depth, params['expand_void_lev']==1)
+    build_tree(root, index_children(all_nodes), 0, depth, params['expand_void_lev']==1)
 
     all_nodes = get_all_nodes(root)
     tree['root'] = root
     tree['max_abs'] = max(abundances) if abundances else 1.0
     tree['min_abs'] = min(abundances) if abundances else 0.0
 
-    levs = []
-    for i in range(depth):
-        depthi = [n for n in all_nodes if len(n.name) == i+1]
-        levs.append(len(depthi))
+    levs = [0] * depth
+    for n in all_nodes:
+        if len(n.name) <= depth:
+            levs[len(n.name)-1] += 1
     tree['nlev'] = levs
     return tree
 
@@ -187,28 +203,40 @@ def add_all_pos(father,n,distn,seps,tsep,mlev,last_leaf=-1,nc=1):
     tsep += seps[len(father.name)-1] if (len(father.name)-1)<len(seps) else 0
     return n,tsep,last_leaf
 
-def plot_points(father,params,pt_scale,ax):
+def collect_points(father,params,pt_scale,pts):
+    # 노드 점 좌표/크기/색을 그리는 순서대로 모음 (자식 먼저, 노란색(class 없음)은 abundance 큰 것부터)
     children = father.get_children()
     children.sort(key=lambda a: -int(a.get_color() == 'y')*a.abundance)
-    x,r = father.pos
     for child in children:
-        xc,rc = plot_points(child,params,pt_scale,ax)
+        collect_points(child,params,pt_scale,pts)
     if not father.viz:
-        return x,r
+        return
+    x,r = father.pos
     ps = pt_scale[0] + father.abundance/pt_scale[1] + pt_scale[0]
     col = father.get_color()
     pw = params['markeredgewidth'] if col == 'y' else params['markeredgewidth']*3.0
     if x==0 and r==0:
-        ax.plot(x,r, 'o', markersize=ps, color=col, markeredgewidth=0.01, markeredgecolor=params['fore_color'])
-    else:
-        ax.plot(x,r, 'o', markersize=ps, color=col, markeredgewidth=pw, markeredgecolor=params['fore_color'])
-    return x,r
+        pw = 0.01
+    pts.append((x,r,ps,col,pw))
 
-def plot_lines(father,params,depth,ax,xf):
+def plot_points(father,params,pt_scale,ax):
+    # 모든 노드를 scatter 한 번(PathCollection 하나)으로 그림, 크기는 markersize(지름)의 제곱
+    # 주의: Agg는 plot() 마커 위치를 픽셀 격자에 맞추지만 scatter 위치는 맞추지 않으므로
+    #       점 가장자리가 1픽셀 미만 어긋남 (dpi 100 합성 트리에서 이전 결과와 약 2% 픽셀 차이)
+    pts = []
+    collect_points(father,params,pt_scale,pts)
+    if len(pts) == 0:
+        return
+    xs, rs, ps, cols, pws = zip(*pts)
+    ax.scatter(xs, rs, s=np.square(ps), marker='o', facecolors=list(cols), edgecolors=params['fore_color'],
+               linewidths=pws, zorder=2)
+
+def collect_lines(father,params,depth,segs):
+    # 가지/형제 연결선을 (좌표, 색, 두께)로 그리는 순서대로 모음 (색이 있는 선은 바로 앞에 외곽선)
     children = father.get_children()
     x,r = father.pos
     for i,child in enumerate(children):
-        xc,rc = plot_lines(child,params,depth,ax,x)
+        xc,rc = collect_lines(child,params,depth,segs)
         if i == 0:
             x_first, r_first = xc, rc
         if len(father.name) >= depth-params['radial_start_lev']:
@@ -220,8 +248,8 @@ def plot_lines(father,params,depth,ax,xf):
                 col = child.get_color()
                 lw *=2.5
             if col != params['fore_color']:
-                ax.plot([x,xc],[r,rc],"-",color=params['fore_color'],lw=lw*1.5)
-            ax.plot([x,xc],[r,rc],"-",color=col,lw=lw)
+                segs.append(([(x,r),(xc,rc)],params['fore_color'],lw*1.5))
+            segs.append(([(x,r),(xc,rc)],col,lw))
     if not father.viz or (len(children) == 1 and not children[0].viz):
         return x,r
     if len(father.name) < depth-params['radial_start_lev']:
@@ -242,14 +270,25 @@ def plot_lines(father,params,depth,ax,xf):
                 rc = r
             xt = x if len(children) > 1 else xx
             if col != params['fore_color']:
-                ax.plot([x,xt],[r,rc],"-",color=params['fore_color'],lw=lw*1.5)
-            ax.plot([x,xt],[r,rc],"-",color=col,lw=lw)
+                segs.append(([(x,r),(xt,rc)],params['fore_color'],lw*1.5))
+            segs.append(([(x,r),(xt,rc)],col,lw))
     if len(children) > 0 and 1 < len(father.name) < depth-params['radial_start_lev']:
-        xs = arange(x_first, xc, 0.01)
-        ys = [rc for _ in xs]
-        ax.plot(xs, ys, "-", color=col, lw=params['siblings_connector_width'], markeredgecolor=params['fore_color'])
+        xs = np.arange(x_first, xc, 0.01)
+        if len(xs) > 1:
+            segs.append((np.column_stack([xs, np.full(len(xs), rc)]),col,params['siblings_connector_width']))
     return x,r
 
+def plot_lines(father,params,depth,ax,xf):
+    # 모든 선을 LineCollection 하나로 그림 (선 끝 모양은 plot()의 기본값과 같게)
+    from matplotlib.collections import LineCollection
+    segs = []
+    collect_lines(father,params,depth,segs)
+    if len(segs) == 0:
+        return
+    verts, cols, lws = zip(*segs)
+    ax.add_collection(LineCollection(verts, colors=list(cols), linewidths=lws,
+                                     capstyle='projecting', joinstyle='round', zorder=2))
+
 def uniqueid():
     # 축약 기호를 a, b, ..., z, a0, a1, ... 식으로 생성
     for ch in string.ascii_lowercase:
@@ -319,6 +358,7 @@ def plot_names(father,params,depth,ax,u_i,seps):
 ################# 여기서부터 핵심 수정 ####################
 
 def draw_tree(out_file, tree, params):
+    plt = load_pyplot()
     nlev = tree['nlev']
     pt_scale = (params['min_point_size'],
                 max(1.0,((tree['max_abs']-tree['min_abs']))
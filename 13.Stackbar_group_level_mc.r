@@ -31,8 +31,13 @@ for (pkg in required_packages) {
 }
 install_and_load("StackbarExtended", fromGithub = TRUE, ghrepo = "ThibaultCuisiniere/StackbarExtended")
 
+# 경로: 파이프라인 실행기(pipeline_runner.py)가 SPARTA_PATH_* 환경변수로 넘기면 그 값, 없으면 아래 기본값
+file_arg <- grep("^--file=", commandArgs(trailingOnly = FALSE), value = TRUE)
+repo_dir <- if (length(file_arg) > 0) dirname(sub("^--file=", "", file_arg[1])) else getwd()
+source(file.path(repo_dir, "pipeline_paths.r"))
+
 # 작업 폴더 설정
-cwd <- "/Users/inseonghwang/OneDrive/Sparta_300"
+cwd <- stage_path("cwd", "/Users/inseonghwang/OneDrive/Sparta_300")
 setwd(cwd)
 
 # 오류 발생 시 도움이 되는 디버깅 옵션 설정
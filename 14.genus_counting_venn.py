@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 import csv
 
+from feature_table import load_table
+from pipeline_paths import stage_path
+from transforms import transform_table
+
 def dedup(seq):
     seen = set()
     deduped = []
@@ -11,83 +15,42 @@ def dedup(seq):
     return deduped
 
 # 파일 경로 설정
-input_file = "/mnt/d/onedrive/sparta_300/07_collapse/genus_20FNS-flt2-RF.tsv"
-output_file = "/mnt/d/onedrive/sparta_300/07_collapse/genus_20FNS-flt2-RF-vdg.tsv"
-
-# 파일 전체 라인 읽기
-with open(input_file, 'r', newline='') as infile:
-    lines = infile.readlines()
+input_file = stage_path("input_file", "/mnt/d/onedrive/sparta_300/07_collapse/genus_20FNS-flt2-RF.tsv")
+output_file = stage_path("output_file", "/mnt/d/onedrive/sparta_300/07_collapse/genus_20FNS-flt2-RF-vdg.tsv")
 
-# 첫 줄이 "# "로 시작하는 설명문이면(단, "#OTU ID"는 taxonomy 컬럼이므로 유지) 제거
-if lines:
-    first_line = lines[0]
-    if first_line.startswith("# ") and not first_line.startswith("#OTU ID"):
-        lines = lines[1:]
+# 공용 로더로 feature table 읽기
+# (TSV: 첫 줄 "# " 설명문은 건너뛰고 "#OTU ID" 헤더 사용, 이후에는 바이너리 캐시 사용)
+# (.biom: sparse 행렬 그대로 사용, taxonomy는 observation metadata에서 가져옴)
+table = load_table(input_file)
 
-# TSV 파일을 csv.reader로 읽기
-reader = csv.reader(lines, delimiter='\t')
-rows = list(reader)
-
-if not rows:
+if table.shape[0] == 0:
     raise ValueError("파일에 데이터가 없습니다.")
 
-header = rows[0]
-
 # DQ_, MW_, TC_로 시작하는 샘플 컬럼의 인덱스 찾기
-dq_indices = [i for i, col in enumerate(header) if col.startswith("DQ_")]
-mw_indices = [i for i, col in enumerate(header) if col.startswith("MW_")]
-tc_indices = [i for i, col in enumerate(header) if col.startswith("TC_")]
-
-# taxonomy 정보는 첫 번째 컬럼(헤더가 "#OTU ID")에 있다고 가정
-tax_col_index = 0
-
-# 결과를 담을 리스트 초기화
-dq_list = []
-mw_list = []
-tc_list = []
-
-# 데이터 행 처리 (헤더 이후)
-for row in rows[1:]:
-    if len(row) <= tax_col_index:
-        continue
-    taxonomy_str = row[tax_col_index]
-    # 세미콜론으로 구분
-    tax_items = taxonomy_str.split(';')
-    # 6번째 아이템이 없으면 넘어감
-    if len(tax_items) < 6:
-        continue
-    # 6번째 아이템 추출 및 공백 제거
-    genus_field = tax_items[5].strip()
-    # 6번째 아이템이 "g__"로 시작하지 않거나, "g__" 또는 "__"만 있는 경우는 제외
-    if not genus_field.startswith("g__") or genus_field in ["g__", "__"]:
-        continue
-    # g__ 접두어 제거하여 genus 이름 추출
-    genus_name = genus_field.replace("g__", "", 1).strip()
-    
-    # 각 샘플 컬럼에 대해 RA 수치가 0이 아닌 경우 genus 이름을 해당 리스트에 추가
-    for i in dq_indices:
-        try:
-            if float(row[i]) != 0:
-                dq_list.append(genus_name)
-        except ValueError:
-            pass
-    for i in mw_indices:
-        try:
-            if float(row[i]) != 0:
-                mw_list.append(genus_name)
-        except ValueError:
-            pass
-    for i in tc_indices:
-        try:
-            if float(row[i]) != 0:
-                tc_list.append(genus_name)
-        except ValueError:
-            pass
-
-# 각 컬럼별로 중복되는 문자열 제거 (순서 유지)
-dq_list = dedup(dq_list)
-mw_list = dedup(mw_list)
-tc_list = dedup(tc_list)
+dq_indices = table.sample_indices("DQ_")
+mw_indices = table.sample_indices("MW_")
+tc_indices = table.sample_indices("TC_")
+
+# 공용 relative abundance 층 (transforms.transform_table 캐시, 09 heatmap과 공유)
+# TSS는 0인 칸을 그대로 두므로 존재 여부는 원본 count와 같다
+relative = transform_table(table, "tss")
+
+# 각 그룹에서 한 샘플이라도 0이 아닌 feature(행) 여부를 행렬 연산으로 한 번에 계산
+# (sparse 행렬이면 non-zero 개수만 확인)
+dq_present = relative.presence(dq_indices)
+mw_present = relative.presence(mw_indices)
+tc_present = relative.presence(tc_indices)
+
+# genus 이름 (taxonomy 정보는 "#OTU ID" 컬럼 또는 BIOM taxonomy metadata에 있음)
+# lineage 인덱스로 한 번에 조회, "g__" 또는 "__"처럼 genus가 비어 있는 행은 제외
+lineages = table.lineage_index
+genus_names = lineages.name("genus")
+has_genus = lineages.assigned("genus")
+
+# 해당 그룹의 샘플 중 RA 수치가 0이 아닌 genus만 모은 뒤 중복 제거 (순서 유지)
+dq_list = dedup(genus_names[has_genus & dq_present])
+mw_list = dedup(genus_names[has_genus & mw_present])
+tc_list = dedup(genus_names[has_genus & tc_present])
 
 # 세 개의 리스트 길이가 다를 수 있으므로 최대 길이에 맞춰 행 생성
 max_len = max(len(dq_list), len(mw_list), len(tc_list))
@@ -3,10 +3,13 @@
 
 import pandas as pd
 import numpy as np
-import re
 import os
 import sys
 
+from feature_table import load_table
+from lineage import lineage_index
+from pipeline_paths import stage_path
+
 def check_files_exist(taxonomy_file, feature_table_file):
     tax_exists = os.path.exists(taxonomy_file)
     feat_exists = os.path.exists(feature_table_file)
@@ -50,89 +53,38 @@ def read_taxonomy_file(taxonomy_file):
 def read_feature_table(feature_table_file):
     print(f"\n{feature_table_file} 파일 읽는 중...")
     
-    # 파일 먼저 검사
-    with open(feature_table_file, 'r') as file:
-        first_lines = [file.readline() for _ in range(5)]
-    
-    print("▶ Feature Table 파일 첫 몇 줄:")
-    for line in first_lines[:2]:
-        print(f"  {line.strip()}")
-    
-    # 헤더 라인 식별
-    header_line = 0
-    for i, line in enumerate(first_lines):
-        if '#OTU ID' in line or 'Feature ID' in line:
-            header_line = i
-            break
-    
-    print(f"▶ 헤더 라인 위치: 라인 {header_line}")
-    
-    # 파일 형식에 따라 파싱 방법 결정
-    try:
-        # 방법 1: pandas로 직접 읽기
-        feature_table = pd.read_csv(feature_table_file, sep='\t', skiprows=header_line)
-    except Exception as e:
-        print(f"표준 파싱 실패: {e}")
-        # 방법 2: 수동 파싱
+    # TSV는 첫 몇 줄 미리보기 (.biom HDF5, .fstore 폴더는 생략)
+    if os.path.isfile(feature_table_file) and not feature_table_file.endswith(".biom"):
         with open(feature_table_file, 'r') as file:
-            lines = file.readlines()[header_line:]
-        
-        header = lines[0].strip().split('\t')
-        data = []
-        for line in lines[1:]:
-            values = line.strip().split('\t')
-            if len(values) > 1:
-                row = {header[i]: values[i] for i in range(min(len(header), len(values)))}
-                data.append(row)
+            first_lines = [file.readline() for _ in range(5)]
         
-        feature_table = pd.DataFrame(data)
+        print("▶ Feature Table 파일 첫 몇 줄:")
+        for line in first_lines[:2]:
+            print(f"  {line.strip()}")
+    
+    # 공용 로더로 파싱
+    # (TSV: 첫 실행 후에는 바이너리 캐시를 memory-map으로 읽음, .biom: sparse 행렬로 읽음,
+    #  .fstore: feature_store.py로 만든 memory-map 저장소에서 행 합계만 chunk 단위로 계산)
+    feature_table = load_table(feature_table_file)
     
-    print(f"▶ Feature Table 형태: {feature_table.shape}")
+    print(f"▶ Feature Table 형태: {feature_table.shape} (sparse: {feature_table.is_sparse})")
     
     # 첫 번째 열 이름 식별
-    feature_id_col = feature_table.columns[0]
+    feature_id_col = feature_table.id_column
     print(f"  Feature Table 첫 열 이름: {feature_id_col}")
     print("  Feature Table 샘플 데이터:")
-    print(feature_table.head(1))
+    print(f"  {feature_table.feature_ids[:1].tolist()} × {feature_table.sample_ids[:5].tolist()}")
     
     return feature_table, feature_id_col
 
 def process_feature_table(feature_table, feature_id_col):
     # 빈도 데이터프레임 생성
-    # 첫 번째 열을 Feature ID로, 나머지 열의 합계를 Total Frequency로
-    try:
-        # 숫자 열만 선택하여 합계 계산
-        numeric_cols = feature_table.columns[1:]
-        feature_table[numeric_cols] = feature_table[numeric_cols].apply(pd.to_numeric, errors='coerce')
-        
-        frequency_df = pd.DataFrame({
-            'FeatureID': feature_table[feature_id_col],
-            'TotalFrequency': feature_table[numeric_cols].sum(axis=1)
-        })
-    except Exception as e:
-        print(f"빈도 계산 오류: {e}")
-        # 대안적 방법
-        print("대안적 빈도 계산 시도 중...")
-        
-        # 첫 번째 열을 제외한 모든 열을 문자열 -> 숫자로 변환
-        sample_cols = feature_table.columns[1:]
-        frequency_data = []
-        
-        for _, row in feature_table.iterrows():
-            feature_id = row[feature_id_col]
-            frequencies = []
-            
-            for col in sample_cols:
-                try:
-                    val = float(row[col])
-                    frequencies.append(val)
-                except:
-                    frequencies.append(0)
-            
-            total_freq = sum(frequencies)
-            frequency_data.append({'FeatureID': feature_id, 'TotalFrequency': total_freq})
-        
-        frequency_df = pd.DataFrame(frequency_data)
+    # Feature ID별로 모든 샘플 열의 합계를 Total Frequency로
+    # (dense 변환 없이 행렬에서 바로 행 합계 계산)
+    frequency_df = pd.DataFrame({
+        'FeatureID': feature_table.feature_ids.rename(None),
+        'TotalFrequency': feature_table.row_sums()
+    })
     
     print(f"▶ 빈도 데이터프레임 형태: {frequency_df.shape}")
     print("  빈도 데이터프레임 샘플:")
@@ -218,27 +170,18 @@ def extract_genus(merged_df, taxon_col='Taxon'):
     if len(merged_df) == 0:
         return pd.DataFrame()
     
-    # Taxon 열에서 Genus 추출
-    def extract_genus_from_taxon(taxon):
-        try:
-            # QIIME2 형식 (d__Bacteria; p__Firmicutes; c__Bacilli; o__Lactobacillales; f__Streptococcaceae; g__Streptococcus)
-            if ';' in taxon:
-                genus_match = re.search(r'g__([^;]+)', taxon)
-                if genus_match:
-                    return genus_match.group(1).strip()
-            
-            # 또는 다른 형식 (Bacteria;Firmicutes;Bacilli;Lactobacillales;Streptococcaceae;Streptococcus)
-            parts = taxon.split(';')
-            if len(parts) >= 6:
-                return parts[5].strip()
-            
-            return "Unknown"
-        except:
-            return "Unknown"
+    # Taxon 열에서 Genus 추출 (lineage 인덱스: 서로 다른 Taxon 문자열만 한 번 파싱)
+    # - QIIME2 형식 (d__Bacteria; p__Firmicutes; ...; g__Streptococcus) → 'Streptococcus'
+    # - 접두어 없는 형식 (Bacteria;Firmicutes;...;Streptococcus) → 6번째 항목
+    # - genus 이름이 비어 있으면 token 원문('g__'), genus rank가 없으면 'Unknown'
+    lineages = lineage_index(merged_df[taxon_col])
+    genus = pd.Series(lineages.name("genus"), index=merged_df.index)
+    token = pd.Series(lineages.token("genus"), index=merged_df.index)
+    genus = genus.where(genus != "", token.where(token != "", "Unknown"))
     
     genus_df = pd.DataFrame({
         'Taxon': merged_df[taxon_col],
-        'Genus': merged_df[taxon_col].apply(extract_genus_from_taxon)
+        'Genus': genus
     })
     
     print("추출된 Genus 샘플:")
@@ -294,9 +237,9 @@ def save_results(selected_asvs, output_file):
 
 def main():
     # 절대 경로 사용
-    taxonomy_file = "/mnt/d/OneDrive/Sparta_300/10_phylo/taxa_20FNS/taxonomy.tsv"
-    feature_table_file = "/mnt/d/OneDrive/Sparta_300/10_phylo/table_20FNS-flt3/genus_20FNS_feature_table.tsv"
-    output_file = "/mnt/d/OneDrive/Sparta_300/10_phylo/taxa_20FNS-flt3/selected_ASVs.txt"
+    taxonomy_file = stage_path("taxonomy_file", "/mnt/d/OneDrive/Sparta_300/10_phylo/taxa_20FNS/taxonomy.tsv")
+    feature_table_file = stage_path("feature_table_file", "/mnt/d/OneDrive/Sparta_300/10_phylo/table_20FNS-flt3/genus_20FNS_feature_table.tsv")
+    output_file = stage_path("output_file", "/mnt/d/OneDrive/Sparta_300/10_phylo/taxa_20FNS-flt3/selected_ASVs.txt")
 
     
     # 파일 존재 확인
@@ -6,6 +6,8 @@ from Bio import SeqIO
 from Bio.SeqRecord import SeqRecord
 from Bio.Seq import Seq
 
+from pipeline_paths import stage_path
+
 def read_mapping_file(mapping_file):
     """메타데이터 파일에서 ASV ID와 Genus 매핑 정보 읽기"""
     mapping_df = pd.read_csv(mapping_file, sep='\t')
@@ -27,9 +29,9 @@ def rename_fasta_headers(input_fasta, output_fasta, id_to_genus):
 
 def main():
     # 파일 경로 설정
-    mapping_file = "/mnt/d/OneDrive/Sparta_300/10_phylo/taxa_20FNS-flt2/selected_ASVs.txt"
-    input_fasta = "/mnt/d/OneDrive/Sparta_300/10_phylo/rep-seqs_20FNS-flt2/genus-repseq_exported/dna-sequences.fasta"
-    output_fasta = "/mnt/d/OneDrive/Sparta_300/10_phylo/rep-seqs_20FNS-flt2/genus-repseq_exported/dna-sequences_genus_mapped.fasta"
+    mapping_file = stage_path("mapping_file", "/mnt/d/OneDrive/Sparta_300/10_phylo/taxa_20FNS-flt2/selected_ASVs.txt")
+    input_fasta = stage_path("input_fasta", "/mnt/d/OneDrive/Sparta_300/10_phylo/rep-seqs_20FNS-flt2/genus-repseq_exported/dna-sequences.fasta")
+    output_fasta = stage_path("output_fasta", "/mnt/d/OneDrive/Sparta_300/10_phylo/rep-seqs_20FNS-flt2/genus-repseq_exported/dna-sequences_genus_mapped.fasta")
     # ASV ID -> Genus 매핑 읽기
     print("매핑 파일 읽는 중...")
     id_to_genus = read_mapping_file(mapping_file)
@@ -1,12 +1,18 @@
 # Description: OTU 테이블에서 분류학적 정보를 추출하여 CSV 파일로 저장하고, 원본 파일을 CSV로 변환하며 첫 열을 추출된 OTU로 대체한 후 전치된 파일을 생성하는 스크립트. 전치는 필요할 경우에만 사용.
 
+import itertools
+from collections import deque
+import numpy as np
 import pandas as pd
-import re
 import os
 
+from lineage import RANKS, LineageIndex
+from pipeline_paths import stage_path
+from table_transpose import transpose_table
+
 # 기본 디렉토리 경로 한 번만 설정
-base_dir = '/Users/inseonghwang/OneDrive/Sparta_300/07_collapse/biom_genus_flt1'
-base_filename = 'genus_20FNS-flt1'
+base_dir = stage_path("base_dir", '/Users/inseonghwang/OneDrive/Sparta_300/07_collapse/biom_genus_flt1')
+base_filename = stage_path("base_filename", 'genus_20FNS-flt1')
 
 # 파일 경로 자동 생성
 input_file = os.path.join(base_dir, f"{base_filename}.tsv")
@@ -14,6 +20,35 @@ output_taxonomy_file = os.path.join(base_dir, f"{base_filename}-taxa-only.csv")
 output_converted_file = os.path.join(base_dir, f"{base_filename}.csv")
 output_transposed_file = os.path.join(base_dir, f"{base_filename}_transposed.csv")
 
+# True: 입력 TSV를 한 번만 읽으면서 taxa-only CSV와 변환 CSV를 동시에 작성 (대용량 테이블용)
+# False: 기존 방식 (파일 전체를 읽어서 단계별로 처리)
+streaming = True
+stream_chunk_rows = 10000  # 스트리밍 모드에서 한 번에 처리할 행 수
+# True: 전치 파일을 열 타일 단위로 만듦 (메모리보다 큰 테이블용, table_transpose.py)
+# False: pandas로 전체를 읽어서 .T
+blocked_transpose = True
+
+TAXONOMY_LEVELS = ['Domain', 'Phylum', 'Class', 'Order', 'Family', 'Genus']
+
+# 분류학적 정보 추출 (lineage 인덱스: 서로 다른 lineage만 한 번 파싱, rank별 이름은 배열 조회)
+def taxonomy_frame(otu_ids):
+    lineages = LineageIndex(otu_ids)
+    taxonomy_info = {level: lineages.name(rank) for level, rank in zip(TAXONOMY_LEVELS, RANKS)}
+
+    # Genus 정보는 숫자나 공백 이전까지의 문자열만 사용
+    genus = pd.Series(taxonomy_info['Genus'], dtype=object)
+    taxonomy_info['Genus'] = genus.str.split().str[0].fillna("").to_numpy(dtype=object)
+
+    # g__가 없는 경우에도 행을 유지하며, #TAXONOMY 열에는
+    # "Unclassified_[가장 낮은 분류학적 수준]"(없으면 "Unclassified_Unknown")으로 표시
+    genus_labels = ("g__" + pd.Series(taxonomy_info['Genus'], dtype=object)).to_numpy(dtype=object)
+    labels = np.where(taxonomy_info['Genus'] != "", genus_labels, lineages.unclassified_labels("genus"))
+    return pd.DataFrame({"#TAXONOMY": labels, **taxonomy_info})
+
+# CSV 형식으로 한 행 쓰기 (쉼표가 포함된 항목은 따옴표로 감싸기)
+def csv_line(row):
+    return ','.join(f'"{item}"' if ',' in item else item for item in row) + '\n'
+
 # 1. 먼저 taxonomy 정보 추출하여 저장
 def extract_taxonomy():
     print(f"Step 1: Extracting taxonomy information from {input_file}")
@@ -28,81 +63,19 @@ def extract_taxonomy():
                 parts = line.strip().split('\t')
                 otu_ids.append(parts[0])
 
-    # 분류학적 정보 추출 함수
-    def extract_taxonomy_levels(otu_id):
-        # 정규식으로 각 분류 수준 추출
-        domain_match = re.search(r'd__([^;]+)', otu_id)
-        phylum_match = re.search(r'p__([^;]+)', otu_id)
-        class_match = re.search(r'c__([^;]+)', otu_id)
-        order_match = re.search(r'o__([^;]+)', otu_id)
-        family_match = re.search(r'f__([^;]+)', otu_id)
-        genus_match = re.search(r'g__([^;]+)', otu_id)
-        
-        # 매치된 결과에서 그룹 추출 또는 빈 문자열 처리
-        domain = domain_match.group(1) if domain_match else ""
-        phylum = phylum_match.group(1) if phylum_match else ""
-        class_ = class_match.group(1) if class_match else ""
-        order = order_match.group(1) if order_match else ""
-        family = family_match.group(1) if family_match else ""
-        
-        # Genus 정보 추출 (숫자나 공백 이전까지의 문자열만)
-        genus = ""
-        if genus_match:
-            genus_full = genus_match.group(1)
-            genus = genus_full.split()[0] if ' ' in genus_full else genus_full
-        
-        return {
-            "Domain": domain,
-            "Phylum": phylum,
-            "Class": class_,
-            "Order": order,
-            "Family": family,
-            "Genus": genus
-        }
-
-    # 데이터 추출
-    data = []
-    for otu_id in otu_ids[1:]:  # 첫 번째 줄(헤더)은 건너뜀
-        taxonomy_info = extract_taxonomy_levels(otu_id)
-        
-        # g__가 없는 경우에도 행을 유지하며, 적절한 대체값 사용
-        if taxonomy_info['Genus'] == "":
-            taxonomy_level = "Unknown"
-            # 가장 낮은 수준의 분류학적 정보를 찾아 대체값 결정
-            if taxonomy_info['Family']:
-                taxonomy_level = f"f__{taxonomy_info['Family']}"
-            elif taxonomy_info['Order']:
-                taxonomy_level = f"o__{taxonomy_info['Order']}"
-            elif taxonomy_info['Class']:
-                taxonomy_level = f"c__{taxonomy_info['Class']}"
-            elif taxonomy_info['Phylum']:
-                taxonomy_level = f"p__{taxonomy_info['Phylum']}"
-            elif taxonomy_info['Domain']:
-                taxonomy_level = f"d__{taxonomy_info['Domain']}"
-            
-            # #TAXONOMY 열에는 "Unclassified_[가장 낮은 분류학적 수준]"으로 표시
-            data.append({
-                "#TAXONOMY": f"Unclassified_{taxonomy_level}",
-                **taxonomy_info
-            })
-        else:
-            data.append({
-                "#TAXONOMY": f"g__{taxonomy_info['Genus']}",
-                **taxonomy_info
-            })
-
-    # DataFrame 생성 및 저장
-    df = pd.DataFrame(data)
+    df = taxonomy_frame(otu_ids[1:])  # 첫 번째 줄(헤더)은 건너뜀
+
+    # DataFrame 저장
     df.to_csv(output_taxonomy_file, index=False)
 
     print(f"Taxonomy data extracted and saved to {output_taxonomy_file}")
-    print(f"Total records: {len(data)}")
+    print(f"Total records: {len(df)}")
     
     # 각 분류 수준별 레코드 수 확인
     print("\nTaxonomy level counts:")
-    for level in ['Domain', 'Phylum', 'Class', 'Order', 'Family', 'Genus']:
+    for level in TAXONOMY_LEVELS:
         valid_count = df[df[level] != ''].shape[0]
-        print(f"{level}: {valid_count} valid entries ({valid_count/len(data)*100:.1f}%)")
+        print(f"{level}: {valid_count} valid entries ({valid_count/len(df)*100:.1f}%)")
     
     return df
 
@@ -133,25 +106,97 @@ def convert_to_csv(taxonomy_df):
                 row[0] = taxonomy_column[i]
             
             # CSV 형식으로 쓰기 (따옴표 처리 포함)
-            csv_row = []
-            for item in row:
-                # 쉼표가 포함된 항목은 따옴표로 감싸기
-                if ',' in item:
-                    csv_row.append(f'"{item}"')
-                else:
-                    csv_row.append(item)
-            
-            out_file.write(','.join(csv_row) + '\n')
+            out_file.write(csv_line(row))
     
     print(f"Original file converted to CSV with modified first column: {output_converted_file}")
-    
-    # 변환된 파일 미리보기
+    preview_converted()
+    return write_transposed()
+
+# 1+2. 스트리밍 모드: 입력 TSV를 한 번만 읽으면서 두 CSV를 동시에 작성
+def extract_and_convert_streaming(chunk_rows=stream_chunk_rows):
+    """
+    stream_chunk_rows 행씩 읽어서 taxonomy를 추출하고, taxa-only CSV와 변환 CSV에 바로 기록.
+
+    기존 방식과 같은 결과를 만든다.
+      - taxonomy는 '#OTU ID' 또는 'd__'로 시작하는 줄에서 추출 (그중 첫 줄은 헤더로 보고 건너뜀)
+      - 변환 CSV는 헤더 다음 k번째 줄의 첫 열을 k번째 #TAXONOMY 라벨로 대체 (줄 위치 기준)
+    라벨이 아직 나오지 않은 줄만 대기열에 두므로, 메모리에는 현재 chunk와 대기 중인 줄,
+    분류 수준별 카운트만 유지하고 #TAXONOMY 라벨 열만 모아서 반환한다.
+    """
+    print(f"Step 1-2 (streaming): Extracting taxonomy and converting {input_file} in one pass")
+    valid_counts = dict.fromkeys(TAXONOMY_LEVELS, 0)
+    labels = []
+    pending_rows = deque()   # 아직 대체할 라벨이 나오지 않은 데이터 행
+    pending_labels = deque() # 아직 대체에 쓰지 않은 라벨
+
+    with open(input_file, 'r') as infile, \
+            open(output_taxonomy_file, 'w') as taxa_out, \
+            open(output_converted_file, 'w') as csv_out:
+        # 헤더의 첫 번째 열을 "#NAME"으로 변경
+        first_line = infile.readline()
+        header = first_line.strip().split('\t')
+        header[0] = "#NAME"
+        csv_out.write(','.join(header) + '\n')
+        # 첫 줄이 헤더('#OTU ID'/'d__')가 아니면 이후 처음 나오는 그런 줄을 헤더로 보고 건너뜀
+        skip_otu_header = not first_line.startswith(('#OTU ID', 'd__'))
+
+        while True:
+            lines = list(itertools.islice(infile, chunk_rows))
+            if not lines:
+                break
+            otu_ids = []
+            for line in lines:
+                if line.startswith(('#OTU ID', 'd__')):
+                    if skip_otu_header:
+                        skip_otu_header = False
+                        continue
+                    otu_ids.append(line.strip().split('\t')[0])
+            df = taxonomy_frame(otu_ids)
+            df.to_csv(taxa_out, index=False, header=taxa_out.tell() == 0)
+
+            # 분류 수준별 유효 레코드 수 누적
+            for level in TAXONOMY_LEVELS:
+                valid_counts[level] += int((df[level] != '').sum())
+
+            # 줄 위치 순서대로 첫 번째 열을 taxonomy 정보로 대체하여 쓰기
+            pending_rows.extend(line.strip().split('\t') for line in lines)
+            pending_labels.extend(df['#TAXONOMY'])
+            while pending_rows and pending_labels:
+                row = pending_rows.popleft()
+                row[0] = pending_labels.popleft()
+                csv_out.write(csv_line(row))
+            labels.extend(df['#TAXONOMY'])
+
+        # 라벨 수보다 많은 나머지 줄은 그대로 쓰기
+        csv_out.writelines(csv_line(row) for row in pending_rows)
+
+    total = len(labels)
+    print(f"Taxonomy data extracted and saved to {output_taxonomy_file}")
+    print(f"Total records: {total}")
+    print("\nTaxonomy level counts:")
+    for level in TAXONOMY_LEVELS:
+        print(f"{level}: {valid_counts[level]} valid entries ({valid_counts[level]/max(total, 1)*100:.1f}%)")
+
+    print(f"Original file converted to CSV with modified first column: {output_converted_file}")
+    preview_converted()
+    return labels
+
+# 변환된 파일 미리보기 (앞 5행만 읽음)
+def preview_converted():
     preview_df = pd.read_csv(output_converted_file, nrows=5)
     print("\nPreview of the converted CSV file:")
     print(preview_df.head())
-    
-    # 3. 전치된 파일 생성
+
+# 3. 전치된 파일 생성
+def write_transposed():
     print("\nStep 3: Creating transposed version of the CSV file")
+    if blocked_transpose:
+        transpose_table(output_converted_file, output_transposed_file)
+        print(f"Transposed file created and saved to {output_transposed_file}")
+        print("\nPreview of the transposed CSV file:")
+        print(pd.read_csv(output_transposed_file, index_col=0, nrows=5))
+        return None
+
     transposed_df = pd.read_csv(output_converted_file, index_col=0).T
     
     # 전치된 DataFrame에서 인덱스 이름 설정 (이전 컬럼 이름이 인덱스가 됨)
@@ -173,11 +218,16 @@ def main():
         print(f"Error: Input file not found at {input_file}")
         return
     
-    # 1. Taxonomy 추출 및 저장
-    taxonomy_df = extract_taxonomy()
-    
-    # 2. TSV를 CSV로 변환하면서 첫 열 대체 및 전치 파일 생성
-    transposed_df = convert_to_csv(taxonomy_df)
+    if streaming:
+        # 1+2. 입력을 한 번만 읽으면서 taxonomy 추출과 CSV 변환을 동시에 수행, 이후 전치 파일 생성
+        extract_and_convert_streaming()
+        write_transposed()
+    else:
+        # 1. Taxonomy 추출 및 저장
+        taxonomy_df = extract_taxonomy()
+        
+        # 2. TSV를 CSV로 변환하면서 첫 열 대체 및 전치 파일 생성
+        transposed_df = convert_to_csv(taxonomy_df)
     
     print("\nProcess completed successfully. Three files created:")
     print(f"1. Taxonomy file: {output_taxonomy_file}")
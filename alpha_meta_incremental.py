@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+alpha_meta_combined.tsv 증분 갱신 모듈
+
+출력 파일 옆에 `<출력파일>.provenance.json`을 두고 다음 정보를 기록한다.
+  - columns          : 메트릭 컬럼 → 해당 컬럼을 만든 아티팩트 키 (UUID + payload 체크섬)
+  - metadata_sha1    : 병합에 사용한 메타데이터 파일의 sha1 (메타데이터 revision)
+  - metadata_rows    : sample.id → 메타데이터 행 해시
+  - affected_subjects: 값이 바뀌었지만 03 스크립트가 아직 다시 필터링하지 않은 subject 목록
+
+증분 모드에서는 아티팩트 키가 바뀐 메트릭 컬럼과, 메타데이터 행이 바뀌었거나
+새로 생긴 샘플 행만 기존 출력에 덮어쓴다.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from metadata import load_metadata
+from qza_reader import artifact_key, metric_name_from_path
+
+PROVENANCE_SUFFIX = ".provenance.json"
+
+
+def provenance_path(output_path):
+    return output_path + PROVENANCE_SUFFIX
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _metadata_row_hashes(metadata):
+    """sample.id → 메타데이터 행 전체(컬럼 이름 포함)의 sha1"""
+    header = "\t".join(metadata.columns)
+    hashes = {}
+    for row in metadata.astype(str).itertuples(index=False):
+        text = header + "\n" + "\t".join(row)
+        hashes[row[0]] = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    return hashes
+
+
+def read_provenance(output_path):
+    path = provenance_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def write_provenance(output_path, column_keys, metadata_file, metadata, affected_subjects):
+    """출력 파일의 컬럼/행 출처 기록"""
+    provenance = {
+        "columns": column_keys,
+        "metadata_sha1": file_sha1(metadata_file),
+        "metadata_rows": _metadata_row_hashes(metadata),
+        "affected_subjects": sorted(str(s) for s in affected_subjects),
+    }
+    with open(provenance_path(output_path), "w", encoding="utf-8") as fh:
+        json.dump(provenance, fh, ensure_ascii=False, indent=1)
+
+
+def clear_affected_subjects(output_path):
+    """03 스크립트가 변경된 subject를 반영한 뒤 호출 (pending 목록 비우기)"""
+    provenance = read_provenance(output_path)
+    provenance["affected_subjects"] = []
+    with open(provenance_path(output_path), "w", encoding="utf-8") as fh:
+        json.dump(provenance, fh, ensure_ascii=False, indent=1)
+
+
+def artifact_keys(qza_paths):
+    """
+    메트릭 이름 → 아티팩트 키 (zip 중앙 디렉터리와 metadata.yaml만 읽음)
+
+    손상되었거나 zip이 아닌 파일은 전체 재생성 모드의 process_qza처럼 오류만 출력하고 건너뛴다.
+    """
+    keys = {}
+    for path in qza_paths:
+        try:
+            keys[metric_name_from_path(path)] = artifact_key(path, "alpha")
+        except Exception as e:
+            print(f"[ERROR] {path} 처리 실패: {str(e)}")
+    return keys
+
+
+def _subjects(df, sample_ids):
+    if 'subject' not in df.columns or len(sample_ids) == 0:
+        return set()
+    return set(df.loc[df.index.intersection(sample_ids), 'subject'].dropna())
+
+
+def update_alpha_meta(output_path, qza_paths, metadata_file, read_vectors):
+    """
+    기존 alpha_meta_combined.tsv에 바뀐 메트릭 컬럼과 샘플 행만 반영
+
+    Args:
+        output_path (str): 기존 alpha_meta_combined.tsv 경로 (provenance 파일 필요)
+        qza_paths (list): 현재 *_vector.qza 경로 목록
+        metadata_file (str): 메타데이터 TSV 경로
+        read_vectors (callable): qza 경로 목록 → ['sample.id', metric] DataFrame 목록
+
+    Returns:
+        (DataFrame, set): 갱신된 전체 테이블, 값이 바뀐 subject 집합
+    """
+    provenance = read_provenance(output_path)
+    old_df = pd.read_csv(output_path, sep='\t').set_index('sample.id')
+    old_keys = provenance["columns"]
+    new_keys = artifact_keys(qza_paths)
+    # 키를 읽지 못한 파일의 메트릭은 읽기 실패와 같이 기존 컬럼과 키를 유지 (다음 실행에서 다시 시도)
+    for path in qza_paths:
+        metric = metric_name_from_path(path)
+        if metric not in new_keys and metric in old_keys:
+            new_keys[metric] = old_keys[metric]
+
+    changed_metrics = [m for m, key in new_keys.items() if old_keys.get(m) != key]
+    removed_metrics = [m for m in old_keys if m not in new_keys]
+    metrics = [m for m in old_keys if m in new_keys] + [m for m in new_keys if m not in old_keys]
+
+    df = old_df.drop(columns=removed_metrics)
+    affected = set(old_df.index) if removed_metrics else set()
+
+    # (1) 바뀐 메트릭 컬럼만 다시 읽어서 교체 (새 샘플은 행으로 추가됨)
+    changed_paths = [p for p in qza_paths if metric_name_from_path(p) in changed_metrics]
+    frames = [v.set_index('sample.id') for v in read_vectors(changed_paths)] if changed_paths else []
+    if frames:
+        vectors = pd.concat(frames, axis=1, join='outer')
+        df = df.reindex(df.index.union(vectors.index, sort=False))
+        for metric in vectors.columns:
+            before = old_df[metric].reindex(df.index) if metric in old_df.columns else None
+            df[metric] = vectors[metric].reindex(df.index)
+            if before is None:
+                affected.update(df.index[df[metric].notna()])
+            else:
+                diff = ~((before == df[metric]) | (before.isna() & df[metric].isna()))
+                affected.update(df.index[diff])
+
+    # 읽기에 실패한 메트릭은 기존 컬럼과 키를 유지 (다음 실행에서 다시 시도)
+    read_metrics = set(vectors.columns) if frames else set()
+    for metric in changed_metrics:
+        if metric not in read_metrics:
+            if metric in old_keys:
+                new_keys[metric] = old_keys[metric]
+            else:
+                new_keys.pop(metric)
+                metrics.remove(metric)
+
+    # 어떤 메트릭에도 값이 없는 샘플 행은 제거 (전체 재생성 결과와 동일하게)
+    empty_rows = df.index[df[metrics].isna().all(axis=1)]
+    affected.update(empty_rows)
+    df = df.drop(index=empty_rows)
+
+    # (2) 메타데이터 revision이 바뀌었거나 새 샘플이 생긴 행만 메타데이터 다시 병합
+    metadata = load_metadata(metadata_file)
+    meta_cols = [c for c in metadata.columns if c != 'sample.id']
+    new_rows = set(df.index) - set(old_df.index)
+    if provenance["metadata_sha1"] != file_sha1(metadata_file):
+        old_hashes = provenance["metadata_rows"]
+        new_hashes = _metadata_row_hashes(metadata)
+        new_rows |= {s for s in df.index if old_hashes.get(s) != new_hashes.get(s)}
+    rows = [s for s in df.index if s in new_rows]
+    patch = metadata.drop_duplicates('sample.id').set_index('sample.id').reindex(rows)
+    keep = df.index.difference(rows, sort=False)
+    meta_part = pd.concat([old_df.reindex(columns=meta_cols).loc[keep], patch[meta_cols]])
+    df = pd.concat([df[metrics], meta_part.reindex(df.index)], axis=1)
+    affected.update(rows)
+
+    df.index.name = 'sample.id'
+    final_df = df.reset_index()
+
+    affected_subjects = _subjects(old_df, affected) | _subjects(df, affected)
+    # 03 스크립트가 아직 반영하지 않은 이전 변경분도 함께 유지
+    pending = affected_subjects | set(provenance.get("affected_subjects", []))
+    write_provenance(output_path, new_keys, metadata_file, metadata, pending)
+    return final_df, affected_subjects
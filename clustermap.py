@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+대형 행렬용 clustermap 헬퍼
+
+sns.clustermap은 호출할 때마다 행/열 계층적 군집을 다시 계산하고, 모든 셀을 벡터로 그린다.
+여기서는 다음 두 가지를 분리한다.
+
+  1. linkage 캐시
+     - float32 condensed 거리(pdist)에서 linkage 계산
+     - 행렬 내용 해시 + method + metric을 키로 메모리(최근 MEMORY_CACHE_SIZE개, LRU)/디스크
+       (~/.cache/sparta_300/linkage)에 저장
+     - 색상, 크기 등 스타일만 바꿔 다시 그릴 때는 군집 계산 없이 재사용
+  2. rasterized 렌더링
+     - 셀 수가 raster_cells 이상이면 heatmap mesh를 래스터 이미지로 저장 (PDF 크기/렌더 시간 감소)
+     - 축 눈금 라벨은 여전히 벡터로 남음
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sparta_300", "linkage")
+RASTER_CELLS = 20000  # render="auto"에서 래스터로 전환하는 셀 수
+
+MEMORY_CACHE_SIZE = 4  # 메모리에 남겨 둘 linkage 수 (한 그림의 행/열 linkage + 여유, 나머지는 디스크 캐시)
+
+_MEMORY_CACHE = OrderedDict()
+
+
+def matrix_key(values, method, metric):
+    values = np.ascontiguousarray(values, dtype=np.float32)
+    h = hashlib.sha1(f"{values.shape}|{method}|{metric}".encode("utf-8"))
+    h.update(values.tobytes())
+    return h.hexdigest()
+
+
+def cached_linkage(values, method="average", metric="euclidean", use_cache=True, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    values의 행(observation) 기준 linkage 행렬
+
+    Args:
+        values (ndarray): (n × m) 행렬, 행끼리 군집
+        method (str): scipy linkage method (seaborn 기본값과 같은 'average')
+        metric (str): pdist metric
+    """
+    from scipy.cluster import hierarchy
+    from scipy.spatial.distance import pdist
+
+    values = np.asarray(values, dtype=np.float32)
+    if not use_cache:
+        return hierarchy.linkage(pdist(values, metric).astype(np.float32), method=method)
+
+    key = matrix_key(values, method, metric)
+    if key in _MEMORY_CACHE:
+        _MEMORY_CACHE.move_to_end(key)
+        return _MEMORY_CACHE[key]
+
+    from qza_reader import ArtifactCache
+    disk = ArtifactCache(cache_dir)
+    linkage = disk.get(key)
+    if linkage is None:
+        # condensed 거리는 n(n-1)/2 크기이므로 float32로 보관해 메모리를 절반으로 줄임
+        distances = pdist(values, metric).astype(np.float32)
+        linkage = hierarchy.linkage(distances, method=method)
+        del distances
+        try:
+            disk.put(key, linkage)
+        except OSError as e:
+            print(f"[경고] linkage 캐시 저장 실패: {e}")
+    _MEMORY_CACHE[key] = linkage
+    while len(_MEMORY_CACHE) > MEMORY_CACHE_SIZE:
+        _MEMORY_CACHE.popitem(last=False)
+    return linkage
+
+
+def draw_clustermap(data, render="auto", method="average", metric="euclidean", use_cache=True, **kwargs):
+    """
+    캐시된 linkage로 sns.clustermap 그리기
+
+    Args:
+        data (DataFrame): 행/열 모두 군집할 행렬
+        render (str): "vector" / "raster" / "auto" (셀 수가 RASTER_CELLS 이상이면 raster)
+        **kwargs: sns.clustermap에 그대로 전달 (cmap, figsize, xticklabels 등)
+
+    Returns:
+        seaborn.matrix.ClusterGrid
+    """
+    import seaborn as sns
+
+    values = data.to_numpy(dtype=np.float32)
+    row_linkage = cached_linkage(values, method, metric, use_cache)
+    col_linkage = cached_linkage(values.T, method, metric, use_cache)
+
+    if render == "auto":
+        render = "raster" if values.size >= RASTER_CELLS else "vector"
+    if render == "raster":
+        kwargs.setdefault("rasterized", True)
+
+    return sns.clustermap(data, row_linkage=row_linkage, col_linkage=col_linkage, **kwargs)
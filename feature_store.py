@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+대규모 feature table용 디스크 memory-map 저장소
+
+수천 개 샘플 × 10만 개 이상 ASV 테이블은 pandas로 한 번에 올리면 메모리가 부족하므로,
+테이블을 한 번 변환해서 `<이름>.fstore/` 폴더에 두 가지 레이아웃으로 저장해 둔다.
+
+  - feature_major.npy : float32 (feature × sample), lineage 순으로 정렬
+                        → 같은 genus의 행들이 연속 구간에 있으므로 해당 행만 읽음
+  - sample_major.npy  : float32 (sample × feature), sample ID 순으로 정렬
+                        → 'DQ_' 같은 그룹의 샘플들이 연속 구간에 있으므로 해당 샘플만 읽음
+  - meta.json         : (정렬된 순서의) feature/sample ID, lineage, ID 컬럼 이름
+
+변환도 chunk_rows 행 단위로 나눠서 처리하므로 전체 테이블을 메모리에 올리지 않는다.
+조회 결과는 feature_table.FeatureTable로 반환되어 기존 스크립트 코드를 그대로 쓸 수 있다.
+
+사용 예:
+  python feature_store.py build genus_20FNS-flt1.tsv        # → genus_20FNS-flt1.tsv.fstore/
+  python feature_store.py build feature-table.biom out.fstore
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from feature_table import FeatureTable, categorical_index, header_offset, load_biom_table, numeric_counts
+
+STORE_SUFFIX = ".fstore"
+FEATURE_MAJOR = "feature_major.npy"
+SAMPLE_MAJOR = "sample_major.npy"
+META = "meta.json"
+DEFAULT_CHUNK_ROWS = 4096
+
+
+def is_feature_store(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META))
+
+
+def _tsv_ids(tsv_path):
+    """1차 패스: 첫 컬럼(feature ID)과 헤더(sample ID)만 읽음"""
+    offset = header_offset(tsv_path)
+    with open(tsv_path, "r", encoding="utf-8") as fh:
+        for _ in range(offset):
+            next(fh)
+        header = fh.readline().rstrip("\n").split("\t")
+        feature_ids = [line.split("\t", 1)[0] for line in fh if line.strip()]
+    return header[0], feature_ids, header[1:]
+
+
+def _tsv_blocks(tsv_path, chunk_rows):
+    """2차 패스: chunk_rows 행씩 float32 블록으로 읽음"""
+    reader = pd.read_csv(
+        tsv_path, sep="\t", skiprows=header_offset(tsv_path), index_col=0, chunksize=chunk_rows
+    )
+    for chunk in reader:
+        yield numeric_counts(chunk)
+
+
+def _biom_blocks(counts, chunk_rows):
+    for start in range(0, counts.shape[0], chunk_rows):
+        yield counts[start:start + chunk_rows].toarray().astype(np.float32)
+
+
+def build_feature_store(table_path, store_dir=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    TSV 또는 .biom 테이블을 feature store로 변환
+
+    Args:
+        table_path (str): BIOM 형식 TSV 또는 BIOM(HDF5) 경로
+        store_dir (str): 저장 폴더 (기본값: <table_path>.fstore)
+        chunk_rows (int): 한 번에 처리할 feature 행 수
+
+    Returns:
+        str: 저장 폴더 경로
+    """
+    if store_dir is None:
+        store_dir = table_path + STORE_SUFFIX
+    os.makedirs(store_dir, exist_ok=True)
+
+    if table_path.endswith(".biom"):
+        biom = load_biom_table(table_path)
+        id_column, feature_ids, sample_ids = biom.id_column, list(biom.feature_ids), list(biom.sample_ids)
+        lineages = list(biom.lineages)
+        has_taxonomy = biom.taxonomy is not None
+        blocks = _biom_blocks(biom.counts, chunk_rows)
+    else:
+        id_column, feature_ids, sample_ids = _tsv_ids(table_path)
+        lineages = feature_ids
+        has_taxonomy = False
+        blocks = _tsv_blocks(table_path, chunk_rows)
+
+    # lineage / sample ID 정렬 순서 (rank: 원래 위치 → 저장 위치)
+    feature_order = np.argsort(np.asarray(lineages, dtype=object), kind="stable")
+    feature_rank = np.empty_like(feature_order)
+    feature_rank[feature_order] = np.arange(len(feature_order))
+    sample_order = np.argsort(np.asarray(sample_ids, dtype=object), kind="stable")
+
+    n_features, n_samples = len(feature_ids), len(sample_ids)
+    feature_major = np.lib.format.open_memmap(
+        os.path.join(store_dir, FEATURE_MAJOR), mode="w+", dtype=np.float32, shape=(n_features, n_samples)
+    )
+    sample_major = np.lib.format.open_memmap(
+        os.path.join(store_dir, SAMPLE_MAJOR), mode="w+", dtype=np.float32, shape=(n_samples, n_features)
+    )
+    start = 0
+    for block in blocks:
+        stop = start + block.shape[0]
+        ranks = feature_rank[start:stop]
+        feature_major[ranks] = block[:, sample_order]
+        sample_major[:, ranks] = block[:, sample_order].T
+        start = stop
+    if start != n_features:
+        raise ValueError(f"{table_path}: feature 행 수가 일치하지 않습니다 ({start} != {n_features})")
+    feature_major.flush()
+    sample_major.flush()
+    del feature_major, sample_major
+
+    meta = {
+        "id_column": id_column,
+        "has_taxonomy": has_taxonomy,
+        "feature_ids": [feature_ids[i] for i in feature_order],
+        "lineages": [lineages[i] for i in feature_order],
+        "sample_ids": [sample_ids[i] for i in sample_order],
+    }
+    with open(os.path.join(store_dir, META), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, ensure_ascii=False)
+    return store_dir
+
+
+class FeatureStore:
+    """
+    feature store 읽기 전용 핸들
+
+    행(feature)은 lineage 순, 열(sample)은 sample ID 순으로 정렬되어 있다.
+    FeatureTable과 같은 속성/메서드(counts, row_sums, sample_indices, presence, collapse,
+    group_sum, dense_rows, to_frame)를 feature_major를 chunk_rows 행씩 순회하며 제공하므로
+    load_table()을 쓰는 스크립트에 FeatureTable 대신 그대로 넘겨도 된다.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, META), "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        self.id_column = meta["id_column"]
+        self.feature_ids = categorical_index(meta["feature_ids"], name=self.id_column)
+        self.sample_ids = categorical_index(meta["sample_ids"])
+        self.lineages = pd.Index(meta["lineages"])
+        # BIOM taxonomy metadata에서 온 lineage만 taxonomy로 취급 (TSV는 feature ID가 곧 lineage)
+        self.taxonomy = list(self.lineages) if meta.get("has_taxonomy") else None
+        self.feature_major = np.load(os.path.join(store_dir, FEATURE_MAJOR), mmap_mode="r")
+        self.sample_major = np.load(os.path.join(store_dir, SAMPLE_MAJOR), mmap_mode="r")
+
+    @property
+    def shape(self):
+        return self.feature_major.shape
+
+    @property
+    def counts(self):
+        """feature × sample count 행렬 (memory-map, 읽는 구간만 디스크에서 올라옴)"""
+        return self.feature_major
+
+    @property
+    def lineage_index(self):
+        if getattr(self, "_lineage_index", None) is None:
+            from lineage import lineage_index
+            self._lineage_index = lineage_index(self.lineages)
+        return self._lineage_index
+
+    @property
+    def is_sparse(self):
+        return False
+
+    def row_sums(self, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """feature별 전체 합계 (feature_major를 chunk_rows 행씩 순회)"""
+        sums = np.empty(self.shape[0], dtype=np.float64)
+        for start in range(0, self.shape[0], chunk_rows):
+            block = self.feature_major[start:start + chunk_rows]
+            sums[start:start + chunk_rows] = block.sum(axis=1, dtype=np.float64)
+        return sums
+
+    def sample_indices(self, prefix):
+        return self.sample_positions(prefix)
+
+    def presence(self, sample_idx, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """지정한 샘플 열 중 하나라도 0이 아닌 feature 여부 (feature_major를 chunk_rows 행씩 순회)"""
+        present = np.empty(self.shape[0], dtype=bool)
+        for start in range(0, self.shape[0], chunk_rows):
+            block = self.feature_major[start:start + chunk_rows][:, sample_idx]
+            present[start:start + chunk_rows] = (block != 0).any(axis=1)
+        return present
+
+    def collapse(self, labels):
+        """같은 label을 가진 feature 행을 합산한 FeatureTable 반환 (FeatureTable.collapse와 같음)"""
+        codes, uniques = pd.factorize(pd.Index(labels))
+        return self.group_sum(codes, uniques)
+
+    def group_sum(self, groups, labels, rows=None, chunk=DEFAULT_CHUNK_ROWS):
+        """정수 그룹 코드로 feature 행을 합산한 FeatureTable 반환 (한 번에 chunk 행씩 읽음)"""
+        groups = np.asarray(groups, dtype=np.int64)
+        rows = np.arange(len(groups)) if rows is None else np.asarray(rows, dtype=np.int64)
+        summed = np.zeros((len(labels), self.shape[1]), dtype=np.float32)
+        for start in range(0, len(groups), chunk):
+            block = _read_positions(self.feature_major, rows[start:start + chunk])
+            np.add.at(summed, groups[start:start + chunk], block)
+        return FeatureTable(summed, labels, self.sample_ids, self.id_column)
+
+    def dense_rows(self, rows):
+        """선택한 행만 feature_major에서 읽어 ndarray로 반환"""
+        rows = np.arange(self.shape[0])[rows]
+        return _read_positions(self.feature_major, rows)
+
+    def to_frame(self):
+        """feature ID를 인덱스로 하는 DataFrame (전체를 메모리에 올림)"""
+        return pd.DataFrame(np.array(self.feature_major), index=pd.Index(self.feature_ids, dtype=object),
+                            columns=pd.Index(self.sample_ids, dtype=object))
+
+    def sample_positions(self, prefix):
+        """sample ID가 prefix로 시작하는 샘플 위치 (정렬되어 있으므로 연속 구간)"""
+        return np.flatnonzero(self.sample_ids.str.startswith(prefix))
+
+    def taxon_positions(self, taxon):
+        """lineage의 rank 중 하나가 taxon과 일치하는 feature 위치 (예: 'g__Streptococcus')"""
+        ranks = self.lineages.str.split(";")
+        hit = [any(r.strip() == taxon for r in lineage) for lineage in ranks]
+        return np.flatnonzero(hit)
+
+    def samples(self, prefix=None, sample_ids=None):
+        """
+        선택한 샘플 열만 sample_major에서 읽어 FeatureTable(feature × 선택 샘플)로 반환
+
+        Args:
+            prefix (str): sample ID 접두어 (예: 'DQ_')
+            sample_ids (list): sample ID 목록 (prefix 대신 사용)
+        """
+        if sample_ids is not None:
+            positions = np.flatnonzero(self.sample_ids.isin(sample_ids))
+        else:
+            positions = self.sample_positions(prefix)
+        block = _read_positions(self.sample_major, positions)
+        return FeatureTable(block.T, self.feature_ids, self.sample_ids[positions], self.id_column,
+                            taxonomy=self.taxonomy)
+
+    def features(self, taxon=None, positions=None):
+        """
+        선택한 feature 행만 feature_major에서 읽어 FeatureTable(선택 feature × 전체 샘플)로 반환
+
+        Args:
+            taxon (str): rank 이름 (예: 'g__Streptococcus', 'f__Streptococcaceae')
+            positions (array): feature 위치 배열 (taxon 대신 사용)
+        """
+        if positions is None:
+            positions = self.taxon_positions(taxon)
+        block = _read_positions(self.feature_major, positions)
+        taxonomy = list(self.lineages[positions]) if self.taxonomy is not None else None
+        return FeatureTable(block, self.feature_ids[positions], self.sample_ids, self.id_column,
+                            taxonomy=taxonomy)
+
+
+def _read_positions(matrix, positions):
+    """위치가 1씩 증가하는 연속 구간이면 slice 한 번으로, 아니면 해당 행만 fancy indexing으로 읽음"""
+    positions = np.asarray(positions, dtype=np.int64)
+    if len(positions) and np.all(np.diff(positions) == 1):
+        return np.array(matrix[positions[0]:positions[-1] + 1])
+    return np.array(matrix[positions])
+
+
+def open_feature_store(store_dir):
+    return FeatureStore(store_dir)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] != "build":
+        sys.exit("사용법: python feature_store.py build <table.tsv|table.biom> [store_dir]")
+    store_dir = build_feature_store(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+    print(f"feature store 생성 완료: {store_dir}")
+
+
+if __name__ == "__main__":
+    main()
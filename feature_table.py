@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BIOM 형식 TSV feature table 공용 로더
+
+`biom convert --to-tsv` 결과(첫 줄 "# Constructed from biom file" 주석, "#OTU ID" 헤더)를
+한 번만 파싱해서 float32 count 행렬(feature × sample)과 feature/sample ID 범주형 인덱스
+(pd.CategoricalIndex, 정수 코드 + 고유값 목록)로 만든다.
+파싱 결과는 TSV 옆에 바이너리 캐시로 저장하고, 다음부터는 memory-map으로 바로 연다.
+
+  - <TSV>.counts.npy  : float32 count 행렬 (np.load(mmap_mode='r')로 읽음)
+  - <TSV>.index.json  : feature/sample ID(범주 목록 + 코드), ID 컬럼 이름, 원본 TSV 크기·수정시각
+
+원본 TSV의 크기나 수정시각이 바뀌면 캐시는 자동으로 다시 만들어진다.
+
+`feature-table.biom`(BIOM 2.x HDF5)은 load_biom_table()로 dense 변환 없이 바로 읽는다.
+count 행렬은 scipy.sparse CSR 행렬(feature × sample)이 되고, observation metadata의
+taxonomy가 있으면 lineage 문자열로 붙는다 (h5py, scipy 필요).
+합계·존재 여부·rank collapse는 dense/sparse 어느 쪽이든 같은 메서드로 처리한다.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+COUNTS_SUFFIX = ".counts.npy"
+INDEX_SUFFIX = ".index.json"
+
+
+def _is_sparse(matrix):
+    return hasattr(matrix, "tocsr")
+
+
+def categorical_index(values, name=None):
+    """ID 목록 → pd.CategoricalIndex (이미 범주형이면 그대로, 이름만 지정)"""
+    if isinstance(values, pd.CategoricalIndex):
+        return values.rename(name)
+    return pd.CategoricalIndex(values, name=name)
+
+
+def _encode_index(index):
+    """CategoricalIndex → .index.json에 저장할 {categories, codes}"""
+    return {"categories": [str(c) for c in index.categories], "codes": index.codes.tolist()}
+
+
+def _decode_index(encoded, name=None):
+    categorical = pd.Categorical.from_codes(encoded["codes"], categories=encoded["categories"])
+    return pd.CategoricalIndex(categorical, name=name)
+
+
+class FeatureTable:
+    """float32 count 행렬(dense 또는 scipy.sparse CSR) + feature/sample ID 범주형 인덱스"""
+
+    def __init__(self, counts, feature_ids, sample_ids, id_column="#OTU ID", taxonomy=None):
+        self.counts = counts
+        self.feature_ids = categorical_index(feature_ids, name=id_column)
+        self.sample_ids = categorical_index(sample_ids)
+        self.id_column = id_column
+        self.taxonomy = taxonomy
+
+    @property
+    def shape(self):
+        return self.counts.shape
+
+    @property
+    def is_sparse(self):
+        return _is_sparse(self.counts)
+
+    @property
+    def lineages(self):
+        """feature별 lineage 문자열 (BIOM taxonomy metadata가 없으면 feature ID 자체)"""
+        if self.taxonomy is not None:
+            return pd.Index(self.taxonomy)
+        return self.feature_ids.astype(str)
+
+    @property
+    def lineage_index(self):
+        """lineage의 rank별 코드 테이블 (lineage.LineageIndex, 처음 접근할 때 한 번만 파싱)"""
+        if getattr(self, "_lineage_index", None) is None:
+            from lineage import lineage_index
+            self._lineage_index = lineage_index(self.lineages)
+        return self._lineage_index
+
+    def sample_indices(self, prefix):
+        """sample ID가 prefix로 시작하는 열 번호 배열 (예: 'DQ_')"""
+        return np.flatnonzero(self.sample_ids.str.startswith(prefix))
+
+    def row_sums(self):
+        """feature별 전체 합계 (float64)"""
+        return np.asarray(self.counts.sum(axis=1, dtype=np.float64)).ravel()
+
+    def presence(self, sample_idx):
+        """지정한 샘플 열 중 하나라도 0이 아닌 feature 여부 (bool 배열)"""
+        sub = self.counts[:, sample_idx]
+        if _is_sparse(sub):
+            return np.asarray(sub.getnnz(axis=1)).ravel() > 0
+        return (np.asarray(sub) != 0).any(axis=1)
+
+    def collapse(self, labels):
+        """
+        같은 label을 가진 feature 행을 합산한 새 FeatureTable 반환 (예: genus 수준 lineage)
+
+        sparse 행렬이면 (group × feature) 지시 행렬과의 곱 한 번으로 계산한다.
+        결과의 feature ID는 처음 등장한 순서의 label이다.
+        """
+        codes, uniques = pd.factorize(pd.Index(labels))
+        return self.group_sum(codes, uniques)
+
+    def group_sum(self, groups, labels, rows=None, chunk=65536):
+        """
+        정수 그룹 코드로 feature 행을 합산한 새 FeatureTable 반환
+
+        Args:
+            groups (array): 그룹 번호 (0 ~ len(labels)-1)
+            labels (list): 그룹별 feature ID
+            rows (array): groups[i]에 더할 feature 행 번호 (기본값: 0, 1, 2, ...).
+                          한 행이 여러 그룹에 속할 때(예: LEfSe 계층 feature) 행 번호를 반복해서 지정
+            chunk (int): dense 행렬에서 한 번에 더할 (그룹, 행) 쌍 수
+        """
+        groups = np.asarray(groups, dtype=np.int64)
+        rows = np.arange(len(groups)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if self.is_sparse:
+            from scipy import sparse
+            indicator = sparse.csr_matrix(
+                (np.ones(len(groups), dtype=np.float32), (groups, rows)),
+                shape=(len(labels), self.shape[0]),
+            )
+            summed = (indicator @ self.counts).tocsr()
+        else:
+            counts = np.asarray(self.counts)
+            summed = np.zeros((len(labels), self.shape[1]), dtype=np.float32)
+            for start in range(0, len(groups), chunk):
+                np.add.at(summed, groups[start:start + chunk], counts[rows[start:start + chunk]])
+        return FeatureTable(summed, labels, self.sample_ids, self.id_column)
+
+    def dense_rows(self, rows):
+        """선택한 행만 dense ndarray로 변환 (sparse 전체를 dense로 만들지 않음)"""
+        sub = self.counts[rows]
+        return sub.toarray() if _is_sparse(sub) else np.asarray(sub)
+
+    def to_frame(self):
+        """feature ID를 인덱스로 하는 DataFrame (pd.read_table(..., index_col=0)과 같은 모양, 일반 인덱스)"""
+        counts = self.counts.toarray() if self.is_sparse else np.asarray(self.counts)
+        return pd.DataFrame(counts, index=pd.Index(self.feature_ids, dtype=object),
+                            columns=pd.Index(self.sample_ids, dtype=object))
+
+
+def header_offset(tsv_path):
+    """'#OTU ID' 헤더 앞에 있는 주석 줄 수"""
+    offset = 0
+    with open(tsv_path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            if line.startswith("#") and not line.startswith(("#OTU ID", "#Feature ID")):
+                offset += 1
+                continue
+            break
+    return offset
+
+
+def _source_stamp(tsv_path):
+    st = os.stat(tsv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def numeric_counts(df):
+    """
+    DataFrame → float32 행렬 (숫자가 아닌 칸과 빈 칸은 0)
+
+    기존 스크립트가 셀마다 float() 변환에 실패하면 건너뛰던 것과 같이, 숫자가 아닌 칸 하나 때문에
+    전체 읽기가 실패하지 않도록 한다. 모든 컬럼이 이미 숫자형이면 변환 없이 바로 사용.
+    """
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+        df = df.apply(pd.to_numeric, errors="coerce")
+    return df.fillna(0).to_numpy(dtype=np.float32)
+
+
+def parse_feature_table(tsv_path):
+    """TSV를 직접 파싱 (캐시 사용 안 함)"""
+    df = pd.read_csv(tsv_path, sep="\t", skiprows=header_offset(tsv_path), index_col=0)
+    counts = numeric_counts(df)
+    return FeatureTable(counts, df.index.astype(str), df.columns.astype(str), df.index.name or "#OTU ID")
+
+
+def _write_cache(tsv_path, table):
+    counts_path, index_path = tsv_path + COUNTS_SUFFIX, tsv_path + INDEX_SUFFIX
+    tmp_counts = counts_path + ".tmp.npy"
+    np.save(tmp_counts, np.ascontiguousarray(table.counts, dtype=np.float32))
+    os.replace(tmp_counts, counts_path)
+    index = {
+        "source": _source_stamp(tsv_path),
+        "id_column": table.id_column,
+        "feature_ids": _encode_index(table.feature_ids),
+        "sample_ids": _encode_index(table.sample_ids),
+    }
+    with open(index_path + ".tmp", "w", encoding="utf-8") as fh:
+        json.dump(index, fh, ensure_ascii=False)
+    os.replace(index_path + ".tmp", index_path)
+
+
+def _read_cache(tsv_path):
+    counts_path, index_path = tsv_path + COUNTS_SUFFIX, tsv_path + INDEX_SUFFIX
+    if not (os.path.exists(counts_path) and os.path.exists(index_path)):
+        return None
+    with open(index_path, "r", encoding="utf-8") as fh:
+        index = json.load(fh)
+    # 원본이 바뀌었거나 ID를 목록으로 저장하던 이전 형식이면 다시 만듦
+    if index.get("source") != _source_stamp(tsv_path) or not isinstance(index.get("feature_ids"), dict):
+        return None
+    counts = np.load(counts_path, mmap_mode="r")
+    return FeatureTable(counts, _decode_index(index["feature_ids"], index["id_column"]),
+                        _decode_index(index["sample_ids"]), index["id_column"])
+
+
+def load_feature_table(tsv_path, use_cache=True):
+    """
+    feature table 읽기 (캐시가 유효하면 memory-map으로 바로 열고, 아니면 파싱 후 캐시 저장)
+
+    Args:
+        tsv_path (str): BIOM 형식 TSV 경로
+        use_cache (bool): 바이너리 캐시 사용 여부
+
+    Returns:
+        FeatureTable
+    """
+    if use_cache:
+        table = _read_cache(tsv_path)
+        if table is not None:
+            return table
+    table = parse_feature_table(tsv_path)
+    if use_cache:
+        try:
+            _write_cache(tsv_path, table)
+        except OSError as e:
+            print(f"[경고] feature table 캐시 저장 실패: {e}")
+    return table
+
+
+def _decode(values):
+    return [v.decode("utf-8") if isinstance(v, bytes) else str(v) for v in values]
+
+
+def _read_biom_taxonomy(group):
+    """observation/metadata/taxonomy → 'd__...;p__...;...' lineage 문자열 목록"""
+    if "taxonomy" not in group:
+        return None
+    data = group["taxonomy"][()]
+    if data.ndim == 2:
+        return [";".join(r.strip() for r in _decode(row) if r.strip()) for row in data]
+    return [";".join(r.strip() for r in v.split(";")) for v in _decode(data)]
+
+
+def load_biom_table(biom_path):
+    """
+    BIOM 2.x HDF5 파일을 sparse CSR 행렬로 읽기 (dense 변환 없음, 메모리는 non-zero 수에 비례)
+
+    Returns:
+        FeatureTable: counts는 scipy.sparse.csr_matrix(feature × sample, float32),
+                      taxonomy는 observation metadata가 있으면 lineage 문자열 목록
+    """
+    try:
+        import h5py
+        from scipy import sparse
+    except ImportError as e:
+        raise ImportError(f"BIOM(HDF5) 입력에는 h5py와 scipy가 필요합니다: {e}")
+
+    with h5py.File(biom_path, "r") as fh:
+        obs = fh["observation"]
+        feature_ids = _decode(obs["ids"][()])
+        sample_ids = _decode(fh["sample/ids"][()])
+        matrix = obs["matrix"]
+        counts = sparse.csr_matrix(
+            (matrix["data"][()].astype(np.float32), matrix["indices"][()], matrix["indptr"][()]),
+            shape=(len(feature_ids), len(sample_ids)),
+        )
+        taxonomy = _read_biom_taxonomy(obs["metadata"]) if "metadata" in obs else None
+    counts.eliminate_zeros()
+    return FeatureTable(counts, feature_ids, sample_ids, "#OTU ID", taxonomy)
+
+
+def load_table(path, use_cache=True):
+    """
+    경로 종류에 따라 로더 선택
+
+      - .fstore 폴더 : feature_store.FeatureStore (memory-map, 필요한 행/열만 읽음)
+      - .biom        : sparse BIOM
+      - 그 외        : TSV 로더 (바이너리 캐시)
+    """
+    if os.path.isdir(path):
+        from feature_store import is_feature_store, open_feature_store
+        if not is_feature_store(path):
+            raise ValueError(f"{path}: feature store 폴더가 아닙니다 (meta.json 없음)")
+        return open_feature_store(path)
+    if path.endswith(".biom"):
+        return load_biom_table(path)
+    return load_feature_table(path, use_cache=use_cache)
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NumPy LEfSe 엔진 (Kruskal-Wallis → subclass Wilcoxon → LDA effect size → .res)
+
+외부 LEfSe(run_lefse.py)는 feature 하나마다 rpy2로 R의 kruskal.test / coin::wilcox_test /
+MASS::lda를 호출한다. 여기서는 같은 절차를 feature 전체 행렬에 대해 한 번에 계산한다.
+
+  1. Kruskal-Wallis : 행렬 전체를 행 단위로 한 번 순위화, 동순위 보정 H 통계량, chi2(k-1) p-value
+  2. Wilcoxon       : class 쌍 × subclass 쌍마다 모든 feature를 동시에 검정
+                      (coin::wilcox_test 점근 검정과 같은 조건부 분산, 연속성 보정 없음)
+                      중앙값 방향 일관성 규칙, min_c, one-against-all/one-against-one은 LEfSe와 동일
+  3. LDA            : 두 검정을 통과한 feature로 MASS::lda와 같은 방식의 판별 방향을 bootstrap마다 계산,
+                      (class 평균 차이 + 판별 계수 크기)/2의 bootstrap 평균 → log10(1 + |m|)
+                      bootstrap은 -j 개 워커 프로세스에 나눠 실행 (bootstrap마다 독립 seed 스트림)
+  4. .res 저장      : feature, log10(최대 class 평균), class, LDA, p-value
+                      (10.lefse_plot_res.py, 11.lefse_plot_cladogram.py가 그대로 읽는 형식)
+
+입력은 LEfSe 텍스트 입력(10.lefse_input_table.py 결과)이며, class/subclass/subject 행 번호는
+format_input.py의 -c/-s/-u와 같은 1부터 시작하는 번호로 지정한다.
+이름 정리, 누락된 상위 단계 추가, 정규화(-o)는 lefse_input.py의 format_input.py 규칙을 따른다.
+LEfSe 형식화 입력(.in, lefse_input.write_formatted_input 또는 format_input.py 결과)도 바로 읽는다.
+R 난수와는 다른 난수를 쓰므로 noise/bootstrap 단계의 LDA 값은 외부 LEfSe와 소수점 아래에서 다를 수 있다.
+
+사용 예:
+  python lefse_engine.py input_table.tsv input_table.res -c 1 -s 2 -u 3
+  python lefse_engine.py input_table_genus.tsv genus.res -c 1 -s -1 -u 2 -o 1000000
+  python lefse_engine.py input_table_genus.tsv genus.res -c 1 -u 2 -b 100 -j 8
+  python lefse_engine.py input_table.in input_table.res
+"""
+
+import argparse
+import csv
+import math
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import stats
+
+from lefse_input import add_missing_levels, lefse_feature_name, normalize
+
+DEFAULTS = {
+    "anova_alpha": 0.05,    # -a
+    "wilcoxon_alpha": 0.05, # -w
+    "lda_abs_th": 2.0,      # -l
+    "n_boots": 30,          # -b
+    "f_boots": 0.67,        # -f
+    "only_same_subcl": False,  # -e
+    "min_c": 10,            # -c (run_lefse.py)
+    "multiclass_strat": 0,  # -y (0: one-against-all, 1: one-against-one)
+    "strict": 0,            # -s (run_lefse.py, 다중 비교 보정)
+    "seed": 1984,           # --seed (LEfSe 기본값과 같은 숫자)
+    "workers": 1,           # -j (bootstrap LDA 워커 프로세스 수)
+    "tol_min": 1e-10,
+}
+
+
+# ============================================
+# 1. 입력 읽기 (LEfSe 텍스트 입력)
+# ============================================
+def read_lefse_table(path, class_row=1, subclass_row=-1, subject_row=-1):
+    """
+    LEfSe 텍스트 입력 → (feature 이름, 값 행렬, class, subclass, subject)
+
+    Args:
+        class_row, subclass_row, subject_row (int): 1부터 시작하는 행 번호 (-1이면 없음)
+    """
+    with open(path, "r", newline="") as fh:
+        rows = [row for row in csv.reader(fh, delimiter="\t") if row]
+    header_rows = {r - 1 for r in (class_row, subclass_row, subject_row) if r > 0}
+    classes = np.asarray(rows[class_row - 1][1:], dtype=object)
+    n_samples = len(classes)
+    subclasses = np.asarray(rows[subclass_row - 1][1:], dtype=object) if subclass_row > 0 else None
+    subjects = (np.asarray(rows[subject_row - 1][1:], dtype=object) if subject_row > 0
+                else np.asarray([f"s{i}" for i in range(n_samples)], dtype=object))
+
+    data_rows = [row for i, row in enumerate(rows) if i not in header_rows]
+    names = [lefse_feature_name(row[0]) for row in data_rows]
+    values = np.array([[float(v) if v != "" else 0.0 for v in row[1:n_samples + 1]] for row in data_rows],
+                      dtype=np.float64)
+    return names, values, classes, subclasses, subjects
+
+
+def read_formatted_input(path):
+    """LEfSe 형식화 입력(pickle) → (feature 이름, 값 행렬, class, subclass, subject) (정규화/정렬 완료 상태)"""
+    with open(path, "rb") as fh:
+        formatted = pickle.load(fh)
+    names = list(formatted["feats"])
+    values = np.array([formatted["feats"][n] for n in names], dtype=np.float64)
+    cls = formatted["cls"]
+    classes = np.asarray(cls["class"], dtype=object)
+    subclasses = np.asarray(cls["subclass"], dtype=object)
+    # subclass 이름은 '<class>_<subclass>' 형태이므로 class 부분을 떼어 class 간 비교에 사용
+    subclasses = np.asarray([s[len(c):] for c, s in zip(classes, subclasses)], dtype=object)
+    return names, values, classes, subclasses, np.asarray(cls["subject"], dtype=object)
+
+
+# ============================================
+# 2. 순위 통계 (행 단위로 모든 feature를 한 번에)
+# ============================================
+def _tie_sums(values):
+    """행별 Σ(t³ - t) (t: 같은 값 묶음 크기)"""
+    n_rows, n_cols = values.shape
+    if n_cols == 0:
+        return np.zeros(n_rows)
+    ordered = np.sort(values, axis=1)
+    starts = np.ones_like(ordered, dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    run_ids = np.cumsum(starts.ravel()) - 1
+    run_sizes = np.bincount(run_ids).astype(np.float64)
+    run_rows = np.repeat(np.arange(n_rows), starts.sum(axis=1))
+    return np.bincount(run_rows, weights=run_sizes ** 3 - run_sizes, minlength=n_rows)
+
+
+def kruskal_wallis(values, groups, n_groups):
+    """
+    행(feature)별 Kruskal-Wallis p-value (R kruskal.test와 같은 동순위 보정)
+
+    Args:
+        values (ndarray): feature × sample
+        groups (ndarray): sample별 그룹 번호 (0 ~ n_groups-1)
+    """
+    n = values.shape[1]
+    ranks = stats.rankdata(values, axis=1)
+    counts = np.bincount(groups, minlength=n_groups).astype(np.float64)
+    indicator = np.zeros((n, n_groups))
+    indicator[np.arange(n), groups] = 1.0
+    rank_sums = ranks @ indicator
+    h = 12.0 / (n * (n + 1)) * (rank_sums ** 2 / counts).sum(axis=1) - 3.0 * (n + 1)
+    correction = 1.0 - _tie_sums(values) / (n ** 3 - n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h = h / correction
+    return stats.chi2.sf(h, n_groups - 1)
+
+
+def wilcoxon_pvalues(x, y):
+    """
+    행별 두 그룹 Wilcoxon rank-sum p-value (양측, 정규 근사, 동순위 보정, 연속성 보정 없음)
+
+    coin::wilcox_test의 점근 p-value와 같다. 모든 값이 같으면 NaN.
+    """
+    n1, n2 = x.shape[1], y.shape[1]
+    n = n1 + n2
+    combined = np.hstack([x, y])
+    ranks = stats.rankdata(combined, axis=1)
+    r1 = ranks[:, :n1].sum(axis=1)
+    variance = n1 * n2 / 12.0 * ((n + 1) - _tie_sums(combined) / (n * (n - 1)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (r1 - n1 * (n + 1) / 2.0) / np.sqrt(variance)
+    return 2.0 * stats.norm.sf(np.abs(z))
+
+
+# ============================================
+# 3. subclass Wilcoxon 규칙 (lefse.test_rep_wilcoxon_r를 feature 전체에 대해 동시에)
+# ============================================
+def _class_hierarchy(classes, subclasses):
+    """class → [(subclass 이름, sample 위치 배열), ...] (subclass가 없으면 class 하나가 subclass)"""
+    hierarchy = {}
+    for cls in sorted(set(classes)):
+        in_class = classes == cls
+        if subclasses is None:
+            hierarchy[cls] = [("subcl", np.flatnonzero(in_class))]
+        else:
+            hierarchy[cls] = [(sub, np.flatnonzero(in_class & (subclasses == sub)))
+                              for sub in sorted(set(subclasses[in_class]))]
+    return hierarchy
+
+
+def subclass_wilcoxon(values, hierarchy, params):
+    """
+    feature별 subclass Wilcoxon 통과 여부 (bool 배열)
+
+    class 쌍마다 모든 subclass 쌍에서 (1) 검정이 유의하고 (2) 중앙값 방향이 같아야 그 쌍이 "차이 있음".
+    subclass 크기가 min_c보다 작으면 검정 없이 중앙값 방향만 비교한다.
+    """
+    n_features = values.shape[0]
+    classes = list(hierarchy)
+    alpha = params["wilcoxon_alpha"]
+    diff_pairs = []
+    all_ok = np.ones(n_features, dtype=bool)
+
+    for a in range(len(classes)):
+        for b in range(a + 1, len(classes)):
+            cl_a, cl_b = classes[a], classes[b]
+            subs_a, subs_b = hierarchy[cl_a], hierarchy[cl_b]
+            n_cmp = len(subs_a) * len(subs_b)
+            if params["strict"] != 0:
+                alpha = (params["wilcoxon_alpha"] * n_cmp if params["strict"] == 2
+                         else 1.0 - math.pow(1.0 - params["wilcoxon_alpha"], n_cmp))
+
+            ok = np.zeros(n_features, dtype=np.int64)
+            broken = np.zeros(n_features, dtype=bool)
+            first = np.ones(n_features, dtype=bool)
+            direction = np.zeros(n_features, dtype=bool)
+            for sub_a, idx_a in subs_a:
+                for sub_b, idx_b in subs_b:
+                    if params["only_same_subcl"] and sub_a != sub_b:
+                        ok[~broken] += 1
+                        continue
+                    x, y = values[:, idx_a], values[:, idx_b]
+                    med_comp = len(idx_a) < params["min_c"] or len(idx_b) < params["min_c"]
+                    sx, sy = np.median(x, axis=1), np.median(y, axis=1)
+                    both_const = ((x.min(axis=1) == x.max(axis=1)) & (y.min(axis=1) == y.max(axis=1))
+                                  & (x[:, 0] == y[:, 0]))
+                    if med_comp:
+                        significant = np.zeros(n_features, dtype=bool)
+                    else:
+                        with np.errstate(invalid="ignore"):
+                            significant = wilcoxon_pvalues(x, y) < alpha * 2.0
+                    significant &= ~both_const
+                    less = sx < sy
+
+                    active = ~broken
+                    # 처음 비교: 유의하면(또는 중앙값 비교면) 방향 기록, 아니면 실패
+                    # (두 그룹이 같은 상수이면 first만 해제되고 아래 규칙으로 실패)
+                    starting = active & first & ~both_const
+                    fail = starting & ~(med_comp | significant)
+                    direction = np.where(starting & (med_comp | significant), less, direction)
+
+                    # 이후 비교: 방향이 같고 중앙값이 달라야 함 (검정 비교는 유의해야 함)
+                    following = active & ~starting
+                    changed = (less != direction) | (sx == sy)
+                    if med_comp:
+                        fail |= following & changed
+                    else:
+                        fail |= following & (~significant | changed)
+
+                    first &= ~active
+                    broken |= fail
+                    ok[active & ~fail] += 1
+
+            diff = ~broken & (ok == n_cmp)
+            if params["multiclass_strat"]:
+                all_ok &= diff
+            else:
+                diff_pairs.append((cl_a, cl_b, diff))
+
+    if params["multiclass_strat"]:
+        return all_ok
+    # one-against-all: 어떤 class가 나머지 모든 class와 차이 있으면 통과
+    passed = np.zeros(n_features, dtype=bool)
+    for cls in classes:
+        n_diff = sum(diff.astype(np.int64) for a, b, diff in diff_pairs if cls in (a, b))
+        passed |= np.asarray(n_diff) == len(classes) - 1
+    return passed
+
+
+# ============================================
+# 4. LDA effect size (MASS::lda 방식 판별 방향 + bootstrap)
+# ============================================
+def lda_direction(x, groups, n_groups, tol):
+    """
+    MASS::lda(method="moment")의 첫 번째 판별 방향과 그룹 평균
+
+    Args:
+        x (ndarray): sample × feature
+        groups (ndarray): sample별 그룹 번호 (모든 그룹이 있어야 함)
+    """
+    n = x.shape[0]
+    counts = np.bincount(groups, minlength=n_groups).astype(np.float64)
+    prior = counts / n
+    means = np.zeros((n_groups, x.shape[1]))
+    np.add.at(means, groups, x)
+    means /= counts[:, np.newaxis]
+
+    centered = x - means[groups]
+    f1 = centered.std(axis=0, ddof=1)
+    f1 = np.where(f1 < tol, tol, f1)  # MASS는 그룹 안에서 상수인 변수가 있으면 중단하지만 여기서는 tol로 대체
+    _, d, vt = np.linalg.svd(centered / f1 / math.sqrt(n - n_groups), full_matrices=False)
+    rank = int((d > tol).sum())
+    scaling = (vt[:rank].T / d[:rank]) / f1[:, np.newaxis]
+
+    xbar = prior @ means
+    between = np.sqrt(n * prior / (n_groups - 1))[:, np.newaxis] * (means - xbar) @ scaling
+    _, db, vbt = np.linalg.svd(between, full_matrices=False)
+    rank = int((db > tol * db[0]).sum())
+    return (scaling @ vbt[:rank].T)[:, 0], means
+
+
+def add_lda_noise(values, groups, n_groups, rng):
+    """
+    서로 다른 값이 적은 (class, feature)에 작은 noise 추가 (lefse.test_lda_r와 같은 규칙)
+      - class 안의 서로 다른 값 수 ≤ max(class 크기 × 0.5, 4)이면
+        v → |v + N(0, max(v × 0.05, 0.01))|
+    """
+    values = values.copy()
+    for g in range(n_groups):
+        cols = np.flatnonzero(groups == g)
+        block = values[:, cols]
+        ordered = np.sort(block, axis=1)
+        n_distinct = 1 + (ordered[:, 1:] != ordered[:, :-1]).sum(axis=1)
+        noisy = np.flatnonzero(n_distinct <= max(len(cols) * 0.5, 4))
+        sub = block[noisy]
+        sub = np.abs(sub + rng.normal(0.0, np.maximum(sub * 0.05, 0.01)))
+        block[noisy] = sub
+        values[:, cols] = block
+    return values
+
+
+def _few_per_class(values, groups, sample, n_groups, min_cl):
+    """lefse.contast_within_classes_or_few_per_class: 다시 뽑아야 하는 bootstrap 표본이면 True"""
+    sampled = groups[sample]
+    counts = np.bincount(sampled, minlength=n_groups)
+    if (counts == 0).any() or (counts < min_cl).any():
+        return True
+    limit = min_cl if min_cl > 1 else 1
+    for g in range(n_groups):
+        block = np.sort(values[:, sample[sampled == g]], axis=1)
+        n_distinct = 1 + (block[:, 1:] != block[:, :-1]).sum(axis=1)
+        if (n_distinct <= limit).any():
+            return True
+    return False
+
+
+def _draw_sample(values, groups, n_groups, n_draw, min_cl, rng):
+    sample = rng.integers(0, len(groups), n_draw)
+    for _ in range(999):
+        if not _few_per_class(values, groups, sample, n_groups, min_cl):
+            break
+        sample = rng.integers(0, len(groups), n_draw)
+    return sample
+
+
+def bootstrap_effects(values, groups, n_groups, pairs, n_draw, min_cl, tol, rng):
+    """
+    bootstrap 1회: 쌍별 (|class 평균 차이| + |단위 판별 계수 × effect size|) / 2
+
+    Returns:
+        ndarray: (쌍 수 × feature 수)
+    """
+    sample = _draw_sample(values, groups, n_groups, n_draw, min_cl, rng)
+    x = values[:, sample].T
+    g = groups[sample]
+    w, means = lda_direction(x, g, n_groups, tol)
+    w_unit = w / np.sqrt((w ** 2).sum())
+    ld = x @ w_unit
+    effects = np.empty((len(pairs), x.shape[1]))
+    for i, (p, q) in enumerate(pairs):
+        effect_size = abs(ld[g == p].mean() - ld[g == q].mean())
+        coeff = np.nan_to_num(np.abs(w_unit * effect_size))
+        effects[i] = (np.abs(means[p] - means[q]) + coeff) * 0.5
+    return effects
+
+
+_WORKER_STATE = {}
+
+
+def _init_bootstrap_worker(values, groups, n_groups, pairs, n_draw, min_cl, tol):
+    """워커 프로세스마다 한 번만 행렬을 받아 둠 (bootstrap 작업마다 다시 보내지 않도록)"""
+    _WORKER_STATE.update(values=values, groups=groups, n_groups=n_groups, pairs=pairs,
+                         n_draw=n_draw, min_cl=min_cl, tol=tol)
+
+
+def _bootstrap_task(seed_seq):
+    state = _WORKER_STATE
+    return bootstrap_effects(state["values"], state["groups"], state["n_groups"], state["pairs"],
+                             state["n_draw"], state["min_cl"], state["tol"], np.random.default_rng(seed_seq))
+
+
+def lda_effect_sizes(values, groups, n_groups, params):
+    """
+    bootstrap 평균 effect의 쌍별 최댓값 → sign × log10(1 + |m|)
+
+    난수는 SeedSequence(seed)에서 갈라낸 독립 스트림을 사용한다.
+      - 첫 번째 스트림: noise 추가
+      - i+1번째 스트림: i번째 bootstrap
+    bootstrap마다 자기 스트림을 쓰고 결과를 bootstrap 순서대로 더하므로,
+    workers 수와 관계없이 결과가 비트 단위로 같다.
+    """
+    n_samples = len(groups)
+    n_draw = int(n_samples * params["f_boots"])
+    counts = np.bincount(groups, minlength=n_groups)
+    min_cl = max(int(counts.min() * params["f_boots"] * params["f_boots"] * 0.5), 1)
+    pairs = [(p, q) for p in range(n_groups) for q in range(n_groups) if p > q]
+
+    noise_seq, *boot_seqs = np.random.SeedSequence(params["seed"]).spawn(params["n_boots"] + 1)
+    values = add_lda_noise(values, groups, n_groups, np.random.default_rng(noise_seq))
+    setup = (values, groups, n_groups, pairs, n_draw, min_cl, params["tol_min"])
+
+    total = np.zeros((len(pairs), values.shape[0]))
+    workers = min(params["workers"], len(boot_seqs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_bootstrap_worker,
+                                 initargs=setup) as executor:
+            for effects in executor.map(_bootstrap_task, boot_seqs):
+                total += effects
+    else:
+        _init_bootstrap_worker(*setup)
+        for effects in map(_bootstrap_task, boot_seqs):
+            total += effects
+    m = (total / params["n_boots"]).max(axis=0)
+    return np.sign(m) * np.log10(1.0 + np.abs(m))
+
+
+# ============================================
+# 5. 전체 실행 + .res 저장
+# ============================================
+def run_lefse(names, values, classes, subclasses=None, **options):
+    """
+    Returns:
+        dict: class_names(정렬), class_means(feature × class), kw_pvalues, passed(bool), lda(dict: 이름 → 값)
+    """
+    params = dict(DEFAULTS, **options)
+    class_names = sorted(set(classes))
+    groups = np.searchsorted(class_names, classes)
+    n_groups = len(class_names)
+
+    indicator = np.zeros((len(classes), n_groups))
+    indicator[np.arange(len(classes)), groups] = 1.0
+    class_means = values @ indicator / indicator.sum(axis=0)
+
+    kw = kruskal_wallis(values, groups, n_groups)
+    with np.errstate(invalid="ignore"):
+        passed = kw < params["anova_alpha"]
+    hierarchy = _class_hierarchy(np.asarray(classes), None if subclasses is None else np.asarray(subclasses))
+    if passed.any():
+        rows = np.flatnonzero(passed)
+        passed[rows] = subclass_wilcoxon(values[rows], hierarchy, params)
+
+    lda = {}
+    if passed.any() and n_groups > 1:
+        rows = np.flatnonzero(passed)
+        scores = lda_effect_sizes(values[rows], groups, n_groups, params)
+        lda = {names[r]: s for r, s in zip(rows, scores)}
+    return {"class_names": class_names, "class_means": class_means, "kw_pvalues": kw,
+            "passed": passed, "lda": lda, "lda_abs_th": params["lda_abs_th"]}
+
+
+def write_res(path, names, result):
+    """
+    run_lefse.py save_res와 같은 형식
+      유의: feature \\t log10(max(class 평균, 1)) \\t class \\t LDA \\t p-value
+      그 외: feature \\t log10(max(class 평균, 1)) \\t \\t \\t -
+    """
+    class_names, means, lda = result["class_names"], result["class_means"], result["lda"]
+    with open(path, "w") as out:
+        for i, name in enumerate(names):
+            row_means = means[i]
+            out.write(name + "\t" + str(math.log(max(row_means.max(), 1.0), 10.0)) + "\t")
+            if name in lda and abs(lda[name]) > result["lda_abs_th"]:
+                out.write(class_names[int(np.argmax(row_means))] + "\t" + str(float(lda[name])))
+            else:
+                out.write("\t")
+            pvalue = str(float(result["kw_pvalues"][i])) if result["passed"][i] else "-"
+            out.write("\t" + pvalue + "\n")
+
+
+def read_params():
+    parser = argparse.ArgumentParser(description="NumPy LEfSe engine (writes a LEfSe .res file)")
+    parser.add_argument("input_file", help="LEfSe 텍스트 입력 (10.lefse_input_table.py 결과)")
+    parser.add_argument("output_file", help=".res 출력 경로")
+    parser.add_argument("-c", dest="class_row", type=int, default=1, help="class 행 번호 (1부터)")
+    parser.add_argument("-s", dest="subclass_row", type=int, default=-1, help="subclass 행 번호 (-1: 없음)")
+    parser.add_argument("-u", dest="subject_row", type=int, default=-1, help="subject 행 번호 (-1: 없음)")
+    parser.add_argument("-o", dest="norm_value", type=float, default=-1.0, help="정규화 값 (-1: 정규화 안 함)")
+    parser.add_argument("-a", dest="anova_alpha", type=float, default=DEFAULTS["anova_alpha"])
+    parser.add_argument("-w", dest="wilcoxon_alpha", type=float, default=DEFAULTS["wilcoxon_alpha"])
+    parser.add_argument("-l", dest="lda_abs_th", type=float, default=DEFAULTS["lda_abs_th"])
+    parser.add_argument("-b", dest="n_boots", type=int, default=DEFAULTS["n_boots"])
+    parser.add_argument("-f", dest="f_boots", type=float, default=DEFAULTS["f_boots"])
+    parser.add_argument("-e", dest="only_same_subcl", type=int, default=0)
+    parser.add_argument("-y", dest="multiclass_strat", type=int, default=DEFAULTS["multiclass_strat"])
+    parser.add_argument("--min_c", type=int, default=DEFAULTS["min_c"])
+    parser.add_argument("--strict", type=int, default=DEFAULTS["strict"])
+    parser.add_argument("--seed", type=int, default=DEFAULTS["seed"])
+    parser.add_argument("-j", dest="workers", type=int, default=DEFAULTS["workers"],
+                        help="bootstrap LDA 워커 프로세스 수 (결과는 워커 수와 무관)")
+    return parser.parse_args()
+
+
+def main():
+    args = read_params()
+    if args.input_file.endswith(".in"):
+        names, values, classes, subclasses, _ = read_formatted_input(args.input_file)
+    else:
+        names, values, classes, subclasses, _ = read_lefse_table(
+            args.input_file, args.class_row, args.subclass_row, args.subject_row)
+        names, values = add_missing_levels(names, values)
+        values = normalize(names, values, args.norm_value)
+    result = run_lefse(
+        names, values, classes, subclasses,
+        anova_alpha=args.anova_alpha, wilcoxon_alpha=args.wilcoxon_alpha, lda_abs_th=args.lda_abs_th,
+        n_boots=args.n_boots, f_boots=args.f_boots, only_same_subcl=bool(args.only_same_subcl),
+        multiclass_strat=args.multiclass_strat, min_c=args.min_c, strict=args.strict, seed=args.seed,
+        workers=args.workers,
+    )
+    write_res(args.output_file, names, result)
+    n_sig = sum(1 for v in result["lda"].values() if abs(v) > args.lda_abs_th)
+    with np.errstate(invalid="ignore"):
+        n_kw = int((result["kw_pvalues"] < args.anova_alpha).sum())
+    print(f"Number of significantly discriminative features: {n_kw} "
+          f"( {int(result['passed'].sum())} ) before internal wilcoxon")
+    print(f"Number of discriminative features with abs LDA score > {args.lda_abs_th} : {n_sig}")
+    print(f".res 저장: {args.output_file}")
+
+
+if __name__ == "__main__":
+    main()
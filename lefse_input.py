@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LEfSe 입력 테이블 스트리밍 작성기 (10.lefse_input_table.py, 10.lefse_input_table_genus.py 공용)
+
+feature table TSV를 한 행씩 읽으면서
+  1. 맨 앞 주석(#) 행은 건너뛰고 '#OTU ID' 헤더 행을 찾고
+  2. 헤더로부터 LEfSe 헤더 행들(class/subclass/subject 또는 group/subject)을 먼저 쓴 뒤
+  3. 데이터 행은 그대로(필요하면 첫 열 이름만 바꿔서) 출력 파일로 복사한다.
+
+전체 행을 리스트나 DataFrame으로 올리지 않으므로 메모리는 chunk_rows 행 분량으로 고정된다.
+
+여러 비교(contrast)를 한 번에 만들 때는 stream_lefse_contrasts()를 사용한다.
+메타데이터(metadata_20FNS.tsv)로 contrast마다 포함할 샘플 열 번호 배열과 헤더 행을 미리 계산하고,
+feature table은 한 번만 읽으면서 모든 출력 파일에 동시에 기록한다.
+
+LEfSe 형식화 입력(format_input.py 결과, pickle)이 필요하면 write_formatted_input()으로
+메모리의 행렬에서 바로 만든다. 텍스트 테이블을 쓰고 format_input.py로 다시 파싱하는 단계가 없어지며,
+feature 이름 정리, 누락된 상위 단계 추가, 정규화, class/subclass/subject 정렬과 구간 정보는
+format_input.py와 같은 규칙을 따른다. (lefse_engine.py도 같은 함수를 사용)
+
+contrast 정의 예:
+  {"name": "DQ_vs_MW", "class": "sample_prefix", "include": {"sample_prefix": ["DQ", "MW"]}}
+  {"name": "site_by_subject", "class": "sample_prefix", "subclass": "subject"}
+    - class    : class 행에 쓸 메타데이터 컬럼 (필수)
+    - subclass : subclass 행에 쓸 컬럼 (없으면 subclass 행 생략)
+    - subject  : subject 행에 쓸 컬럼 (기본값: sample.id)
+    - include  : 컬럼 → 허용 값 목록 (모두 만족하는 샘플만 포함)
+  메타데이터 컬럼 외에 sample.id(샘플 이름)와 sample_prefix(샘플 이름의 '_' 앞부분, 예: DQ)를 쓸 수 있다.
+"""
+
+import csv
+import itertools
+import pickle
+import re
+
+import numpy as np
+
+from lineage import LineageIndex
+
+DEFAULT_CHUNK_ROWS = 10000
+GROUP_PREFIXES = ("DQ", "MW", "TC")
+
+
+def _is_header(cell):
+    return cell.lower().startswith("#otu id")
+
+
+def _read_header(reader):
+    """'#OTU ID' 헤더 행 반환 (헤더 앞의 다른 '#' 주석 행은 건너뜀)"""
+    for row in reader:
+        if row and row[0].startswith("#") and not _is_header(row[0]):
+            continue
+        return row
+    raise RuntimeError("유효한 헤더를 찾지 못했습니다. (#OTU ID로 시작하는 행이 필요합니다.)")
+
+
+# ============================================
+# 헤더 행 생성 규칙
+# ============================================
+def class_subclass_subject_rows(header):
+    """
+    10.lefse_input_table.py 형식
+      - class   : "DQ"/"MW"/"TC"로 시작하는 열은 '_' 앞 접두어, 그 외는 ""
+      - subclass: 원본 헤더 (첫 셀만 "subclass")
+      - subject : 원본 헤더 (첫 셀만 "subject")
+    """
+    class_row = ["class"]
+    for cell in header[1:]:
+        cell_str = cell.strip()
+        class_row.append(cell_str.split("_")[0] if cell_str.startswith(GROUP_PREFIXES) else "")
+    return [class_row, ["subclass"] + header[1:], ["subject"] + header[1:]]
+
+
+def group_subject_rows(header):
+    """
+    10.lefse_input_table_genus.py 형식
+      - group  : "DQ"/"MW"/"TC"로 시작하는 열은 그 접두어, 그 외는 열 이름 그대로
+      - subject: 원본 헤더 (첫 셀만 "subject")
+    """
+    group_row = ["group"]
+    for col_name in header[1:]:
+        prefix = next((p for p in GROUP_PREFIXES if col_name.startswith(p)), None)
+        group_row.append(prefix if prefix else col_name)
+    return [group_row, ["subject"] + header[1:]]
+
+
+# ============================================
+# 첫 열 이름 변경 규칙
+# ============================================
+def genus_feature_names(feature_ids):
+    """lineage('...;g__Streptococcus')이고 genus token이 g__로 시작하면 그 token만 사용"""
+    genus_tokens = LineageIndex(feature_ids).token("genus")
+    return [genus if ';' in fid and genus.startswith("g__") else fid
+            for fid, genus in zip(feature_ids, genus_tokens)]
+
+
+# ============================================
+# 스트리밍 작성
+# ============================================
+def stream_lefse_input(input_path, output_path, header_rows, rename=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                       plain_text=False):
+    """
+    LEfSe 입력 테이블 작성
+
+    Args:
+        input_path (str): feature table TSV ('#OTU ID' 헤더)
+        output_path (str): 출력 TSV
+        header_rows (callable): 원본 헤더 행 → 출력 맨 위에 쓸 행 목록
+        rename (callable): chunk의 첫 열 값 목록 → 바꿀 이름 목록 (None이면 그대로)
+        chunk_rows (int): 한 번에 처리할 데이터 행 수
+        plain_text (bool): True이면 csv 모듈 없이 줄 단위 텍스트로 처리
+            (각 줄 양끝 공백 제거 후 탭으로 나누고 다시 탭으로 연결, 따옴표 처리·열 수 맞춤 없음,
+             중간의 '#' 주석 줄도 건너뜀. 기존 10.lefse_input_table_genus.py 출력과 같음)
+
+    Returns:
+        int: 복사한 데이터 행 수
+    """
+    if plain_text:
+        return _stream_plain_text(input_path, output_path, header_rows, rename, chunk_rows)
+    n_rows = 0
+    with open(input_path, "r", newline="") as infile, open(output_path, "w", newline="") as outfile:
+        reader = csv.reader(infile, delimiter="\t")
+        writer = csv.writer(outfile, delimiter="\t", lineterminator="\n")
+        header = _read_header(reader)
+        writer.writerows(header_rows(header))
+
+        width = len(header)
+        while True:
+            rows = [row + [""] * (width - len(row)) for row in itertools.islice(reader, chunk_rows)]
+            if not rows:
+                break
+            if rename is not None:
+                for row, name in zip(rows, rename([row[0] for row in rows])):
+                    row[0] = name
+            writer.writerows(rows)
+            n_rows += len(rows)
+    return n_rows
+
+
+def _stream_plain_text(input_path, output_path, header_rows, rename, chunk_rows):
+    n_rows = 0
+    with open(input_path, "r") as infile, open(output_path, "w", encoding="utf-8") as outfile:
+        header = None
+        for line in infile:
+            if line.startswith("#") and line.strip().startswith("#OTU ID"):
+                header = line.strip().split("\t")
+                break
+        if header is None:
+            raise RuntimeError("입력 파일에 '#OTU ID' 헤더 행을 찾을 수 없습니다.")
+        outfile.writelines("\t".join(row) + "\n" for row in header_rows(header))
+
+        data_lines = (line for line in infile if not line.startswith("#"))
+        while True:
+            rows = [line.strip().split("\t") for line in itertools.islice(data_lines, chunk_rows)]
+            if not rows:
+                break
+            if rename is not None:
+                for row, name in zip(rows, rename([row[0] for row in rows])):
+                    row[0] = name
+            outfile.writelines("\t".join(row) + "\n" for row in rows)
+            n_rows += len(rows)
+    return n_rows
+
+
+# ============================================
+# 메타데이터 기반 여러 contrast 동시 작성
+# ============================================
+def contrast_layout(header, metadata, contrast):
+    """
+    contrast 하나의 (포함할 열 번호 배열, 헤더 행 목록) 계산
+
+    Args:
+        header (list): feature table 헤더 행 (첫 셀은 '#OTU ID')
+        metadata (DataFrame): 첫 컬럼이 'sample.id'인 메타데이터 (metadata.load_metadata)
+        contrast (dict): contrast 정의 (모듈 설명 참고)
+    """
+    samples = header[1:]
+    # 값은 원문 문자열로 사용 (reindex로 생긴 빈 값 때문에 정수 컬럼이 3.0처럼 바뀌지 않도록)
+    metadata = metadata.astype(str).where(metadata.notna())
+    meta = metadata.drop_duplicates('sample.id').set_index('sample.id').reindex(samples)
+    meta['sample.id'] = samples
+    meta['sample_prefix'] = [s.split("_")[0] for s in samples]
+
+    class_values = meta[contrast['class']]
+    keep = class_values.notna() & (class_values.astype(str).str.strip() != "")
+    for column, allowed in contrast.get('include', {}).items():
+        keep &= meta[column].astype(str).isin([str(v) for v in allowed])
+    selected = meta[keep.to_numpy()]
+
+    rows = [["class"] + selected[contrast['class']].astype(str).tolist()]
+    if contrast.get('subclass'):
+        rows.append(["subclass"] + selected[contrast['subclass']].astype(str).tolist())
+    rows.append(["subject"] + selected[contrast.get('subject', 'sample.id')].astype(str).tolist())
+    # +1: 첫 열은 feature ID
+    return np.flatnonzero(keep.to_numpy()) + 1, rows
+
+
+def stream_lefse_contrasts(input_path, metadata, contrasts, output_paths, rename=None,
+                           chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    feature table을 한 번만 읽으면서 contrast별 LEfSe 입력 파일을 모두 작성
+
+    Args:
+        input_path (str): feature table TSV ('#OTU ID' 헤더)
+        metadata (DataFrame): 'sample.id' 컬럼을 가진 메타데이터
+        contrasts (list): contrast 정의 목록
+        output_paths (list): contrast별 출력 경로
+        rename (callable): 첫 열 이름 변경 규칙 (stream_lefse_input과 동일)
+
+    Returns:
+        list: contrast별 포함된 샘플 수
+    """
+    handles = [open(path, "w", newline="") for path in output_paths]
+    try:
+        writers = [csv.writer(h, delimiter="\t", lineterminator="\n") for h in handles]
+        with open(input_path, "r", newline="") as infile:
+            reader = csv.reader(infile, delimiter="\t")
+            header = _read_header(reader)
+            width = len(header)
+
+            layouts = [contrast_layout(header, metadata, contrast) for contrast in contrasts]
+            for writer, (_, header_rows) in zip(writers, layouts):
+                writer.writerows(header_rows)
+
+            while True:
+                rows = [(row + [""] * (width - len(row)))[:width] for row in itertools.islice(reader, chunk_rows)]
+                if not rows:
+                    break
+                block = np.array(rows, dtype=object)
+                names = block[:, :1]
+                if rename is not None:
+                    names = np.array(rename(list(block[:, 0])), dtype=object)[:, np.newaxis]
+                for writer, (columns, _) in zip(writers, layouts):
+                    writer.writerows(np.hstack([names, block[:, columns]]).tolist())
+    finally:
+        for h in handles:
+            h.close()
+    return [len(columns) for columns, _ in layouts]
+
+
+# ============================================
+# LEfSe 형식화 입력 (format_input.py와 같은 규칙)
+# ============================================
+def lefse_feature_name(name):
+    """format_input.py와 같은 규칙으로 feature 이름 정리 ('|' → '.', 특수문자 → '_')"""
+    for pattern in [" ", r"\$", r"\@", r"#", r"%", r"\^", r"\&", r"\*", r"\"", r"\'"]:
+        name = re.sub(pattern, "", name)
+    for pattern in ["/", r"\(", r"\)", r"-", r"\+", r"=", r"{", r"}", r"\[", r"\]", r",", r"\.", r";", r":",
+                    r"\?", r"\<", r"\>"]:
+        name = re.sub(pattern, "_", name)
+    name = name.replace("|", ".")
+    if name[:1] in list("0123456789_"):
+        name = "f_" + name
+    return name
+
+
+def add_missing_levels(names, values):
+    """
+    'a.b.c'만 있고 'a', 'a.b'가 없으면 그 상위 단계를 하위 feature 합으로 추가 (뒤에 붙임)
+
+    format_input.py와 같이 이름이 그 단계로 시작하는 모든 feature를 더한다.
+    """
+    existing = set(names)
+    members = {}
+    for i, name in enumerate(names):
+        parts = name.split(".")
+        for depth in range(1, len(parts)):
+            prefix = ".".join(parts[:depth])
+            if prefix not in existing:
+                members.setdefault(prefix, []).append(i)
+    if not members:
+        return list(names), values
+    added = np.vstack([values[rows].sum(axis=0) for rows in members.values()])
+    return list(names) + list(members), np.vstack([values, added])
+
+
+def normalize(names, values, norm_value):
+    """
+    format_input.py -o: 샘플마다 합이 norm_value가 되도록 스케일
+
+    계층 테이블(이름의 '.' 수 합 > feature 수)이면 최상위('.'가 없는) feature 합을 기준으로 하고,
+    그 합이 모두 0이면 전체 합을 사용한다. 값이 거의 일정한 feature는 1e-6 단위로 반올림.
+    """
+    if norm_value is None or norm_value < 0:
+        return values
+    hierarchical = sum(n.count(".") for n in names) > len(names)
+    totals = values.sum(axis=0)
+    if hierarchical:
+        top = np.array([n.count(".") < 1 for n in names], dtype=bool)
+        top_totals = values[top].sum(axis=0)
+        if top_totals.sum() != 0:
+            totals = top_totals
+    scale = np.divide(float(norm_value), totals, out=np.zeros_like(totals, dtype=np.float64), where=totals != 0)
+    values = values * scale
+    means = values.mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        flat = (means != 0) & (values.std(axis=1) / means < 1e-10)
+    values[flat] = np.round(values[flat] * 1e6) / 1e6
+    return values
+
+
+def _sort_key(value):
+    return (0, int(value), "") if value.lstrip("-").isdigit() else (1, 0, value)
+
+
+def format_lefse_input(names, values, classes, subclasses=None, subjects=None, norm_value=-1.0):
+    """
+    format_input.py가 pickle로 저장하는 dict를 메모리의 행렬에서 바로 생성
+
+    Args:
+        names (list): feature 이름 ('|' 계층 구분 가능)
+        values (ndarray): feature × sample 값
+        classes, subclasses, subjects (list): sample별 라벨 (subclass/subject는 없으면 None)
+        norm_value (float): 정규화 값 (음수면 정규화 안 함)
+
+    Returns:
+        dict: feats, norm, cls, class_sl, subclass_sl, class_hierarchy
+    """
+    n_samples = len(classes)
+    classes = [str(c) for c in classes]
+    subjects = [str(s) for s in subjects] if subjects is not None else [str(i) for i in range(n_samples)]
+    # subclass 이름은 class 이름을 앞에 붙여 구분 (없으면 class마다 '<class>_subcl' 하나)
+    if subclasses is not None:
+        subclasses = [f"{c}_{s}" for c, s in zip(classes, subclasses)]
+    else:
+        subclasses = [f"{c}_subcl" for c in classes]
+
+    # class → subclass → subject 순으로 정렬 (숫자 라벨은 숫자 크기 순)
+    order = sorted(range(n_samples),
+                   key=lambda i: (_sort_key(classes[i]), _sort_key(subclasses[i]), _sort_key(subjects[i])))
+    classes = [classes[i] for i in order]
+    subclasses = [subclasses[i] for i in order]
+    subjects = [subjects[i] for i in order]
+    values = np.asarray(values, dtype=np.float64)[:, order]
+
+    names = [lefse_feature_name(n) for n in names]
+    names, values = add_missing_levels(names, values)
+    values = normalize(names, values, norm_value)
+
+    class_sl, subclass_sl, class_hierarchy = {}, {}, {}
+    for i, (cls, sub) in enumerate(zip(classes, subclasses)):
+        start = class_sl.get(cls, (i, i))[0]
+        class_sl[cls] = (start, i + 1)
+        start = subclass_sl.get(sub, (i, i))[0]
+        subclass_sl[sub] = (start, i + 1)
+        hierarchy = class_hierarchy.setdefault(cls, [])
+        if sub not in hierarchy:
+            hierarchy.append(sub)
+
+    return {
+        "feats": {name: row.tolist() for name, row in zip(names, values)},
+        "norm": norm_value,
+        "cls": {"class": classes, "subclass": subclasses, "subject": subjects},
+        "class_sl": class_sl,
+        "subclass_sl": subclass_sl,
+        "class_hierarchy": class_hierarchy,
+    }
+
+
+def write_formatted_input(table, output_path, header_rows, rename=None, norm_value=1000000.0):
+    """
+    FeatureTable → LEfSe 형식화 입력(pickle, run_lefse.py의 입력) 직접 저장
+
+    Args:
+        table (FeatureTable): feature_table.load_table 결과
+        header_rows (callable): 텍스트 입력과 같은 헤더 행 규칙 (class_subclass_subject_rows 등)
+            첫 행은 class, 첫 셀이 'subclass'/'subject'인 행은 각각 subclass/subject로 사용
+        rename (callable): feature ID 목록 → 이름 목록 (None이면 그대로)
+        norm_value (float): format_input.py -o 값 (음수면 정규화 안 함)
+
+    Returns:
+        dict: 저장한 내용
+    """
+    header = [table.id_column or "#OTU ID"] + [str(s) for s in table.sample_ids]
+    rows = header_rows(header)
+    labels = {row[0]: row[1:] for row in rows[1:]}
+    names = [str(f) for f in table.feature_ids]
+    if rename is not None:
+        names = rename(names)
+
+    # 정규화는 raw count에서 float64로 (format_input.py와 같은 값, float32 TSS 층은 쓰지 않음)
+    values = table.dense_rows(np.arange(table.shape[0]))
+    formatted = format_lefse_input(names, values, rows[0][1:], labels.get("subclass"), labels.get("subject"),
+                                   norm_value)
+    with open(output_path, "wb") as fh:
+        pickle.dump(formatted, fh, 2)
+    return formatted
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+taxonomy lineage 문자열 공용 파서
+
+"d__Bacteria;p__Firmicutes;...;g__Streptococcus" 같은 lineage 문자열을 스크립트마다
+split / 정규식으로 따로 파싱하던 것을 한 곳에서 처리한다.
+
+  - 서로 다른 lineage 문자열만 한 번 파싱 (같은 문자열이 여러 행이어도 1회)
+  - rank(domain … species)별로 token을 정수 코드로 intern → codes 행렬 (lineage × rank, 없으면 -1)
+  - genus, 가장 낮은 분류 rank, "Unclassified_..." 라벨을 배열 indexing으로 조회
+
+rank는 token 접두어(d__, p__, …, Greengenes의 k__ 포함)로 정하고, 접두어가 없는 형식
+(Bacteria;Firmicutes;...)이나 "__" token은 위치(0=domain … 6=species)로 정한다.
+"g__", "__"처럼 이름이 빈 token은 해당 rank가 "미분류"인 것으로 본다.
+
+사용 예:
+  index = lineage_index(table.lineages)
+  index.name("genus")      # → 'Streptococcus' / '' (미분류)
+  index.token("genus")     # → 'g__Streptococcus' / 'g__' / '' (rank 없음)
+  index.unclassified_labels()
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+RANKS = ("domain", "phylum", "class", "order", "family", "genus", "species")
+RANK_PREFIXES = ("d", "p", "c", "o", "f", "g", "s")
+_PREFIX_RANK = {p: i for i, p in enumerate(RANK_PREFIXES)}
+_PREFIX_RANK["k"] = 0  # Greengenes kingdom
+
+_CACHE = {}
+_CACHE_SIZE = 8
+
+
+def rank_position(rank):
+    """rank 이름('genus') 또는 위치(5) → 위치"""
+    return RANKS.index(rank) if isinstance(rank, str) else int(rank)
+
+
+def _parse(uniques):
+    """
+    서로 다른 lineage 문자열 목록 → (codes 행렬, rank별 token 어휘)
+
+    모든 lineage의 token을 한 번에 펼쳐서(long format) 처리하므로 문자열 단위 반복이 없다.
+    """
+    codes = np.full((len(uniques), len(RANKS)), -1, dtype=np.int32)
+    vocab = [pd.Index([], dtype=object) for _ in RANKS]
+    if len(uniques) == 0:
+        return codes, vocab
+
+    parts = pd.Series(uniques, dtype=object).str.split(";", expand=True)
+    long = parts.stack().str.strip()
+    long = long[long != ""]
+    rows = long.index.get_level_values(0).to_numpy()
+    positions = long.index.get_level_values(1).to_numpy()
+
+    # 접두어가 있으면 접두어로, 없으면 위치로 rank 결정
+    prefix = long.str.extract(r"^([a-z])__", expand=False)
+    ranks = prefix.map(_PREFIX_RANK).to_numpy(dtype=float)
+    ranks = np.where(np.isnan(ranks), positions, ranks).astype(np.int64)
+
+    # rank 범위 밖 token 제외, 같은 rank가 두 번 나오면 처음 것만 사용
+    frame = pd.DataFrame({"row": rows, "rank": ranks, "token": long.to_numpy()})
+    frame = frame[frame["rank"] < len(RANKS)].drop_duplicates(["row", "rank"])
+
+    for r in range(len(RANKS)):
+        part = frame[frame["rank"] == r]
+        rank_codes, vocab[r] = pd.factorize(part["token"])
+        codes[part["row"].to_numpy(), r] = rank_codes
+    return codes, vocab
+
+
+class LineageIndex:
+    """
+    lineage 문자열 배열의 rank별 정수 코드 테이블
+
+    Attributes:
+        lineages (pd.Index): 서로 다른 lineage 문자열 (처음 등장 순서)
+        inverse (ndarray): 행 → lineages 위치
+        codes (ndarray): int32 (len(lineages) × 7), rank별 token 코드 (-1: 해당 rank 없음)
+        vocab (list): rank별 token 어휘 (pd.Index, 'g__Streptococcus' 형태)
+    """
+
+    def __init__(self, lineages):
+        values = pd.Series(list(lineages), dtype=object).fillna("").astype(str)
+        self.inverse, uniques = pd.factorize(values)
+        self.lineages = pd.Index(uniques, dtype=object)
+        self.codes, self.vocab = _parse(self.lineages.to_numpy())
+        # rank별 이름(접두어 제거) 어휘, 맨 끝에 '' 하나를 더 두어 코드 -1이 ''로 조회되게 함
+        self._tokens = [np.append(v.to_numpy(dtype=object), "") for v in self.vocab]
+        self._names = [
+            np.append(v.str.replace(r"^[a-z]?__", "", regex=True).str.strip().to_numpy(dtype=object), "")
+            for v in self.vocab
+        ]
+        self._assigned = np.column_stack(
+            [self._names[r][self.codes[:, r]] != "" for r in range(len(RANKS))]
+        ) if len(self.lineages) else np.zeros((0, len(RANKS)), dtype=bool)
+
+    def __len__(self):
+        return len(self.inverse)
+
+    @property
+    def assigned_ranks(self):
+        """서로 다른 lineage × rank 분류 여부 (bool 행렬, 행 순서는 self.lineages)"""
+        return self._assigned
+
+    def token(self, rank):
+        """행별 rank token 원문 ('g__Streptococcus', 'g__', 해당 rank가 없으면 '')"""
+        r = rank_position(rank)
+        return self._tokens[r][self.codes[:, r]][self.inverse]
+
+    def name(self, rank):
+        """행별 rank 이름 (접두어 제거, 미분류이면 '')"""
+        r = rank_position(rank)
+        return self._names[r][self.codes[:, r]][self.inverse]
+
+    def assigned(self, rank):
+        """행별 rank 분류 여부 (bool 배열)"""
+        return self._assigned[:, rank_position(rank)][self.inverse]
+
+    def genus(self):
+        return self.name("genus")
+
+    def lowest_rank(self, max_rank="species"):
+        """행별로 max_rank 이하에서 이름이 있는 가장 낮은 rank 위치 (없으면 -1)"""
+        top = rank_position(max_rank)
+        assigned = self._assigned[:, :top + 1]
+        lowest = top - np.argmax(assigned[:, ::-1], axis=1)
+        lowest = np.where(assigned.any(axis=1), lowest, -1)
+        return lowest[self.inverse]
+
+    def lowest_label(self, max_rank="species"):
+        """행별 가장 낮은 분류 rank 라벨 ('f__Lachnospiraceae', 없으면 '')"""
+        lowest = self.lowest_rank(max_rank)
+        labels = np.full(len(lowest), "", dtype=object)
+        for r in np.unique(lowest[lowest >= 0]):
+            hit = lowest == r
+            labels[hit] = RANK_PREFIXES[r] + "__" + self.name(r)[hit]
+        return labels
+
+    def unclassified_labels(self, rank="genus"):
+        """
+        행별 표시 라벨: rank가 분류되어 있으면 'g__이름',
+        아니면 'Unclassified_<더 높은 rank 중 가장 낮은 라벨>' (아무 rank도 없으면 'Unclassified_Unknown')
+        """
+        r = rank_position(rank)
+        labels = RANK_PREFIXES[r] + "__" + pd.Series(self.name(r), dtype=object)
+        fallback = pd.Series(self.lowest_label(r - 1) if r > 0 else np.full(len(self), ""), dtype=object)
+        fallback = "Unclassified_" + fallback.where(fallback != "", "Unknown")
+        return np.where(self.assigned(r), labels.to_numpy(dtype=object), fallback.to_numpy(dtype=object))
+
+
+def lineage_index(lineages):
+    """
+    LineageIndex 생성 (같은 lineage 목록이면 이전에 만든 인덱스를 재사용)
+
+    Args:
+        lineages (iterable): lineage 문자열 (pd.Index / Series / list)
+    """
+    values = pd.Series(list(lineages), dtype=object).fillna("").astype(str).tolist()
+    digest = hashlib.sha1("\n".join(values).encode("utf-8")).hexdigest()
+    index = _CACHE.get(digest)
+    if index is None:
+        index = LineageIndex(values)
+        if len(_CACHE) >= _CACHE_SIZE:
+            _CACHE.pop(next(iter(_CACHE)))
+        _CACHE[digest] = index
+    return index
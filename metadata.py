@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+샘플 메타데이터(metadata_20FNS.tsv) 공용 로더
+
+01 alpha diversity 병합과 10 LEfSe 입력(contrast) 작성이 같은 규칙으로 메타데이터를 읽는다.
+"""
+
+import pandas as pd
+
+
+def load_metadata(metadata_file):
+    """메타데이터를 읽고 컬럼 공백 제거, 첫 번째 컬럼을 'sample.id'로 변경"""
+    metadata = pd.read_csv(metadata_file, sep='\t')
+    metadata.columns = metadata.columns.str.strip()
+    metadata.rename(columns={metadata.columns[0]: 'sample.id'}, inplace=True)
+    return metadata
@@ -0,0 +1,51 @@
+# PCoA 아티팩트 캐시 헬퍼 (05/06 스크립트에서 source, qza_reader.ArtifactCache와 같은 규칙)
+#
+#   - 키  : 아티팩트 UUID + data/ payload 체크섬 (압축을 푼 data/ 파일들의 md5)
+#   - 값  : qiime2R::read_qza() 결과 (.rds 바이너리)
+#   - 정리: 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은(mtime 기준) 파일부터 삭제 (LRU)
+#
+# 사용 예:
+#   source(file.path(repo_dir, "pcoa_cache.r"))
+#   pcoa_qza <- read_pcoa_cached(qza_file, file.path(tsv_output_folder, ".pcoa_cache"))
+
+# data/ 파일 이름과 내용 md5를 모은 체크섬 (크기가 같은 내용 변경도 구분)
+pcoa_payload_checksum <- function(qza_file, members) {
+    data_members <- sort(members$Name[grepl("/data/", members$Name) & !grepl("/$", members$Name)])
+    tmp_dir <- tempfile("pcoa_payload_")
+    on.exit(unlink(tmp_dir, recursive = TRUE), add = TRUE)
+    unzip(qza_file, files = data_members, exdir = tmp_dir)
+    sums <- tools::md5sum(file.path(tmp_dir, data_members))
+    listing <- file.path(tmp_dir, "payload.md5")
+    writeLines(paste0(data_members, ":", unname(sums)), listing)
+    substr(unname(tools::md5sum(listing)), 1, 16)
+}
+
+evict_pcoa_cache <- function(cache_folder, max_bytes) {
+    cache_files <- list.files(cache_folder, pattern = "\\.rds$", full.names = TRUE)
+    info <- file.info(cache_files)
+    info <- info[order(info$mtime), ]
+    total <- sum(info$size)
+    for (path in rownames(info)) {
+        if (total <= max_bytes) break
+        total <- total - info[path, "size"]
+        file.remove(path)
+    }
+}
+
+read_pcoa_cached <- function(qza_file, cache_folder, max_bytes = 512 * 1024^2) {
+    if (!dir.exists(cache_folder)) {
+        dir.create(cache_folder, recursive = TRUE)
+    }
+    members <- unzip(qza_file, list = TRUE)
+    uuid <- sub("/.*$", "", members$Name[1])
+    checksum <- pcoa_payload_checksum(qza_file, members)
+    cache_path <- file.path(cache_folder, paste0(uuid, "-", checksum, ".rds"))
+    if (file.exists(cache_path)) {
+        Sys.setFileTime(cache_path, Sys.time())
+        return(readRDS(cache_path))
+    }
+    pcoa_qza <- read_qza(qza_file)
+    saveRDS(pcoa_qza, cache_path)
+    evict_pcoa_cache(cache_folder, max_bytes)
+    pcoa_qza
+}
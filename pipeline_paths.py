@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+파이프라인 실행기(pipeline_runner.py)가 넘겨주는 경로를 각 스크립트에서 읽는 헬퍼
+
+실행기는 스테이지마다 `SPARTA_PATH_<이름>` 환경변수로 경로를 전달한다.
+환경변수가 없으면(스크립트를 단독 실행한 경우) 스크립트에 적힌 기본 경로를 그대로 사용한다.
+"""
+
+import os
+
+ENV_PREFIX = "SPARTA_PATH_"
+
+
+def env_name(name):
+    return ENV_PREFIX + name.upper()
+
+
+def stage_path(name, default):
+    """실행기가 지정한 경로가 있으면 그 값을, 없으면 default 반환"""
+    return os.environ.get(env_name(name), default)
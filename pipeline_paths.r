@@ -0,0 +1,15 @@
+# 파이프라인 실행기(pipeline_runner.py)가 넘겨주는 경로를 R 스크립트에서 읽는 헬퍼 (pipeline_paths.py와 같은 규칙)
+#
+# 실행기는 스테이지마다 SPARTA_PATH_<이름> 환경변수로 경로를 전달한다.
+# 환경변수가 없으면(스크립트를 단독 실행한 경우) 스크립트에 적힌 기본 경로를 그대로 사용한다.
+#
+# 사용 예 (스크립트와 같은 폴더에서 읽음):
+#   file_arg <- grep("^--file=", commandArgs(trailingOnly = FALSE), value = TRUE)
+#   repo_dir <- if (length(file_arg) > 0) dirname(sub("^--file=", "", file_arg[1])) else getwd()
+#   source(file.path(repo_dir, "pipeline_paths.r"))
+#   file_path <- stage_path("file_path", "/mnt/d/OneDrive/Sparta_300/...")
+
+stage_path <- function(name, default) {
+    value <- Sys.getenv(paste0("SPARTA_PATH_", toupper(name)), unset = "")
+    if (nzchar(value)) value else default
+}
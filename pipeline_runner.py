@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+번호 스테이지(01~18) 의존성 기반 실행기
+
+기능 요약:
+  1. 각 스테이지의 입력/출력을 pipeline_config/<machine>.json의 경로 키로 선언
+     - 한 스테이지의 입력 키가 다른 스테이지의 출력 키이면 자동으로 의존 관계가 생김
+  2. 입력/출력 파일 내용의 sha1을 상태 파일에 기록하고, 둘 다 그대로이면 스테이지 건너뜀
+  3. 서로 독립적인 스테이지(예: 09 heatmap, 10 LEfSe 입력, 14 Venn 테이블)는
+     각각 별도의 워커 프로세스로 동시에 실행
+  4. 스크립트에는 SPARTA_PATH_<이름> 환경변수로 경로 전달 (pipeline_paths.stage_path / pipeline_paths.r 참고)
+     - .py 스크립트는 현재 파이썬, .r 스크립트는 Rscript로 실행
+  5. 머신별 스크립트 사본 대신 설정 파일 하나씩 (*_mac 스크립트는 --machine mac 실행 래퍼)
+
+사용 예:
+  python pipeline_runner.py                 # 모든 스테이지 (머신은 OS로 자동 선택)
+  python pipeline_runner.py 03 09 --machine pc --jobs 4
+  python pipeline_runner.py 02 --machine mac --only --force   # 선행 스테이지 없이 02만 다시 실행
+  python pipeline_runner.py --list
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from pipeline_paths import env_name
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.join(REPO_DIR, "pipeline_config")
+
+# name    : 스테이지 이름
+# script  : 실행할 스크립트 (저장소 기준 경로)
+# paths   : 스크립트 변수 이름 → 설정 경로 키 (SPARTA_PATH_<변수> 환경변수로 전달)
+# inputs  : 입력 경로 키 목록 (폴더는 "키:패턴" 형식으로 해시할 파일 지정)
+# outputs : 출력 경로 키 목록 (폴더는 "키:패턴" 형식)
+# args    : 명령행 인자로 넘길 경로 키 목록 (argparse 스크립트용, 경로 키가 아닌 값은 그대로 전달)
+Stage = namedtuple("Stage", ["name", "script", "paths", "inputs", "outputs", "args"])
+Stage.__new__.__defaults__ = ({}, [], [], [])
+
+STAGES = [
+    Stage("01", "01.qza2tsv_alpha_meta.py",
+          paths={"input_dir": "diversity_dir", "metadata_file": "metadata", "output_dir": "alpha_meta_dir"},
+          inputs=["diversity_dir:*_vector.qza", "metadata"],
+          outputs=["alpha_meta_combined"]),
+    Stage("02", "02.alpha_kruskal_ggplot.r",
+          paths={"file_path": "alpha_meta_combined", "output_dir": "alpha_kruskal_dir"},
+          inputs=["alpha_meta_combined"],
+          outputs=["alpha_kruskal_dir:*_plot.pdf"]),
+    Stage("03", "03.alpha_meta_complete_set.py",
+          paths={"input_file": "alpha_meta_combined", "output_file": "alpha_meta_friedman"},
+          inputs=["alpha_meta_combined"],
+          outputs=["alpha_meta_friedman"]),
+    Stage("04", "04.alpha_friedman_ggplot.r",
+          paths={"file_path": "alpha_meta_friedman", "output_dir": "alpha_friedman_dir"},
+          inputs=["alpha_meta_friedman"],
+          outputs=["alpha_friedman_dir:*_plot.pdf"]),
+    Stage("05", "05.qza2tsv_beta_meta_all_mac.r",
+          paths={"qza_folder": "diversity_dir", "metadata_path": "metadata", "tsv_output_folder": "beta_meta_dir",
+                 "merged_output_folder": "pcoa_all_dir"},
+          inputs=["diversity_dir:*_pcoa_results.qza", "metadata"],
+          outputs=["pcoa_all_dir:*_meta_all.tsv"]),
+    Stage("06", "06.qza2tsv_beta_meta_cs.r",
+          paths={"qza_folder": "diversity_dir", "metadata_path": "metadata", "tsv_output_folder": "beta_meta_dir",
+                 "merged_output_folder": "pcoa_cs_dir"},
+          inputs=["diversity_dir:*_pcoa_results.qza", "metadata"],
+          outputs=["pcoa_cs_dir:*_meta_cs.tsv"]),
+    Stage("07", "07.beta_tsv2ggplot_all.r",
+          paths={"pcoa_dir": "pcoa_all_dir"},
+          inputs=["pcoa_all_dir:*_meta_all.tsv"],
+          outputs=["pcoa_all_permanova"]),
+    Stage("08", "08.beta_tsv2ggplot_cs.r",
+          paths={"pcoa_dir": "pcoa_cs_dir"},
+          inputs=["pcoa_cs_dir:*_meta_cs.tsv"],
+          outputs=["pcoa_cs_permanova"]),
+    Stage("09", "09.genus_heatmap.py",
+          paths={"input_path": "genus_table", "output_folder": "heatmap_dir",
+                 "output_filename": "genus_heatmap_name"},
+          inputs=["genus_table"],
+          outputs=["genus_heatmap"]),
+    Stage("10", "10.lefse_input_table.py",
+          paths={"input_file": "species_table", "output_file": "lefse_input", "metadata_file": "metadata"},
+          inputs=["species_table", "metadata"],
+          outputs=["lefse_input"]),
+    Stage("10_genus", "10.lefse_input_table_genus.py",
+          paths={"input_path": "genus_table", "output_path": "lefse_input_genus", "metadata_file": "metadata"},
+          inputs=["genus_table", "metadata"],
+          outputs=["lefse_input_genus"]),
+    Stage("10_lefse", "lefse_engine.py",
+          inputs=["lefse_input_genus"],
+          outputs=["lefse_res"],
+          args=["lefse_input_genus", "lefse_res", "-c", "1", "-u", "2"]),
+    Stage("10_plot_res", "10.lefse_plot_res.py",
+          inputs=["lefse_res"],
+          outputs=["lefse_lda_plot"],
+          args=["lefse_res", "lefse_lda_plot"]),
+    Stage("11", "11.lefse_plot_cladogram.py",
+          inputs=["lefse_res"],
+          outputs=["lefse_cladogram"],
+          args=["lefse_res", "lefse_cladogram"]),
+    Stage("12", "12.Stackbar_subject_all.r",
+          paths={"cwd": "root"},
+          inputs=["genus_flt1_rf_table", "metadata"],
+          outputs=["stackbar_subject_pdf"]),
+    # 13.Stackbar_group_level_mc.r(Friedman 판)은 같은 파일을 쓰므로 스테이지로 등록하지 않고 필요할 때 직접 실행
+    Stage("13", "13.Stackbar_group_mc.r",
+          paths={"cwd": "root"},
+          inputs=["genus_flt1_rf_table", "metadata"],
+          outputs=["stackbar_group_pdf"]),
+    Stage("14", "14.genus_counting_venn.py",
+          paths={"input_file": "genus_rf_table", "output_file": "genus_venn_table"},
+          inputs=["genus_rf_table"],
+          outputs=["genus_venn_table"]),
+    Stage("15", "15.phylo_asv_select.py",
+          paths={"taxonomy_file": "phylo_taxonomy", "feature_table_file": "phylo_feature_table",
+                 "output_file": "selected_asvs"},
+          inputs=["phylo_taxonomy", "phylo_feature_table"],
+          outputs=["selected_asvs"]),
+    Stage("16", "16.asv2genus.py",
+          paths={"mapping_file": "asv_genus_mapping", "input_fasta": "repseq_fasta",
+                 "output_fasta": "repseq_genus_fasta"},
+          inputs=["asv_genus_mapping", "repseq_fasta"],
+          outputs=["repseq_genus_fasta"]),
+    Stage("18", "18.taxa_extract_csv.py",
+          paths={"base_dir": "taxa_csv_dir", "base_filename": "taxa_csv_base"},
+          inputs=["taxa_csv_input"],
+          outputs=["taxa_csv_taxonomy", "taxa_csv_converted", "taxa_csv_transposed"]),
+]
+
+
+def default_machine():
+    return "mac" if sys.platform == "darwin" else "pc"
+
+
+def load_config(config_path):
+    """머신별 설정 파일을 읽고 {root}, {다른 키} 참조를 모두 풀어서 경로 dict 반환"""
+    with open(config_path, "r", encoding="utf-8") as fh:
+        config = json.load(fh)
+    resolved = {"root": config["root"]}
+    pending = dict(config["paths"])
+    while pending:
+        progressed = False
+        for key, value in list(pending.items()):
+            try:
+                resolved[key] = value.format(**resolved)
+            except KeyError:
+                continue
+            del pending[key]
+            progressed = True
+        if not progressed:
+            raise ValueError(f"설정 경로 참조를 풀 수 없습니다: {sorted(pending)}")
+    return resolved
+
+
+def _split_spec(spec):
+    key, _, pattern = spec.partition(":")
+    return key, pattern
+
+
+def _hash_files(paths, spec_list):
+    """경로 키 목록이 가리키는 파일들의 내용 sha1 (없는 파일은 None)"""
+    digest = hashlib.sha1()
+    for spec in spec_list:
+        key, pattern = _split_spec(spec)
+        path = paths[key]
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if os.path.isfile(os.path.join(path, name)) and fnmatch.fnmatch(name, pattern or "*")
+            )
+        else:
+            files = [path]
+        for file in files:
+            if not os.path.exists(file):
+                return None
+            digest.update(file.encode("utf-8") + b"\0")
+            with open(file, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dependencies(stages):
+    """스테이지 이름 → 먼저 끝나야 하는 스테이지 이름 집합"""
+    producers = {_split_spec(out)[0]: st.name for st in stages for out in st.outputs}
+    return {
+        st.name: {producers[_split_spec(spec)[0]] for spec in st.inputs
+                  if _split_spec(spec)[0] in producers and producers[_split_spec(spec)[0]] != st.name}
+        for st in stages
+    }
+
+
+def run_stage(stage, paths, state, force, dry_run):
+    """
+    스테이지 하나 실행 (워커 스레드에서 호출, 실제 작업은 별도 프로세스)
+
+    Returns:
+        (str, dict): 결과 상태("skipped"/"done"/"failed"/"dry-run"), 새 상태 기록
+    """
+    input_hash = _hash_files(paths, stage.inputs)
+    if input_hash is None:
+        print(f"[{stage.name}] 입력 파일이 없습니다: {[paths[_split_spec(s)[0]] for s in stage.inputs]}")
+        return "failed", None
+    record = state.get(stage.name, {})
+    if (not force and record.get("inputs") == input_hash
+            and record.get("outputs") == _hash_files(paths, stage.outputs)):
+        return "skipped", record
+    if dry_run:
+        return "dry-run", record
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_DIR, env.get("PYTHONPATH")]))
+    for var, key in stage.paths.items():
+        env[env_name(var)] = paths[key]
+    for spec in stage.outputs:
+        key, pattern = _split_spec(spec)
+        os.makedirs(paths[key] if pattern else os.path.dirname(paths[key]), exist_ok=True)
+    script = os.path.join(REPO_DIR, stage.script)
+    interpreter = ["Rscript"] if stage.script.endswith(".r") else [sys.executable]
+    cmd = interpreter + [script] + [paths.get(key, key) for key in stage.args]
+    print(f"[{stage.name}] 실행: {stage.script}")
+    try:
+        result = subprocess.run(cmd, env=env, stdin=subprocess.DEVNULL)
+    except OSError as e:
+        print(f"[{stage.name}] 실행할 수 없습니다 ({cmd[0]}): {e}")
+        return "failed", None
+    if result.returncode != 0:
+        return "failed", None
+    return "done", {"inputs": input_hash, "outputs": _hash_files(paths, stage.outputs)}
+
+
+def run_pipeline(stages, paths, jobs, force=False, dry_run=False):
+    state_file = paths["state_file"]
+    state = {}
+    if os.path.exists(state_file):
+        with open(state_file, "r", encoding="utf-8") as fh:
+            state = json.load(fh)
+
+    deps = dependencies(stages)
+    by_name = {st.name: st for st in stages}
+    status = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while len(status) < len(stages):
+            for name, st in by_name.items():
+                if name in status or name in running.values():
+                    continue
+                if any(status.get(d) in ("failed", "blocked") for d in deps[name]):
+                    status[name] = "blocked"
+                    print(f"[{name}] 선행 스테이지 실패로 건너뜀")
+                elif all(d in status for d in deps[name]):
+                    running[executor.submit(run_stage, st, paths, state, force, dry_run)] = name
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                status[name], record = future.result()
+                if status[name] == "done":
+                    state[name] = record
+                    with open(state_file, "w", encoding="utf-8") as fh:
+                        json.dump(state, fh, indent=1)
+                print(f"[{name}] {status[name]}")
+    return status
+
+
+def read_params():
+    parser = argparse.ArgumentParser(description="Sparta_300 pipeline runner")
+    parser.add_argument("stages", nargs="*", help="실행할 스테이지 (기본: 전체, 선행 스테이지 자동 포함)")
+    parser.add_argument("--machine", default=default_machine(), help="pipeline_config/<machine>.json 선택")
+    parser.add_argument("--config", default=None, help="설정 파일 경로 직접 지정")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1), help="동시 실행 스테이지 수")
+    parser.add_argument("--only", action="store_true", help="선행 스테이지를 포함하지 않고 지정한 스테이지만 실행")
+    parser.add_argument("--force", action="store_true", help="해시가 같아도 다시 실행")
+    parser.add_argument("--dry_run", action="store_true", help="실행할 스테이지만 표시")
+    parser.add_argument("--list", action="store_true", help="스테이지 목록과 의존 관계 출력")
+    return parser.parse_args()
+
+
+def select_stages(names, with_deps=True):
+    """요청한 스테이지와 그 선행 스테이지 전체 (with_deps=False이면 요청한 스테이지만)"""
+    if not names:
+        return list(STAGES)
+    deps = dependencies(STAGES)
+    unknown = set(names) - set(deps)
+    if unknown:
+        sys.exit(f"알 수 없는 스테이지: {sorted(unknown)}")
+    if not with_deps:
+        return [st for st in STAGES if st.name in names]
+    wanted = set()
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name not in wanted:
+            wanted.add(name)
+            stack.extend(deps[name])
+    return [st for st in STAGES if st.name in wanted]
+
+
+def main():
+    args = read_params()
+    if args.list:
+        deps = dependencies(STAGES)
+        for st in STAGES:
+            print(f"{st.name:12s} {st.script:34s} <- {', '.join(sorted(deps[st.name])) or '-'}")
+        return
+    config_path = args.config or os.path.join(CONFIG_DIR, f"{args.machine}.json")
+    paths = load_config(config_path)
+    status = run_pipeline(select_stages(args.stages, not args.only), paths, args.jobs, args.force, args.dry_run)
+    if any(s in ("failed", "blocked") for s in status.values()):
+        sys.exit(1)
+
+
+def run_standalone(name, machine):
+    """*_mac 래퍼 스크립트용: 머신 설정 경로로 스테이지 하나만 다시 실행 (종료 코드 반환)"""
+    paths = load_config(os.path.join(CONFIG_DIR, f"{machine}.json"))
+    status = run_pipeline(select_stages([name], with_deps=False), paths, 1, force=True)
+    return 0 if status.get(name) == "done" else 1
+
+
+if __name__ == "__main__":
+    main()
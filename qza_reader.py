@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+QIIME2 아티팩트(.qza) 직접 읽기 모듈
+
+.qza 파일은 `<UUID>/metadata.yaml`, `<UUID>/data/...` 구조의 zip 압축 파일이므로
+`qiime tools export` 서브프로세스나 임시 폴더 없이 zip 내부의 payload를 바로
+DataFrame으로 읽을 수 있다.
+
+  - read_alpha_vector(qza_path)  : *_vector.qza → ['sample.id', metric] DataFrame
+  - read_pcoa_results(qza_path)  : *_pcoa_results.qza → Vectors/Eigvals/ProportionExplained
+  - read_artifact_uuid(qza_path) : metadata.yaml의 uuid 값
+  - artifact_key(qza_path, kind) : UUID + payload 체크섬 기반 식별 키
+
+cache 인자로 ArtifactCache를 넘기면 (UUID + payload 체크섬) 키로 파싱 결과를
+pickle 형태로 디스크에 저장해 두고, 다음 실행에서는 zip을 다시 파싱하지 않는다.
+"""
+
+import hashlib
+import io
+import os
+import pickle
+import threading
+import zipfile
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sparta_300", "qza")
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _find_member(zf, suffix):
+    """zip 내부에서 `<UUID>/<suffix>` 경로를 찾아 반환"""
+    for name in zf.namelist():
+        parts = name.split("/", 1)
+        if len(parts) == 2 and parts[1] == suffix:
+            return name
+    raise FileNotFoundError(f"아티팩트 내부에 '{suffix}' 파일이 없습니다.")
+
+
+def _find_data_member(zf, extensions):
+    """`<UUID>/data/` 아래에서 확장자가 일치하는 첫 번째 payload 파일 반환"""
+    for name in zf.namelist():
+        parts = name.split("/")
+        if len(parts) == 3 and parts[1] == "data" and parts[2].endswith(extensions):
+            return name
+    raise FileNotFoundError(f"아티팩트 data/ 폴더에 {extensions} 파일이 없습니다.")
+
+
+def _read_uuid(zf):
+    with zf.open(_find_member(zf, "metadata.yaml")) as fh:
+        for raw in io.TextIOWrapper(fh, encoding="utf-8"):
+            if raw.startswith("uuid:"):
+                return raw.split(":", 1)[1].strip()
+    raise ValueError("metadata.yaml에 uuid 항목이 없습니다.")
+
+
+def read_artifact_uuid(qza_path):
+    """metadata.yaml의 uuid 값 반환 (yaml 패키지 없이 한 줄만 파싱)"""
+    with zipfile.ZipFile(qza_path) as zf:
+        return _read_uuid(zf)
+
+
+def _artifact_key(zf, kind):
+    """
+    캐시 키 = 종류 + UUID + data/ payload 체크섬
+
+    체크섬은 zip 중앙 디렉터리에 이미 기록된 CRC32와 크기로 계산하므로
+    payload 압축을 풀 필요가 없다.
+    """
+    digest = hashlib.sha1()
+    for info in sorted(zf.infolist(), key=lambda i: i.filename):
+        if "/data/" in info.filename:
+            digest.update(f"{info.filename}:{info.CRC}:{info.file_size};".encode("utf-8"))
+    return f"{kind}-{_read_uuid(zf)}-{digest.hexdigest()[:16]}"
+
+
+def artifact_key(qza_path, kind):
+    """아티팩트 식별 키 (종류 + UUID + payload 체크섬) 반환"""
+    with zipfile.ZipFile(qza_path) as zf:
+        return _artifact_key(zf, kind)
+
+
+class ArtifactCache:
+    """
+    파싱된 아티팩트를 pickle 파일로 저장하는 디스크 캐시
+
+    전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은(mtime 기준) 파일부터 삭제한다.
+    캐시 적중 시 파일 mtime을 갱신하여 LRU 순서를 유지한다.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                obj = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return obj
+
+    def put(self, key, obj):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(obj, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """전체 크기가 max_bytes 이하가 될 때까지 오래된 항목 삭제"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".pkl"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+def _read_with_cache(qza_path, kind, parse, cache):
+    """캐시가 있으면 키로 조회하고, 없을 때만 parse(zf) 실행 후 저장"""
+    with zipfile.ZipFile(qza_path) as zf:
+        if cache is None:
+            return parse(zf)
+        key = _artifact_key(zf, kind)
+        obj = cache.get(key)
+        if obj is None:
+            obj = parse(zf)
+            cache.put(key, obj)
+        return obj
+
+
+def metric_name_from_path(qza_path):
+    """chao1_vector.qza → chao1"""
+    return os.path.basename(qza_path).replace("_vector.qza", "")
+
+
+def _parse_alpha(zf):
+    with zf.open(_find_data_member(zf, (".tsv",))) as fh:
+        return pd.read_csv(fh, sep="\t")
+
+
+def read_alpha_vector(qza_path, metric_name=None, cache=None):
+    """
+    alpha diversity 아티팩트를 읽어 ['sample.id', metric_name] 두 컬럼 DataFrame 반환
+
+    Args:
+        qza_path (str): *_vector.qza 경로
+        metric_name (str): 두 번째 컬럼 이름 (기본값: 파일명에서 추출)
+        cache (ArtifactCache): 파싱 결과 캐시 (None이면 사용하지 않음)
+    """
+    if metric_name is None:
+        metric_name = metric_name_from_path(qza_path)
+    df = _read_with_cache(qza_path, "alpha", _parse_alpha, cache)
+    # 첫 컬럼 → sample.id, 두 번째 컬럼 → metric_name
+    df = df.iloc[:, :2].copy()
+    df.columns = ["sample.id", metric_name]
+    return df
+
+
+def _parse_ordination(lines):
+    """scikit-bio ordination.txt 포맷 파싱 (Eigvals / Proportion explained / Site 섹션)"""
+    sections = {}
+    i = 0
+    while i < len(lines):
+        line = lines[i].rstrip("\n")
+        if not line.strip():
+            i += 1
+            continue
+        fields = line.split("\t")
+        name, sizes = fields[0], [int(v) for v in fields[1:]]
+        i += 1
+        if name in ("Eigvals", "Proportion explained"):
+            values = []
+            if sizes and sizes[0] > 0:
+                values = [float(v) for v in lines[i].rstrip("\n").split("\t")]
+                i += 1
+            sections[name] = values
+        else:
+            n_rows = sizes[0] if sizes else 0
+            sections[name] = [lines[i + k].rstrip("\n").split("\t") for k in range(n_rows)]
+            i += n_rows
+    return sections
+
+
+def _parse_pcoa(zf):
+    with zf.open(_find_data_member(zf, ("ordination.txt",))) as fh:
+        lines = io.TextIOWrapper(fh, encoding="utf-8").readlines()
+    sections = _parse_ordination(lines)
+
+    site_rows = sections.get("Site", [])
+    n_axes = len(site_rows[0]) - 1 if site_rows else 0
+    pcs = [f"PC{k + 1}" for k in range(n_axes)]
+    vectors = pd.DataFrame(
+        [[row[0]] + [float(v) for v in row[1:]] for row in site_rows],
+        columns=["SampleID"] + pcs,
+    )
+    eigvals = sections.get("Eigvals", [])
+    proportion = sections.get("Proportion explained", [])
+    return {
+        "Vectors": vectors,
+        "Eigvals": pd.DataFrame({"PC": [f"PC{k + 1}" for k in range(len(eigvals))], "Eigvals": eigvals}),
+        "ProportionExplained": pd.DataFrame(
+            {"PC": [f"PC{k + 1}" for k in range(len(proportion))], "ProportionExplained": proportion}
+        ),
+    }
+
+
+def read_pcoa_results(qza_path, cache=None):
+    """
+    PCoA 아티팩트를 읽어 qiime2R::read_qza()의 $data와 같은 구조의 dict 반환
+
+    Returns:
+        dict: {'Vectors': DataFrame(SampleID, PC1, PC2, ...),
+               'Eigvals': DataFrame(PC, Eigvals),
+               'ProportionExplained': DataFrame(PC, ProportionExplained)}
+    """
+    return _read_with_cache(qza_path, "pcoa", _parse_pcoa, cache)
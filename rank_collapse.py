@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ASV 테이블 + taxonomy → rank별 합산 테이블 / LEfSe 계층 feature 테이블
+
+rank마다 `qiime taxa collapse`를 따로 돌리지 않고, lineage 인덱스(lineage.py)의 rank별 정수 코드로
+그룹을 만든 뒤 FeatureTable.group_sum() 한 번(sparse 입력이면 지시 행렬 곱 한 번)으로 합산한다.
+
+  - collapse_rank(table, "genus")  : 'd__...;p__...;...;g__...' lineage 단위 합계 (qiime taxa collapse와 같은 모양)
+  - lefse_hierarchy(table, "genus"): domain부터 genus까지 모든 상위 단계가 feature로 들어간 테이블
+                                     ('d__Bacteria', 'd__Bacteria|p__Firmicutes', ...)
+                                     LEfSe는 '|'를 단계 구분자로 읽고 결과(.res)에는 'a.b.c'로 기록하므로
+                                     11.lefse_plot_cladogram.py가 모든 조상 노드를 그릴 수 있다.
+
+taxonomy는 BIOM observation metadata 또는 QIIME taxonomy TSV(Feature ID, Taxon)에서 가져온다.
+
+사용 예:
+  python rank_collapse.py feature-table.biom genus genus_table.tsv
+  python rank_collapse.py feature-table.tsv lefse lefse_features.tsv taxonomy.tsv
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from feature_table import FeatureTable, load_table
+from lineage import RANKS, rank_position
+
+MISSING_TOKEN = "__"
+
+
+def attach_taxonomy(table, taxonomy_file):
+    """QIIME taxonomy TSV(Feature ID, Taxon, ...)의 Taxon을 feature 순서에 맞춰 붙인 테이블"""
+    taxonomy = pd.read_csv(taxonomy_file, sep="\t", index_col=0, dtype=str)
+    taxon = taxonomy.iloc[:, 0].reindex(table.feature_ids.astype(str)).fillna("Unassigned")
+    return FeatureTable(table.counts, table.feature_ids, table.sample_ids, table.id_column,
+                        taxonomy=[";".join(t.strip() for t in v.split(";")) for v in taxon])
+
+
+def _level_groups(index, depth):
+    """
+    lineage(서로 다른 문자열) 단위로 0 ~ depth-1 단계의 경로 그룹 번호를 차례로 계산
+
+    단계 k의 그룹 = (단계 k-1 그룹, 단계 k token 코드) 쌍. 처음 등장 순서로 번호를 매긴다.
+
+    Returns:
+        list: 단계별 (lineage별 그룹 번호 배열, 그룹 수)
+    """
+    levels = []
+    groups = np.zeros(len(index.lineages), dtype=np.int64)
+    for k in range(depth):
+        width = len(index.vocab[k]) + 1
+        groups, uniques = pd.factorize(groups * width + index.codes[:, k] + 1)
+        levels.append((groups.astype(np.int64), len(uniques)))
+    return levels
+
+
+def _group_labels(index, groups, n_groups, depth, sep):
+    """그룹별 대표 lineage의 0 ~ depth-1 단계 token을 sep로 연결 (없는 단계는 '__')"""
+    first = np.full(n_groups, -1, dtype=np.int64)
+    order = np.arange(len(groups))[::-1]
+    first[groups[order]] = order  # 뒤에서부터 덮어써서 각 그룹의 첫 lineage가 남음
+    tokens = [
+        np.append(index.vocab[k].to_numpy(dtype=object), MISSING_TOKEN)[index.codes[first, k]]
+        for k in range(depth)
+    ]
+    return [sep.join(parts) for parts in zip(*tokens)]
+
+
+def collapse_rank(table, rank):
+    """
+    rank 수준 lineage 단위로 합산 (결과 feature ID 예: 'd__Bacteria;...;g__Streptococcus')
+
+    Args:
+        table (FeatureTable): ASV/하위 rank 테이블 (taxonomy가 없으면 feature ID를 lineage로 사용)
+        rank (str): 'phylum' ~ 'species'
+    """
+    index = table.lineage_index
+    depth = rank_position(rank) + 1
+    groups, n_groups = _level_groups(index, depth)[-1]
+    labels = _group_labels(index, groups, n_groups, depth, ";")
+    return table.group_sum(groups[index.inverse], labels)
+
+
+def lefse_hierarchy(table, max_rank="genus", sep="|"):
+    """
+    LEfSe용 계층 feature 테이블: domain ~ max_rank의 모든 단계 경로를 feature로 포함
+
+    각 ASV는 자신의 lineage에서 이름이 있는 단계마다 하나씩 그룹에 속하고,
+    모든 단계의 (그룹, ASV) 쌍을 한 번의 group_sum으로 합산한다.
+    이름이 비어 있는 단계('g__', '__')는 상위 단계 feature에 이미 포함되므로 따로 만들지 않는다.
+    """
+    index = table.lineage_index
+    depth = rank_position(max_rank) + 1
+    assigned = index.assigned_ranks[:, :depth]
+
+    all_groups, all_rows, labels = [], [], []
+    offset = 0
+    for k, (groups, n_groups) in enumerate(_level_groups(index, depth)):
+        level_labels = np.asarray(_group_labels(index, groups, n_groups, k + 1, sep), dtype=object)
+        # 이 단계 이름이 있는 lineage의 그룹만 feature로 사용
+        used = np.unique(groups[assigned[:, k]])
+        remap = np.full(n_groups, -1, dtype=np.int64)
+        remap[used] = offset + np.arange(len(used))
+        labels.extend(level_labels[used])
+        offset += len(used)
+
+        row_groups = remap[groups[index.inverse]]
+        member = np.flatnonzero(row_groups >= 0)
+        all_groups.append(row_groups[member])
+        all_rows.append(member)
+
+    # 단계 순서가 아니라 경로 이름 순으로 정렬하면 부모 feature 바로 뒤에 자식 feature가 옴
+    collapsed = table.group_sum(np.concatenate(all_groups), labels, rows=np.concatenate(all_rows))
+    order = np.argsort(np.asarray(labels, dtype=object), kind="stable")
+    return FeatureTable(collapsed.counts[order], collapsed.feature_ids[order], collapsed.sample_ids,
+                        table.id_column)
+
+
+def main():
+    if len(sys.argv) < 4:
+        sys.exit("사용법: python rank_collapse.py <테이블(.tsv|.biom)> <rank|lefse> <출력 TSV> [taxonomy.tsv]")
+    table_path, target, output_path = sys.argv[1:4]
+    table = load_table(table_path)
+    if len(sys.argv) > 4:
+        table = attach_taxonomy(table, sys.argv[4])
+    if target == "lefse":
+        result = lefse_hierarchy(table)
+    elif target in RANKS:
+        result = collapse_rank(table, target)
+    else:
+        sys.exit(f"알 수 없는 rank: {target} (가능: {', '.join(RANKS)}, lefse)")
+    result.to_frame().to_csv(output_path, sep="\t")
+    print(f"{target} 테이블 저장: {output_path} ({result.shape[0]} features x {result.shape[1]} samples)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+메모리보다 큰 구분자 텍스트 테이블(CSV/TSV)의 블록 단위 전치
+
+pd.read_csv(...).T는 원본과 전치 결과를 모두 메모리에 올리므로, feature × sample 테이블을
+sample × feature로 바꿀 때 테이블이 크면 메모리가 부족해진다. 여기서는 열 타일 단위로 나눠서 처리한다.
+
+  1단계: 입력을 한 행씩 읽으며 열을 tile_cols개씩 잘라 타일별 임시 파일에 기록
+  2단계: 타일 파일을 하나씩 읽어(행 수 × tile_cols 셀) 전치한 뒤 출력 파일 뒤에 이어서 기록
+
+메모리에는 항상 한 타일(약 max_cells 셀)만 올라간다. 셀은 숫자로 변환하지 않고 원문 그대로 옮긴다.
+(셀 안에 줄바꿈이 있는 CSV는 지원하지 않음)
+
+사용 예:
+  python table_transpose.py genus_20FNS-flt1.csv genus_20FNS-flt1_transposed.csv
+  python table_transpose.py input_table.tsv input_table_T.tsv --sep tab
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+
+DEFAULT_MAX_CELLS = 5_000_000  # 한 타일에 올릴 최대 셀 수
+MAX_OPEN_FILES = 256  # 1단계에서 동시에 열어 둘 타일 파일 수 (넘으면 입력을 여러 번 읽음)
+
+
+def count_rows(path):
+    """줄 수 (바이너리 블록 단위로 줄바꿈만 셈)"""
+    rows = 0
+    last = b"\n"
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            rows += block.count(b"\n")
+            last = block[-1:]
+    return rows + (last != b"\n")
+
+
+def _read_header(path, delimiter):
+    with open(path, "r", newline="", encoding="utf-8") as fh:
+        return next(csv.reader(fh, delimiter=delimiter), [])
+
+
+def _split_tiles(input_path, tmp_dir, tiles, n_cols, delimiter):
+    """입력을 한 번 읽으며 tiles [(시작 열, 끝 열), ...]의 열 구간을 타일 파일에 기록"""
+    paths = [os.path.join(tmp_dir, f"tile_{start}.csv") for start, _ in tiles]
+    handles = [open(p, "w", newline="", encoding="utf-8") for p in paths]
+    try:
+        writers = [csv.writer(h, delimiter=delimiter, lineterminator="\n") for h in handles]
+        with open(input_path, "r", newline="", encoding="utf-8") as fh:
+            reader = csv.reader(fh, delimiter=delimiter)
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) > n_cols:
+                    # 헤더보다 긴 행은 잘라내면 값이 사라지므로 중단 (pd.read_csv와 같은 동작)
+                    raise ValueError(f"{input_path}: {reader.line_num}번째 줄의 열 수({len(row)})가 "
+                                     f"헤더 열 수({n_cols})보다 많습니다.")
+                if len(row) < n_cols:
+                    row = row + [""] * (n_cols - len(row))
+                for (start, stop), writer in zip(tiles, writers):
+                    writer.writerow(row[start:stop])
+    finally:
+        for h in handles:
+            h.close()
+    return paths
+
+
+def transpose_table(input_path, output_path, delimiter=",", max_cells=DEFAULT_MAX_CELLS, tmp_dir=None):
+    """
+    구분자 텍스트 테이블을 열 타일 단위로 전치 (입력 i행 j열 → 출력 j행 i열)
+
+    Args:
+        input_path (str): 입력 CSV/TSV 경로 (첫 행의 열 수를 전체 열 수로 사용,
+                          짧은 행은 빈 칸으로 채우고 긴 행은 ValueError)
+        output_path (str): 출력 경로
+        delimiter (str): 입력/출력 구분자
+        max_cells (int): 한 타일의 최대 셀 수 (메모리 사용량 상한)
+        tmp_dir (str): 타일 임시 파일 위치 (기본값: 출력 파일과 같은 폴더)
+
+    Returns:
+        (int, int): 출력 테이블의 (행 수, 열 수)
+    """
+    n_cols = len(_read_header(input_path, delimiter))
+    n_rows = count_rows(input_path)
+    tile_cols = max(1, min(n_cols, max_cells // max(n_rows, 1)))
+    tiles = [(start, min(start + tile_cols, n_cols)) for start in range(0, n_cols, tile_cols)]
+
+    work_dir = tmp_dir or os.path.dirname(os.path.abspath(output_path))
+    with tempfile.TemporaryDirectory(prefix=".transpose_", dir=work_dir) as tmp, \
+            open(output_path, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out, delimiter=delimiter, lineterminator="\n")
+        for batch_start in range(0, len(tiles), MAX_OPEN_FILES):
+            batch = tiles[batch_start:batch_start + MAX_OPEN_FILES]
+            for path in _split_tiles(input_path, tmp, batch, n_cols, delimiter):
+                with open(path, "r", newline="", encoding="utf-8") as fh:
+                    block = list(csv.reader(fh, delimiter=delimiter))
+                writer.writerows(zip(*block))
+                os.remove(path)
+    return n_cols, n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core blocked transpose for CSV/TSV tables")
+    parser.add_argument("input_file")
+    parser.add_argument("output_file")
+    parser.add_argument("--sep", default=",", help="구분자 (',' 또는 'tab')")
+    parser.add_argument("--max_cells", type=int, default=DEFAULT_MAX_CELLS, help="한 타일의 최대 셀 수")
+    args = parser.parse_args()
+    delimiter = "\t" if args.sep in ("tab", "\\t") else args.sep
+    rows, cols = transpose_table(args.input_file, args.output_file, delimiter, args.max_cells)
+    print(f"전치 완료: {args.output_file} ({rows} x {cols})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# 저장소 최상위 모듈(lefse_engine.py 등)을 테스트에서 바로 import할 수 있도록 경로 추가
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
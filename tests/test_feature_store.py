@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""feature_store.py: 위치 읽기(_read_positions)와 store 조회 결과가 원본 테이블과 같은지 확인"""
+
+import numpy as np
+import pytest
+
+from feature_store import _read_positions, build_feature_store
+from feature_table import load_table, parse_feature_table
+
+MATRIX = np.arange(60, dtype=np.float32).reshape(10, 6)
+
+
+@pytest.mark.parametrize("positions", [
+    [2, 3, 4, 5],   # 연속 구간 (slice)
+    [1, 3, 2, 4],   # 첫/끝 차이는 연속 구간과 같지만 순서가 뒤섞인 경우
+    [5, 4, 3],      # 역순
+    [0, 7, 9],      # 떨어진 위치
+    [4],
+    [],
+])
+def test_read_positions_keeps_requested_order(positions):
+    np.testing.assert_array_equal(_read_positions(MATRIX, positions), MATRIX[positions])
+
+
+def test_read_positions_from_memmap(tmp_path):
+    path = tmp_path / "m.npy"
+    np.save(path, MATRIX)
+    mapped = np.load(path, mmap_mode="r")
+    for positions in ([1, 3, 2, 4], [6, 7, 8]):
+        block = _read_positions(mapped, positions)
+        assert not isinstance(block, np.memmap)
+        np.testing.assert_array_equal(block, MATRIX[positions])
+
+
+@pytest.fixture
+def table_path(tmp_path):
+    lineages = [f"d__B;p__P{i % 2};c__C;o__O;f__F{i % 3};g__G{i}" for i in range(7)]
+    samples = ["TC_1", "DQ_2", "MW_1", "DQ_1", "MW_2"]
+    rng = np.random.default_rng(0)
+    counts = rng.integers(0, 4, size=(7, 5))
+    path = tmp_path / "genus.tsv"
+    lines = ["# Constructed from biom file", "#OTU ID\t" + "\t".join(samples)]
+    lines += [name + "\t" + "\t".join(map(str, row)) for name, row in zip(lineages, counts)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_store_features_match_table(table_path, tmp_path):
+    store = load_table(build_feature_store(table_path, str(tmp_path / "genus.fstore"), chunk_rows=3))
+    table = parse_feature_table(table_path).to_frame()
+    assert store.taxonomy is None
+
+    positions = [4, 1, 3, 2]
+    picked = store.features(positions=positions)
+    expected = table.loc[list(store.feature_ids[positions]), list(store.sample_ids)]
+    np.testing.assert_array_equal(picked.counts, expected.to_numpy())
+
+    dq = store.samples(prefix="DQ_")
+    assert list(dq.sample_ids) == ["DQ_1", "DQ_2"]
+    np.testing.assert_array_equal(dq.counts, table.loc[list(store.feature_ids), ["DQ_1", "DQ_2"]].to_numpy())
+
+    # FeatureTable API (load_table을 쓰는 스크립트용)
+    np.testing.assert_array_equal(store.to_frame().loc[table.index, table.columns].to_numpy(), table.to_numpy())
+    np.testing.assert_array_equal(store.presence(store.sample_indices("MW_")),
+                                  (table.loc[list(store.feature_ids), ["MW_1", "MW_2"]] != 0).any(axis=1))
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""feature_table.py: 범주형 ID 인덱스가 바이너리 캐시(.index.json) 왕복 후에도 같은지 확인"""
+
+import numpy as np
+import pandas as pd
+
+from feature_table import load_feature_table
+
+SAMPLES = ["MW_2", "DQ_1", "TC_1", "DQ_2"]
+FEATURES = ["g__Veil", "g__Strep", "g__Lacto"]
+
+
+def test_categorical_indexes_survive_cache(tmp_path):
+    path = tmp_path / "genus.tsv"
+    rows = ["# Constructed from biom file", "#OTU ID\t" + "\t".join(SAMPLES)]
+    rows += [f"{name}\t" + "\t".join(str(i * 10 + j) for j in range(len(SAMPLES))) for i, name in enumerate(FEATURES)]
+    path.write_text("\n".join(rows) + "\n")
+
+    parsed = load_feature_table(str(path))
+    cached = load_feature_table(str(path))
+    assert isinstance(cached.counts, np.memmap)
+    for table in (parsed, cached):
+        assert isinstance(table.feature_ids, pd.CategoricalIndex)
+        assert isinstance(table.sample_ids, pd.CategoricalIndex)
+        # 범주 목록은 정렬되어도 ID 순서는 원본 TSV 순서 그대로
+        assert list(table.feature_ids) == FEATURES
+        assert list(table.sample_ids) == SAMPLES
+        assert table.feature_ids.name == "#OTU ID"
+        np.testing.assert_array_equal(table.sample_indices("DQ_"), [1, 3])
+    # DataFrame으로 내보낼 때는 일반 인덱스 (pd.read_table 결과와 같은 모양)
+    assert not isinstance(cached.to_frame().index, pd.CategoricalIndex)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""lefse_engine.py: 합성 테이블의 .res 결과(class, LDA 부호, p-value, 유의하지 않은 행) 고정값 확인"""
+
+import numpy as np
+from scipy import stats
+
+from lefse_engine import read_lefse_table, run_lefse, write_res
+
+CLASSES = ["DQ"] * 8 + ["MW"] * 8 + ["TC"] * 8
+RAMP = np.arange(8, dtype=float)
+# DQ_high: DQ에서만 크게, MW_high: MW에서만 크게, flat: 모든 class가 같은 값
+FEATURES = {
+    "DQ_high": np.concatenate([500 + RAMP * 10, 10 + RAMP, 10 + RAMP]),
+    "MW_high": np.concatenate([20 + RAMP, 800 + RAMP * 5, 20 + RAMP]),
+    "flat": np.tile(100 + RAMP, 3),
+}
+# seed 1984, bootstrap 10회 결과 (엔진의 난수 스트림이나 LDA 계산이 바뀌면 달라짐)
+EXPECTED_LDA = {"DQ_high": 2.619372, "MW_high": 2.897144}
+
+
+def _run(tmp_path, **options):
+    input_path, res_path = tmp_path / "input.tsv", tmp_path / "input.res"
+    lines = ["class\t" + "\t".join(CLASSES),
+             "subject\t" + "\t".join(f"{c}_{i}" for i, c in enumerate(CLASSES))]
+    lines += [name + "\t" + "\t".join(f"{v:g}" for v in values) for name, values in FEATURES.items()]
+    input_path.write_text("\n".join(lines) + "\n")
+
+    names, values, classes, subclasses, _ = read_lefse_table(str(input_path), 1, -1, 2)
+    result = run_lefse(names, values, classes, subclasses, n_boots=10, seed=1984, **options)
+    write_res(str(res_path), names, result)
+    return {line.split("\t")[0]: line.split("\t") for line in res_path.read_text().splitlines()}
+
+
+def test_res_rows_class_and_sign(tmp_path):
+    rows = _run(tmp_path)
+    assert list(rows) == ["DQ_high", "MW_high", "flat"]
+
+    assert rows["DQ_high"][2] == "DQ"
+    assert rows["MW_high"][2] == "MW"
+    for name in ("DQ_high", "MW_high"):
+        # LEfSe .res의 LDA는 양수 (어느 class 쪽인지는 class 열로 표시)
+        assert float(rows[name][3]) > 2.0
+        assert np.isclose(float(rows[name][3]), EXPECTED_LDA[name], atol=1e-6)
+        assert np.isclose(float(rows[name][1]), np.log10(FEATURES[name].reshape(3, 8).mean(axis=1).max()))
+        expected = stats.kruskal(*FEATURES[name].reshape(3, 8)).pvalue
+        assert np.isclose(float(rows[name][4]), expected, rtol=1e-12)
+
+    # 유의하지 않은 feature: class / LDA 칸이 비고 p-value는 '-'
+    assert rows["flat"][2:] == ["", "", "-"]
+
+
+def test_res_independent_of_worker_count(tmp_path):
+    assert _run(tmp_path, workers=1) == _run(tmp_path, workers=2)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""lefse_input.write_formatted_input: .in(pickle) 작성 → lefse_engine.read_formatted_input 왕복 확인"""
+
+import numpy as np
+
+from feature_table import FeatureTable
+from lefse_engine import read_formatted_input
+from lefse_input import class_subclass_subject_rows, group_subject_rows, write_formatted_input
+
+SAMPLES = ["MW_2", "DQ_1", "TC_1", "DQ_2", "MW_1", "TC_2"]
+COUNTS = np.array([
+    [10, 0, 5, 20, 3, 1],
+    [0, 7, 5, 0, 9, 2],
+    [1, 1, 1, 1, 1, 1],
+], dtype=np.float32)
+
+
+def _expected(counts, columns, norm_value):
+    # format_input.py -o와 같은 float64 정규화 (값 × norm_value / 샘플 합)
+    counts = counts.astype(np.float64)[:, columns]
+    return counts * (norm_value / counts.sum(axis=0))
+
+
+def test_flat_names_round_trip(tmp_path):
+    table = FeatureTable(COUNTS, ["g__Strep", "g__Lacto", "g__Veil"], SAMPLES)
+    path = tmp_path / "genus.in"
+    written = write_formatted_input(table, str(path), group_subject_rows, norm_value=1e6)
+
+    names, values, classes, subclasses, subjects = read_formatted_input(str(path))
+    assert names == ["g__Strep", "g__Lacto", "g__Veil"]
+    # class → subject 순으로 정렬
+    assert list(classes) == ["DQ", "DQ", "MW", "MW", "TC", "TC"]
+    assert list(subjects) == ["DQ_1", "DQ_2", "MW_1", "MW_2", "TC_1", "TC_2"]
+    assert list(subclasses) == ["_subcl"] * 6
+    assert written["norm"] == 1e6
+    assert written["class_sl"] == {"DQ": (0, 2), "MW": (2, 4), "TC": (4, 6)}
+
+    columns = [SAMPLES.index(s) for s in subjects]
+    np.testing.assert_array_equal(values, _expected(COUNTS, columns, 1e6))
+    np.testing.assert_allclose(values.sum(axis=0), 1e6, rtol=1e-12)
+
+
+def test_normalization_matches_float64(tmp_path):
+    # 큰 count 테이블도 float32 반올림 오차 없이 float64 정규화 결과와 정확히 같아야 함
+    rng = np.random.default_rng(0)
+    counts = rng.integers(0, 5000, size=(300, 12)).astype(np.float32)
+    samples = [f"{g}_{i}" for g in ("DQ", "MW", "TC") for i in range(4)]
+    table = FeatureTable(counts, [f"g__{i}" for i in range(300)], samples)
+    write_formatted_input(table, str(tmp_path / "big.in"), group_subject_rows, norm_value=1e6)
+
+    names, values, _, _, subjects = read_formatted_input(str(tmp_path / "big.in"))
+    assert names == [f"g__{i}" for i in range(300)]
+    np.testing.assert_array_equal(values, _expected(counts, [samples.index(s) for s in subjects], 1e6))
+
+
+def test_hierarchical_names_round_trip(tmp_path):
+    # '|' 계층 이름: 누락된 상위 단계가 뒤에 추가되고, 최상위(k__A) 합이 norm_value가 되도록 정규화
+    table = FeatureTable(COUNTS, ["k__A|p__A|g__x", "k__A|p__A|g__y", "k__A|p__B|g__z"], SAMPLES)
+    path = tmp_path / "hier.in"
+    write_formatted_input(table, str(path), class_subclass_subject_rows, norm_value=100.0)
+
+    names, values, classes, subclasses, subjects = read_formatted_input(str(path))
+    assert names[:3] == ["k__A.p__A.g__x", "k__A.p__A.g__y", "k__A.p__B.g__z"]
+    assert sorted(names[3:]) == ["k__A", "k__A.p__A", "k__A.p__B"]
+    assert list(classes) == ["DQ", "DQ", "MW", "MW", "TC", "TC"]
+
+    row = {name: values[i] for i, name in enumerate(names)}
+    np.testing.assert_allclose(row["k__A"], 100.0, rtol=1e-9)
+    np.testing.assert_allclose(row["k__A.p__A"], row["k__A.p__A.g__x"] + row["k__A.p__A.g__y"])
+    columns = [SAMPLES.index(s) for s in subjects]
+    np.testing.assert_allclose(values[:3], _expected(COUNTS, columns, 100.0), rtol=1e-12)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""transforms.py: 조성 변환의 기본 성질과 캐시 재사용 확인"""
+
+import numpy as np
+from scipy import sparse
+
+import transforms
+from feature_table import FeatureTable
+from transforms import clr, ilr, rarefy, transform_table, tss
+
+COUNTS = np.array([[10, 0, 3], [5, 5, 0], [1, 15, 7], [0, 0, 0]], dtype=np.float32)
+
+
+def test_tss_columns_sum_to_one_and_keep_zeros():
+    rel = tss(COUNTS)
+    np.testing.assert_allclose(rel.sum(axis=0), 1.0, rtol=1e-6)
+    np.testing.assert_array_equal(rel == 0, COUNTS == 0)
+    np.testing.assert_allclose(tss(sparse.csr_matrix(COUNTS)).toarray(), rel, rtol=1e-6)
+
+
+def test_clr_matches_log_ratio_and_ilr_is_isometric():
+    values = clr(COUNTS, pseudocount=0.5)
+    logged = np.log(COUNTS.astype(np.float64) + 0.5)
+    np.testing.assert_allclose(values, logged - logged.mean(axis=0), rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(values.sum(axis=0), 0.0, atol=1e-5)
+    # ILR 좌표 사이의 거리 = CLR 좌표 사이의 거리
+    coords = ilr(COUNTS, pseudocount=0.5)
+    assert coords.shape == (COUNTS.shape[0] - 1, COUNTS.shape[1])
+    np.testing.assert_allclose(np.linalg.norm(coords[:, 0] - coords[:, 2]),
+                               np.linalg.norm(values[:, 0] - values[:, 2]), rtol=1e-5)
+
+
+def test_rarefy_depth_and_dropped_samples():
+    values, kept = rarefy(COUNTS, depth=10, seed=0)
+    np.testing.assert_array_equal(kept, [0, 1, 2])
+    np.testing.assert_array_equal(values.sum(axis=0), 10)
+    assert (values <= COUNTS[:, kept]).all()
+    _, kept = rarefy(COUNTS, depth=15, seed=0)
+    np.testing.assert_array_equal(kept, [0, 1])
+
+
+def test_transform_table_reuses_cached_result(tmp_path):
+    table = FeatureTable(COUNTS, ["a", "b", "c", "d"], ["S1", "S2", "S3"])
+    first = transform_table(table, "clr", cache_dir=str(tmp_path), pseudocount=0.5)
+    again = transform_table(FeatureTable(COUNTS.copy(), ["a", "b", "c", "d"], ["S1", "S2", "S3"]), "clr",
+                            cache_dir=str(tmp_path), pseudocount=0.5)
+    assert again is first
+    other = transform_table(table, "clr", cache_dir=str(tmp_path), pseudocount=1.0)
+    assert other is not first
+
+
+def test_memory_cache_is_bounded(tmp_path):
+    # batch 실행처럼 변환을 많이 요청해도 메모리에는 최근 MEMORY_CACHE_SIZE개만 남음 (나머지는 디스크에서 다시 읽음)
+    table = FeatureTable(COUNTS, ["a", "b", "c", "d"], ["S1", "S2", "S3"])
+    first = transform_table(table, "clr", cache_dir=str(tmp_path), pseudocount=0.1)
+    for i in range(transforms.MEMORY_CACHE_SIZE + 2):
+        transform_table(table, "clr", cache_dir=str(tmp_path), pseudocount=1.0 + i)
+    assert len(transforms._MEMORY_CACHE) == transforms.MEMORY_CACHE_SIZE
+    again = transform_table(table, "clr", cache_dir=str(tmp_path), pseudocount=0.1)
+    assert again is not first
+    np.testing.assert_array_equal(again.counts, first.counts)
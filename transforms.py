@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+feature table 조성(compositional) 변환 모듈
+
+count 행렬(feature × sample) 전체를 NumPy 연산 한 번으로 변환한다. 열 단위 apply를 쓰지 않는다.
+
+  - tss    : total-sum scaling (샘플별 relative abundance, sparse 입력은 sparse 유지)
+  - clr    : centered log-ratio (pseudocount 또는 multiplicative replacement로 0 처리)
+  - ilr    : isometric log-ratio (Helmert 형태의 정규직교 기저, 결과는 (feature-1) × sample)
+  - rarefy : 샘플별 depth 개 비복원 추출 (depth보다 작은 샘플은 제외)
+
+transform_table()은 결과를 입력 테이블 내용 해시 + 변환 종류 + 파라미터를 키로 캐시한다.
+  - 같은 프로세스 안에서는 최근 MEMORY_CACHE_SIZE개 결과를 메모리(LRU)에서 바로 반환
+  - 디스크 캐시(~/.cache/sparta_300/transforms, qza_reader.ArtifactCache)로 다른 스크립트와 공유
+    (09 heatmap: clr, 14 Venn: tss)
+
+사용 예:
+  from transforms import transform_table
+  rel = transform_table(table, "tss")
+  clr = transform_table(table, "clr", replacement="multiplicative")
+
+  python transforms.py tss genus_20FNS-flt2.tsv genus_20FNS-flt2-RA.tsv
+"""
+
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from feature_table import FeatureTable
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sparta_300", "transforms")
+
+MEMORY_CACHE_SIZE = 4  # 메모리에 남겨 둘 변환 결과 수 (batch 실행에서도 메모리가 계속 늘지 않도록, 나머지는 디스크 캐시)
+
+_MEMORY_CACHE = OrderedDict()
+
+
+def _dense(counts):
+    return counts.toarray() if hasattr(counts, "toarray") else np.asarray(counts)
+
+
+# ============================================
+# 1. 행렬 변환 (입력/출력 모두 feature × sample)
+# ============================================
+def tss(counts):
+    """샘플(열)별 합이 1이 되도록 나눔 (합이 0인 샘플은 0으로 유지)"""
+    totals = np.asarray(counts.sum(axis=0, dtype=np.float64)).ravel()
+    scale = np.divide(1.0, totals, out=np.zeros_like(totals), where=totals > 0)
+    if hasattr(counts, "multiply"):
+        return counts.multiply(scale.astype(np.float32)[np.newaxis, :]).tocsr()
+    return (np.asarray(counts, dtype=np.float64) * scale).astype(np.float32)
+
+
+def multiplicative_replacement(counts, delta=None):
+    """
+    0을 delta로 바꾸고 0이 아닌 값은 합이 1로 유지되도록 줄임 (Martín-Fernández et al. 2003)
+
+    delta 기본값은 1 / feature 수² (scikit-bio와 동일)
+    """
+    closed = _dense(tss(counts)).astype(np.float64)
+    n_features = closed.shape[0]
+    if delta is None:
+        delta = 1.0 / n_features ** 2
+    zeros = closed == 0
+    n_zeros = zeros.sum(axis=0)
+    return np.where(zeros, delta, closed * (1.0 - n_zeros * delta))
+
+
+def clr(counts, pseudocount=0.5, replacement=None, delta=None):
+    """
+    centered log-ratio: log(x) - 샘플별 log(x) 평균
+
+    Args:
+        pseudocount (float): replacement가 None일 때 모든 값에 더할 값
+        replacement (str): "multiplicative"이면 pseudocount 대신 multiplicative replacement 사용
+        delta (float): multiplicative replacement의 대체값
+    """
+    if replacement == "multiplicative":
+        x = multiplicative_replacement(counts, delta)
+    elif replacement is None:
+        x = _dense(counts).astype(np.float64) + pseudocount
+    else:
+        raise ValueError(f"알 수 없는 replacement: {replacement}")
+    logged = np.log(x)
+    return (logged - logged.mean(axis=0)).astype(np.float32)
+
+
+def ilr_basis(n_features):
+    """(n_features - 1) × n_features 정규직교 기저 (각 행의 합은 0)"""
+    basis = np.zeros((n_features - 1, n_features))
+    for i in range(n_features - 1):
+        basis[i, :i + 1] = 1.0 / (i + 1)
+        basis[i, i + 1] = -1.0
+        basis[i] *= np.sqrt((i + 1) / (i + 2))
+    return basis
+
+
+def ilr(counts, pseudocount=0.5, replacement=None, delta=None):
+    """isometric log-ratio: 정규직교 기저 × clr (결과 (feature-1) × sample)"""
+    clr_values = clr(counts, pseudocount, replacement, delta).astype(np.float64)
+    return (ilr_basis(clr_values.shape[0]) @ clr_values).astype(np.float32)
+
+
+def rarefy(counts, depth, seed=0):
+    """
+    샘플별로 depth개 read를 비복원 추출 (다변량 초기하 분포)
+
+    Returns:
+        (ndarray, ndarray): rarefied count 행렬(유지된 샘플만), 유지된 샘플 열 번호
+    """
+    dense = np.rint(_dense(counts)).astype(np.int64)
+    kept = np.flatnonzero(dense.sum(axis=0) >= depth)
+    rng = np.random.default_rng(seed)
+    rarefied = np.zeros((dense.shape[0], len(kept)), dtype=np.float32)
+    for out_col, col in enumerate(kept):
+        rarefied[:, out_col] = rng.multivariate_hypergeometric(dense[:, col], depth)
+    return rarefied, kept
+
+
+# ============================================
+# 2. 캐시 계층 (FeatureTable 단위)
+# ============================================
+def table_digest(table):
+    """count 행렬과 feature/sample ID 내용의 sha1 (테이블 객체에 한 번만 계산해 둠)"""
+    digest = getattr(table, "_content_digest", None)
+    if digest is not None:
+        return digest
+    h = hashlib.sha1()
+    h.update(json.dumps([list(map(str, table.feature_ids)), list(map(str, table.sample_ids))]).encode("utf-8"))
+    counts = table.counts
+    if hasattr(counts, "tocsr"):
+        counts = counts.tocsr()
+        for part in (counts.data, counts.indices, counts.indptr):
+            h.update(np.ascontiguousarray(part).tobytes())
+    else:
+        for start in range(0, counts.shape[0], 4096):
+            h.update(np.ascontiguousarray(counts[start:start + 4096], dtype=np.float32).tobytes())
+    table._content_digest = h.hexdigest()
+    return table._content_digest
+
+
+def _apply(table, kind, params):
+    if kind == "tss":
+        return FeatureTable(tss(table.counts), table.feature_ids, table.sample_ids, table.id_column, table.taxonomy)
+    if kind == "clr":
+        return FeatureTable(clr(table.counts, **params), table.feature_ids, table.sample_ids, table.id_column,
+                            table.taxonomy)
+    if kind == "ilr":
+        values = ilr(table.counts, **params)
+        return FeatureTable(values, [f"ilr_{i + 1}" for i in range(values.shape[0])], table.sample_ids,
+                            table.id_column)
+    if kind == "rarefy":
+        values, kept = rarefy(table.counts, **params)
+        return FeatureTable(values, table.feature_ids, table.sample_ids[kept], table.id_column, table.taxonomy)
+    raise ValueError(f"알 수 없는 변환: {kind}")
+
+
+def transform_table(table, kind, use_cache=True, cache_dir=DEFAULT_CACHE_DIR, **params):
+    """
+    변환된 FeatureTable 반환 (같은 테이블 + 같은 변환/파라미터면 캐시 재사용)
+
+    Args:
+        table (FeatureTable): 입력 count 테이블
+        kind (str): "tss" / "clr" / "ilr" / "rarefy"
+        use_cache (bool): 메모리/디스크 캐시 사용 여부
+        **params: 변환 파라미터 (예: pseudocount=0.5, replacement="multiplicative", depth=10000, seed=0)
+    """
+    if not use_cache:
+        return _apply(table, kind, params)
+    key = hashlib.sha1(
+        f"{table_digest(table)}|{kind}|{json.dumps(params, sort_keys=True)}".encode("utf-8")
+    ).hexdigest()
+    if key in _MEMORY_CACHE:
+        _MEMORY_CACHE.move_to_end(key)
+        return _MEMORY_CACHE[key]
+
+    from qza_reader import ArtifactCache
+    disk = ArtifactCache(cache_dir)
+    result = disk.get(key)
+    if result is None:
+        result = _apply(table, kind, params)
+        try:
+            disk.put(key, result)
+        except OSError as e:
+            print(f"[경고] 변환 결과 캐시 저장 실패: {e}")
+    _MEMORY_CACHE[key] = result
+    while len(_MEMORY_CACHE) > MEMORY_CACHE_SIZE:
+        _MEMORY_CACHE.popitem(last=False)
+    return result
+
+
+def main():
+    if len(sys.argv) < 4:
+        sys.exit("사용법: python transforms.py <tss|clr|ilr|rarefy> <입력 테이블> <출력 TSV> [depth]")
+    from feature_table import load_table
+    kind, input_path, output_path = sys.argv[1:4]
+    params = {"depth": int(sys.argv[4])} if kind == "rarefy" else {}
+    result = transform_table(load_table(input_path), kind, **params)
+    result.to_frame().to_csv(output_path, sep="\t")
+    print(f"{kind} 변환 결과 저장: {output_path} ({result.shape[0]} x {result.shape[1]})")
+
+
+if __name__ == "__main__":
+    main()